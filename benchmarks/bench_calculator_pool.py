@@ -0,0 +1,78 @@
+"""
+Measures what running env calculator calls in the sandboxed worker pool costs per step.
+
+Each step makes one calculator call per rollout from its own thread, as the env's rollout
+threads do. A share of the calls are maximum-size expressions, the most expensive input the
+size limits let through. Reports per-step latency inline and in the pool, and per-call latency.
+
+    python benchmarks/bench_calculator_pool.py --steps 50 --batch-size 64 --workers 4
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(REPO_ROOT, "src"))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from rollouts import load_rows  # noqa: E402
+
+from environment.tools.calculator import DEFAULT_MAX_NODES, Expression, calculate  # noqa: E402
+from environment.tools.calculator_pool import CalculatorPool  # noqa: E402
+from environment.tools.infix import parse_infix  # noqa: E402
+
+
+def percentile(ordered: List[float], pct: float) -> float:
+    return ordered[min(len(ordered) - 1, round(pct / 100 * (len(ordered) - 1)))]
+
+def make_steps(steps: int, batch_size: int, heavy_share: float, seed: int) -> List[List[Expression]]:
+    rng = random.Random(seed)
+    expressions = [parse_infix(row["expression"]) for row in load_rows()]
+    heavy = Expression(operation="add", operands=[rng.random() for _ in range(DEFAULT_MAX_NODES - 1)])
+    return [
+        [heavy if rng.random() < heavy_share else rng.choice(expressions) for _ in range(batch_size)]
+        for _ in range(steps)
+    ]
+
+def run(steps: List[List[Expression]], calculate_fn: Callable[[Expression], float]) -> Dict[str, float]:
+    step_latencies = []
+    with ThreadPoolExecutor(max_workers=len(steps[0])) as rollout_threads:
+        for step in steps:
+            start = time.perf_counter()
+            list(rollout_threads.map(calculate_fn, step))
+            step_latencies.append(time.perf_counter() - start)
+    step_latencies.sort()
+    return {"step_p50": percentile(step_latencies, 50), "step_p99": percentile(step_latencies, 99)}
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--steps", type=int, default=50)
+    parser.add_argument("--batch-size", type=int, default=64)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--heavy-share", type=float, default=0.02, help="Share of calls with a maximum-size expression")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    steps = make_steps(args.steps, args.batch_size, args.heavy_share, args.seed)
+    pool = CalculatorPool(num_workers=args.workers)
+    pool.calculate(steps[0][0])
+    pool.reset_stats()
+
+    inline = run(steps, calculate)
+    pooled = run(steps, pool.calculate)
+    stats = pool.stats()
+    pool.close()
+
+    print(f"{args.steps} steps of {args.batch_size} calls, {args.workers} workers, {args.heavy_share:.0%} max-size expressions")
+    print(f"{'':8} {'step p50 (ms)':>14} {'step p99 (ms)':>14}")
+    for name, result in (("inline", inline), ("pool", pooled)):
+        print(f"{name:8} {result['step_p50'] * 1e3:14.2f} {result['step_p99'] * 1e3:14.2f}")
+    print(f"pool: {stats['calculations'] / stats['batches']:.1f} calls per worker message")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+"""
+Measures the memory and construction time of the ways to hold parsed calculator calls.
+
+Parses the calculator calls of synthetic rollouts, repeated up to --calls, and keeps every
+result alive as: Expression trees without slots (the representation before nodes were
+slotted), slotted Expression trees, one CompiledExpression per call, and one ExpressionTable.
+Reports retained bytes per call, measured with tracemalloc, and microseconds per call to build each.
+
+    python benchmarks/bench_expression_memory.py --calls 50000
+"""
+import argparse
+import gc
+import os
+import sys
+import time
+import tracemalloc
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Tuple, Union
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(REPO_ROOT, "src"))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from rollouts import make_rollouts  # noqa: E402
+
+from environment.action_parser import (  # noqa: E402
+    _ExpressionYAMLParser,
+    _parse_calculator_body,
+    _UnsupportedYAML,
+    extract_agent_actions,
+    extract_yaml_from_markdown,
+    parse_calculator_program,
+)
+from environment.tools.calculator import Expression, compile_expression  # noqa: E402
+from environment.tools.expression_table import ExpressionTable  # noqa: E402
+
+# The parser caches results per body, which would share trees between repeated calls
+parse_uncached = _parse_calculator_body.__wrapped__
+
+
+@dataclass
+class UnslottedExpression:
+    """Expression as it was declared before its nodes were slotted."""
+
+    operation: str
+    operands: List[Union["UnslottedExpression", float, int]]
+
+
+class _UnslottedYAMLParser(_ExpressionYAMLParser):
+    def _build(self, operation, operands):
+        return UnslottedExpression(operation, operands)
+
+
+def unslotted(expression: Any) -> Any:
+    if isinstance(expression, Expression):
+        return UnslottedExpression(expression.operation, [unslotted(operand) for operand in expression.operands])
+    return expression
+
+def parse_unslotted(body: str) -> Any:
+    """Parses a body like `parse_uncached`, into unslotted nodes, so both trees are built the same way."""
+    try:
+        return _UnslottedYAMLParser(extract_yaml_from_markdown(body)).parse()
+    except _UnsupportedYAML:
+        return unslotted(parse_uncached(body)[0])
+
+def load_bodies(calls: int) -> List[str]:
+    bodies = []
+    _, completions, _ = make_rollouts(2000)
+    for completion in completions:
+        for message in completion:
+            if message["role"] != "assistant":
+                continue
+            for name, body in extract_agent_actions(message["content"]):
+                if name == "calculator" and parse_uncached(body)[1] is None:
+                    bodies.append(body)
+    # Copies, so repeated bodies are distinct strings like calls from different rollouts
+    return [(bodies[i % len(bodies)] + " ")[:-1] for i in range(calls)]
+
+def retained_bytes(build: Callable[[], Any]) -> Tuple[Any, int]:
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    result = build()
+    gc.collect()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return result, after - before
+
+def time_per_call(build: Callable[[], Any], calls: int) -> float:
+    gc.collect()
+    start = time.perf_counter()
+    build()
+    return (time.perf_counter() - start) / calls * 1e6
+
+def build_table(bodies: List[str]) -> ExpressionTable:
+    table = ExpressionTable()
+    for body in bodies:
+        table.append(parse_calculator_program(body))
+    return table
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--calls", type=int, default=50_000)
+    args = parser.parse_args()
+
+    bodies = load_bodies(args.calls)
+    nodes = sum(len(parse_calculator_program(body).opcodes) for body in bodies) / len(bodies)
+
+    representations: Dict[str, Callable[[], Any]] = {
+        "unslotted trees": lambda: [parse_unslotted(body) for body in bodies],
+        "slotted trees": lambda: [parse_uncached(body)[0] for body in bodies],
+        "compiled via trees": lambda: [compile_expression(parse_uncached(body)[0]) for body in bodies],
+        "compiled by parser": lambda: [parse_calculator_program(body) for body in bodies],
+        "expression table": lambda: build_table(bodies),
+    }
+
+    print(f"{args.calls} calculator calls, {nodes:.1f} nodes per call on average")
+    print(f"{'':20} {'bytes per call':>15} {'us per call':>12}")
+    for name, build in representations.items():
+        result, size = retained_bytes(build)
+        del result
+        print(f"{name:20} {size / args.calls:15.1f} {time_per_call(build, args.calls):12.2f}")
+
+if __name__ == "__main__":
+    main()
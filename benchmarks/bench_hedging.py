@@ -0,0 +1,82 @@
+"""
+Measures how much hedged judge requests cut reward step latency.
+
+Runs the same judge steps with hedging off and on against a fake judge model with heavy-tailed
+latency, and reports step latency percentiles (each step waits for its slowest judge call)
+and how many extra requests hedging sent.
+
+    python benchmarks/bench_hedging.py --steps 30 --batch-size 64 --percentile 95 --budget 0.05
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+from typing import Dict, List, Optional
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(REPO_ROOT, "src"))
+
+from model_exec.fake import VALID, FakeModelExecutor  # noqa: E402
+from rewards.exec_judge import JudgeExecutor  # noqa: E402
+from rewards.hedging import HedgingPolicy  # noqa: E402
+from rewards.judge_factory import TOOL_JUDGE_SYS_MSG_PATH  # noqa: E402
+
+
+def percentile(ordered: List[float], pct: float) -> float:
+    return ordered[min(len(ordered) - 1, round(pct / 100 * (len(ordered) - 1)))]
+
+async def run_steps(judge: JudgeExecutor, steps: int, batch_size: int) -> List[float]:
+    step_latencies = []
+    for step in range(steps):
+        start = time.perf_counter()
+        await asyncio.gather(*(
+            judge.run_judge_async(f"By: user\nStep {step}, conversation {i}") for i in range(batch_size)
+        ))
+        step_latencies.append(time.perf_counter() - start)
+    return step_latencies
+
+def run(args: argparse.Namespace, hedging: Optional[HedgingPolicy]) -> Dict[str, float]:
+    fake = FakeModelExecutor(
+        response_weights={VALID: 1.0},
+        latency_p50=args.latency_p50,
+        latency_sigma=args.latency_sigma,
+        seed=args.seed,
+    )
+    judge = JudgeExecutor(model_exec=fake, sys_msg_path=TOOL_JUDGE_SYS_MSG_PATH, max_concurrency=args.batch_size, hedging=hedging)
+
+    step_latencies = sorted(asyncio.run(run_steps(judge, args.steps, args.batch_size)))
+    stats = judge.hedger.stats() if judge.hedger is not None else {"hedges": 0, "hedge_wins": 0}
+    return {
+        "step_p50": percentile(step_latencies, 50),
+        "step_p99": percentile(step_latencies, 99),
+        "requests": fake.stats()["calls"],
+        "hedges": stats["hedges"],
+        "hedge_wins": stats["hedge_wins"],
+    }
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--steps", type=int, default=30)
+    parser.add_argument("--batch-size", type=int, default=64)
+    parser.add_argument("--latency-p50", type=float, default=0.05, help="Median fake judge latency in seconds")
+    parser.add_argument("--latency-sigma", type=float, default=1.0, help="Log-normal spread of fake judge latency")
+    parser.add_argument("--percentile", type=float, default=95.0)
+    parser.add_argument("--budget", type=float, default=0.05)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    policy = HedgingPolicy(percentile=args.percentile, budget=args.budget, min_delay=0.0, deadline=None)
+    baseline = run(args, hedging=None)
+    hedged = run(args, hedging=policy)
+
+    for name, results in (("No hedging", baseline), ("Hedging", hedged)):
+        print(f"{name:11} step p50 {results['step_p50'] * 1000:8.1f} ms   p99 {results['step_p99'] * 1000:8.1f} ms   "
+              f"{results['requests']} requests ({results['hedges']} hedges, {results['hedge_wins']} won)")
+    saved = baseline["step_p99"] - hedged["step_p99"]
+    print(f"p99 step latency saved: {saved * 1000:.1f} ms ({saved / baseline['step_p99']:.0%}) "
+          f"for {hedged['hedges'] / baseline['requests']:.1%} extra requests")
+
+
+if __name__ == "__main__":
+    main()
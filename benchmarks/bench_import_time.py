@@ -0,0 +1,76 @@
+"""
+Measures process startup cost of the reward module and the training entrypoint's imports.
+
+Each module is imported in a fresh interpreter several times and the median wall time is
+reported, along with the slowest imports from `python -X importtime`.
+
+    python benchmarks/bench_import_time.py --repeats 5
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+from typing import List, Optional, Tuple
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SRC_DIR = os.path.join(REPO_ROOT, "src")
+
+# train.py itself starts training when imported, so its imports are measured instead
+MODULES = [
+    "rewards.calculator_reward_func",
+    "environment.calculator_env",
+]
+
+
+def _run_python(code: str, extra_args: Optional[List[str]] = None) -> subprocess.CompletedProcess:
+    env = dict(os.environ, PYTHONPATH=SRC_DIR)
+    env.pop("ANTHROPIC_API_KEY", None)  # Startup must not depend on credentials
+    return subprocess.run(
+        [sys.executable, *(extra_args or []), "-c", code],
+        cwd=SRC_DIR, env=env, capture_output=True, text=True,
+    )
+
+def time_import(module: str, repeats: int) -> Tuple[Optional[float], str]:
+    """Returns the median seconds to start an interpreter and import `module`, or None and the error."""
+    code = f"import time; start = time.perf_counter(); import {module}; print(time.perf_counter() - start)"
+    timings = []
+    for _ in range(repeats):
+        result = _run_python(code)
+        if result.returncode != 0:
+            return None, result.stderr.strip().splitlines()[-1]
+        timings.append(float(result.stdout.strip().splitlines()[-1]))
+    return statistics.median(timings), ""
+
+def slowest_imports(module: str, top: int) -> List[Tuple[int, str]]:
+    """Returns (cumulative microseconds, name) of the slowest top-level imports made by `module`."""
+    result = _run_python(f"import {module}", extra_args=["-X", "importtime"])
+    entries = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        # Only direct imports, which are indented by two spaces after the separator's space
+        if name[1:].startswith("   ") or not name[1:].startswith("  "):
+            continue
+        entries.append((int(cumulative), name.strip()))
+    return sorted(entries, reverse=True)[:top]
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--top", type=int, default=5, help="Number of slowest imports to list per module")
+    args = parser.parse_args()
+
+    for module in MODULES:
+        seconds, error = time_import(module, args.repeats)
+        if seconds is None:
+            print(f"{module}: could not be imported ({error})")
+            continue
+        print(f"{module}: {seconds * 1000:.0f} ms (median of {args.repeats})")
+        for cumulative, name in slowest_imports(module, args.top):
+            print(f"    {cumulative / 1000:8.1f} ms  {name}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""
+Compares judge throughput of a local CPU model with the API judge path.
+
+Judges the same rollouts through JudgeExecutor twice: with LocalModelExecutor, and with a fake
+judge whose latency and failure rates stand in for the Claude API. Reports conversations per
+second, per-conversation latency and how many responses needed a parse fallback. Needs torch
+and transformers; the first run downloads the local model.
+
+    python benchmarks/bench_local_judge.py --rollouts 128 --model Qwen/Qwen2.5-0.5B-Instruct
+"""
+import argparse
+import asyncio
+import time
+from typing import Dict, List
+
+from rollouts import DEFAULT_DATASET_PATH, make_rollouts
+
+from model_exec.fake import FakeModelExecutor
+from model_exec.local import DEFAULT_LOCAL_JUDGE_MODEL, LocalModelExecutor
+from model_exec.model_executor import ModelExecutor
+from rewards.calculator_reward_func import _format_conversation_for_judge
+from rewards.exec_judge import JudgeExecutor
+from rewards.judge_factory import TOOL_JUDGE_SYS_MSG_PATH
+from rewards.judge_yaml_response_parser import YAMLResponseParser
+from rewards.rule_judge import prejudge_conversation
+
+
+def percentile(values: List[float], pct: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, round(pct / 100 * (len(ordered) - 1)))]
+
+def load_conversations(args: argparse.Namespace) -> List[str]:
+    prompts, completions, _ = make_rollouts(args.rollouts, seed=args.seed, path=args.dataset)
+    return [
+        _format_conversation_for_judge(prompt_msgs, completion_msgs)
+        for prompt_msgs, completion_msgs in zip(prompts, completions)
+        if prejudge_conversation(completion_msgs) is None
+    ]
+
+def run(model_exec: ModelExecutor, conversations: List[str], max_concurrency: int) -> Dict[str, float]:
+    judge = JudgeExecutor(model_exec=model_exec, sys_msg_path=TOOL_JUDGE_SYS_MSG_PATH, max_concurrency=max_concurrency)
+    responses: List[str] = []
+    execute_async = model_exec.execute_async
+
+    async def recording_execute_async(*args, **kwargs) -> str:
+        response = await execute_async(*args, **kwargs)
+        responses.append(response)
+        return response
+    model_exec.execute_async = recording_execute_async
+
+    async def judge_one(conversation: str) -> float:
+        start = time.perf_counter()
+        try:
+            await judge.run_judge_async(conversation)
+        except Exception:
+            pass
+        return time.perf_counter() - start
+
+    async def judge_all() -> List[float]:
+        return await asyncio.gather(*(judge_one(c) for c in conversations))
+
+    start = time.perf_counter()
+    latencies = asyncio.run(judge_all())
+    total_time = time.perf_counter() - start
+
+    fallbacks = 0
+    for response in responses:
+        try:
+            YAMLResponseParser.parse_judge_response(response)
+        except ValueError:
+            fallbacks += 1
+    return {
+        "conversations_per_s": len(conversations) / total_time,
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+        "requests": len(responses),
+        "fallbacks": fallbacks,
+    }
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rollouts", type=int, default=128)
+    parser.add_argument("--model", default=DEFAULT_LOCAL_JUDGE_MODEL)
+    parser.add_argument("--max-batch-size", type=int, default=16)
+    parser.add_argument("--max-thought-tokens", type=int, default=48)
+    parser.add_argument("--threads", type=int, default=None, help="CPU threads for the local model")
+    parser.add_argument("--api-latency-p50", type=float, default=0.8, help="Median latency of the fake API judge in seconds")
+    parser.add_argument("--api-concurrency", type=int, default=64)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--dataset", default=DEFAULT_DATASET_PATH)
+    args = parser.parse_args()
+
+    conversations = load_conversations(args)
+    api = run(FakeModelExecutor(latency_p50=args.api_latency_p50, seed=args.seed), conversations, args.api_concurrency)
+
+    start = time.perf_counter()
+    local_exec = LocalModelExecutor(
+        model_name=args.model,
+        max_batch_size=args.max_batch_size,
+        max_thought_tokens=args.max_thought_tokens,
+        num_threads=args.threads,
+    )
+    load_time = time.perf_counter() - start
+    local = run(local_exec, conversations, max_concurrency=args.max_batch_size)
+
+    print(f"Conversations judged: {len(conversations)} (local model loaded in {load_time:.1f}s)")
+    for name, results in (("API (fake)", api), ("Local", local)):
+        print(f"{name:10} {results['conversations_per_s']:7.1f} conversations/s   "
+              f"p50 {results['p50_ms']:8.1f} ms   p99 {results['p99_ms']:8.1f} ms   "
+              f"{results['fallbacks']}/{results['requests']} responses needed a parse fallback")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""
+Compares the calculator's numeric backends: cost per expression and how far float results drift.
+
+Runs three workloads: the dataset's expressions, integer multiplication chains like
+`4829*736*...` that outgrow a double's 53 bits, and chains mixing in division. For each
+backend it reports microseconds per `calculate` call, and for the exact backends the same
+cost with the integer fast path turned off. The accuracy columns compare float results to
+exact ones.
+
+    python benchmarks/bench_numeric_backends.py --expressions 2000 --precision 28
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from fractions import Fraction
+from typing import Any, Dict, List
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(REPO_ROOT, "src"))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from rollouts import load_rows  # noqa: E402
+
+from environment.tools.calculator import Expression, calculate  # noqa: E402
+from environment.tools.infix import parse_infix  # noqa: E402
+from environment.tools.numeric import FLOAT, DecimalNumbers, FractionNumbers  # noqa: E402
+
+
+class DecimalWithoutFastPath(DecimalNumbers):
+    """Converts every constant to a Decimal, as a backend without the integer fast path would."""
+
+    def constant(self, value: float) -> Any:
+        return self._from_literal(repr(value))
+
+class FractionWithoutFastPath(FractionNumbers):
+    """Converts every constant to a Fraction, as a backend without the integer fast path would."""
+
+    def constant(self, value: float) -> Any:
+        return self._from_literal(repr(value))
+
+
+def make_workloads(count: int, seed: int) -> Dict[str, List[Expression]]:
+    rng = random.Random(seed)
+    rows = load_rows()
+    dataset = [parse_infix(rng.choice(rows)["expression"]) for _ in range(count)]
+
+    def chain(operations: List[str]) -> Expression:
+        expression: Any = rng.randint(100, 9999)
+        for operation in operations:
+            expression = Expression(operation=operation, operands=[expression, rng.randint(100, 9999)])
+        return expression
+
+    integer_chains = [chain(["multiply"] * rng.randint(1, 7)) for _ in range(count)]
+    mixed_chains = [chain([rng.choice(["add", "subtract", "multiply", "divide"]) for _ in range(rng.randint(1, 7))]) for _ in range(count)]
+    return {"dataset": dataset, "integer chains": integer_chains, "mixed chains": mixed_chains}
+
+def time_per_call(expressions: List[Expression], numbers: Any, repeats: int) -> float:
+    best = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter()
+        for expression in expressions:
+            calculate(expression, numbers=numbers)
+        best = min(best, time.perf_counter() - start)
+    return best / len(expressions) * 1e6
+
+def float_drift(expressions: List[Expression]) -> Dict[str, float]:
+    """Share of float results that differ from the correctly rounded exact result, and the worst relative error."""
+    inexact, worst = 0, 0.0
+    for expression in expressions:
+        exact = calculate(expression, numbers=FractionNumbers())
+        approximate = calculate(expression)
+        if float(exact) != approximate:
+            inexact += 1
+        if exact != 0:
+            worst = max(worst, float(abs((Fraction(approximate) - exact) / exact)))
+    return {"inexact": inexact / len(expressions), "worst_rel_error": worst}
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--expressions", type=int, default=2000)
+    parser.add_argument("--precision", type=int, default=28, help="Decimal backend precision in significant digits")
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    backends = {
+        "float": FLOAT,
+        "decimal": DecimalNumbers(args.precision),
+        "decimal (no fast path)": DecimalWithoutFastPath(args.precision),
+        "fraction": FractionNumbers(),
+        "fraction (no fast path)": FractionWithoutFastPath(),
+    }
+    workloads = make_workloads(args.expressions, args.seed)
+
+    names = list(workloads)
+    print(f"{args.expressions} expressions per workload, microseconds per calculate call")
+    print(f"{'':24}" + "".join(f"{name:>16}" for name in names))
+    for backend_name, numbers in backends.items():
+        costs = [time_per_call(workloads[name], numbers, args.repeats) for name in names]
+        print(f"{backend_name:24}" + "".join(f"{cost:16.2f}" for cost in costs))
+
+    print("\nfloat results against exact ones")
+    for name in names:
+        drift = float_drift(workloads[name])
+        print(f"{name:24} {drift['inexact']:6.1%} not correctly rounded, worst relative error {drift['worst_rel_error']:.1e}")
+
+
+if __name__ == "__main__":
+    main()
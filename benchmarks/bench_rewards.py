@@ -0,0 +1,96 @@
+"""
+Benchmarks reward function throughput against a fake judge model.
+
+Replays rollouts built from the training dataset through `judge_tool_use` and
+`verify_correctness` in trainer-sized batches and reports latency percentiles, judge
+calls per second and judge retries per batch. No API calls are made. With --structured the
+judge answers through forced tool calls instead of YAML (JUDGE_STRUCTURED_OUTPUT).
+
+    python benchmarks/bench_rewards.py --batches 20 --batch-size 64
+"""
+import argparse
+import logging
+import os
+import statistics
+import time
+from typing import Dict, List
+
+from rollouts import DEFAULT_DATASET_PATH, make_rollouts
+
+from model_exec.fake import FakeModelExecutor
+from rewards import calculator_reward_func
+from rewards.judge_factory import set_judge_model
+
+
+def percentile(values: List[float], pct: float) -> float:
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+def run(args: argparse.Namespace) -> Dict[str, float]:
+    fake = FakeModelExecutor(
+        latency_p50=args.latency_p50,
+        latency_sigma=args.latency_sigma,
+        timeout=args.timeout,
+        seed=args.seed,
+    )
+    set_judge_model(fake)
+    os.environ["JUDGE_STRUCTURED_OUTPUT"] = "1" if args.structured else "0"
+
+    prompts, completions, answers = make_rollouts(args.batches * args.batch_size, seed=args.seed, path=args.dataset)
+
+    judge_latencies, verify_latencies, retries = [], [], []
+    total_start = time.perf_counter()
+    for batch in range(args.batches):
+        batch_slice = slice(batch * args.batch_size, (batch + 1) * args.batch_size)
+        calls_before = fake.stats()
+
+        start = time.perf_counter()
+        calculator_reward_func.judge_tool_use(prompts[batch_slice], completions[batch_slice])
+        judge_latencies.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        calculator_reward_func.verify_correctness(prompts[batch_slice], completions[batch_slice], answer=answers[batch_slice])
+        verify_latencies.append(time.perf_counter() - start)
+
+        retries.append(fake.stats()["retries"] - calls_before["retries"])
+    total_time = time.perf_counter() - total_start
+
+    stats = fake.stats()
+    return {
+        "judge_p50_ms": percentile(judge_latencies, 50) * 1000,
+        "judge_p99_ms": percentile(judge_latencies, 99) * 1000,
+        "verify_p50_ms": percentile(verify_latencies, 50) * 1000,
+        "verify_p99_ms": percentile(verify_latencies, 99) * 1000,
+        "rollouts_per_s": args.batches * args.batch_size / total_time,
+        "judge_calls_per_s": stats["calls"] / total_time,
+        "judge_calls": stats["calls"],
+        "retries_per_batch": statistics.mean(retries),
+        "timeouts": stats["timeouts"],
+    }
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--batches", type=int, default=20)
+    parser.add_argument("--batch-size", type=int, default=64)
+    parser.add_argument("--latency-p50", type=float, default=0.05, help="Median fake judge latency in seconds")
+    parser.add_argument("--latency-sigma", type=float, default=0.5, help="Log-normal spread of fake judge latency")
+    parser.add_argument("--timeout", type=float, default=0.5, help="Seconds before a fake timeout is raised")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--dataset", default=DEFAULT_DATASET_PATH)
+    parser.add_argument("--structured", action="store_true", help="Judge with structured output instead of YAML")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+    results = run(args)
+
+    print(f"Batches: {args.batches} x {args.batch_size} rollouts")
+    print(f"judge_tool_use     p50 {results['judge_p50_ms']:9.1f} ms   p99 {results['judge_p99_ms']:9.1f} ms")
+    print(f"verify_correctness p50 {results['verify_p50_ms']:9.1f} ms   p99 {results['verify_p99_ms']:9.1f} ms")
+    print(f"Rollouts/s: {results['rollouts_per_s']:.1f}")
+    print(f"Judge calls: {results['judge_calls']} ({results['judge_calls_per_s']:.1f}/s), "
+          f"{results['retries_per_batch']:.2f} retries per batch, {results['timeouts']} timeouts")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+"""
+Compares packed judge verdicts with single-conversation verdicts.
+
+Judges the same rollouts once per conversation and once packed `--pack-size` conversations
+per request, then reports how closely the scores agree alongside the requests and prompt
+characters each mode needed. Rollouts the rule judge scores are skipped, as they never reach
+the LLM judge.
+
+With the default fake judge this only exercises the packing and fallback paths. Run it with
+`--judge-model claude-3-5-haiku` (and ANTHROPIC_API_KEY set) before turning on JUDGE_PACK_SIZE.
+
+    python benchmarks/eval_packed_judge.py --rollouts 200 --pack-size 8 --judge-model claude-3-5-haiku
+"""
+import argparse
+import asyncio
+import os
+import statistics
+from typing import Dict, List, Optional
+
+from rollouts import DEFAULT_DATASET_PATH, make_rollouts
+
+from model_exec.fake import FakeModelExecutor
+from model_exec.model_executor import Message, ModelExecutor
+from rewards.calculator_reward_func import _format_conversation_for_judge
+from rewards.exec_judge import JudgeExecutor
+from rewards.judge_factory import TOOL_JUDGE_SYS_MSG_PATH, get_judge_model
+from rewards.judge_resp import JudgeResponse
+from rewards.rule_judge import prejudge_conversation
+
+
+class CountingModelExecutor(ModelExecutor):
+    """Counts the requests and prompt characters sent to another model executor."""
+
+    def __init__(self, model_exec: ModelExecutor):
+        self.model_exec = model_exec
+        self.ai_model_name = model_exec.ai_model_name
+        self.requests = 0
+        self.prompt_chars = 0
+
+    def execute(self, sys_msg: str, messages: List[Message], temperature: float = 0.2, stop_sequences: List[str] = None) -> str:
+        self._count(sys_msg, messages)
+        return self.model_exec.execute(sys_msg, messages, temperature, stop_sequences)
+
+    async def execute_async(self, sys_msg: str, messages: List[Message], temperature: float = 0.2, stop_sequences: List[str] = None) -> str:
+        self._count(sys_msg, messages)
+        return await self.model_exec.execute_async(sys_msg, messages, temperature, stop_sequences)
+
+    def _count(self, sys_msg: str, messages: List[Message]) -> None:
+        self.requests += 1
+        self.prompt_chars += len(sys_msg) + sum(len(message.content) for message in messages)
+
+
+def load_conversations(args: argparse.Namespace) -> List[str]:
+    prompts, completions, _ = make_rollouts(args.rollouts, seed=args.seed, path=args.dataset)
+    conversations = []
+    for prompt_msgs, completion_msgs in zip(prompts, completions):
+        if prejudge_conversation(completion_msgs) is None:
+            conversations.append(_format_conversation_for_judge(prompt_msgs, completion_msgs))
+    # Identical conversations would be judged once either way
+    return list(dict.fromkeys(conversations))
+
+def judge_all(model_exec: ModelExecutor, conversations: List[str], pack_size: int, max_concurrency: int) -> Dict[str, object]:
+    counting = CountingModelExecutor(model_exec)
+    judge = JudgeExecutor(
+        model_exec=counting,
+        sys_msg_path=TOOL_JUDGE_SYS_MSG_PATH,
+        max_concurrency=max_concurrency,
+        pack_size=pack_size,
+    )
+
+    async def run() -> List[Optional[JudgeResponse]]:
+        return await asyncio.gather(*(judge.run_judge_async(c) for c in conversations), return_exceptions=True)
+
+    verdicts = asyncio.run(run())
+    return {
+        "scores": [v.score if isinstance(v, JudgeResponse) else None for v in verdicts],
+        "requests": counting.requests,
+        "prompt_chars": counting.prompt_chars,
+        "fallbacks": judge.pack_stats()["fallbacks"],
+    }
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rollouts", type=int, default=200)
+    parser.add_argument("--pack-size", type=int, default=8)
+    parser.add_argument("--judge-model", default="fake", help="fake, or a JUDGE_MODEL name such as claude-3-5-haiku")
+    parser.add_argument("--max-concurrency", type=int, default=16)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--dataset", default=DEFAULT_DATASET_PATH)
+    args = parser.parse_args()
+
+    if args.judge_model == "fake":
+        model_exec: ModelExecutor = FakeModelExecutor(latency_p50=0.01, timeout=0.05, seed=args.seed)
+    else:
+        os.environ["JUDGE_MODEL"] = args.judge_model
+        model_exec = get_judge_model()
+
+    conversations = load_conversations(args)
+    single = judge_all(model_exec, conversations, pack_size=1, max_concurrency=args.max_concurrency)
+    packed = judge_all(model_exec, conversations, pack_size=args.pack_size, max_concurrency=args.max_concurrency)
+
+    pairs = [(s, p) for s, p in zip(single["scores"], packed["scores"]) if s is not None and p is not None]
+    differences = [abs(s - p) for s, p in pairs]
+    print(f"Conversations judged: {len(conversations)} ({len(pairs)} scored in both modes)")
+    for name, results in (("Single", single), (f"Packed x{args.pack_size}", packed)):
+        print(f"{name:10} {results['requests']:5} requests   {results['prompt_chars'] / max(1, len(conversations)):8.0f} prompt chars per conversation")
+    print(f"Packed entries judged on their own after a bad entry: {packed['fallbacks']}")
+    if pairs:
+        print(f"Mean absolute score difference: {statistics.mean(differences):.3f}")
+        print(f"Scores within 0.1: {sum(d <= 0.1 for d in differences) / len(pairs):.0%}")
+    if len(pairs) > 2 and len({s for s, _ in pairs}) > 1 and len({p for _, p in pairs}) > 1:
+        print(f"Score correlation: {statistics.correlation(*zip(*pairs)):.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""Synthetic rollouts built from the training dataset, for benchmarking reward functions offline."""
+import csv
+import dataclasses
+import os
+import random
+import sys
+from typing import Dict, List, Tuple
+
+import yaml
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(REPO_ROOT, "src"))
+
+from environment.tools.calculator import Expression, calculate  # noqa: E402
+from environment.tools.infix import parse_infix  # noqa: E402
+
+DEFAULT_DATASET_PATH = os.path.join(REPO_ROOT, "datasets", "calculator_train.csv")
+SYS_MSG_PATH = os.path.join(REPO_ROOT, "src", "inference", "calculator_system_message.md")
+
+# How often each kind of policy behaviour appears in generated rollouts
+BEHAVIOUR_WEIGHTS: Dict[str, float] = {
+    "correct": 0.60,
+    "wrong_answer": 0.10,
+    "no_call": 0.10,
+    "extra_text": 0.08,
+    "multiple_tags": 0.05,
+    "bad_yaml": 0.07,
+}
+
+Conversation = List[Dict[str, str]]
+
+
+def load_rows(path: str = DEFAULT_DATASET_PATH) -> List[Dict[str, str]]:
+    with open(path, newline="", encoding="utf-8") as f:
+        return list(csv.DictReader(f))
+
+def make_rollouts(
+    num_rollouts: int,
+    seed: int = 0,
+    path: str = DEFAULT_DATASET_PATH,
+) -> Tuple[List[Conversation], List[Conversation], List[str]]:
+    """
+    Returns (prompts, completions, answers) shaped like the trainer passes them to reward functions.
+
+    Rows are sampled from the dataset with replacement and each rollout gets a behaviour drawn
+    from BEHAVIOUR_WEIGHTS, so some are judged by the rule judge and some by the LLM judge.
+    """
+    rng = random.Random(seed)
+    rows = load_rows(path)
+    with open(SYS_MSG_PATH, "r", encoding="utf-8") as f:
+        sys_msg = f.read()
+
+    prompts, completions, answers = [], [], []
+    for _ in range(num_rollouts):
+        row = rng.choice(rows)
+        behaviour = rng.choices(list(BEHAVIOUR_WEIGHTS), weights=list(BEHAVIOUR_WEIGHTS.values()))[0]
+        prompts.append([{"role": "system", "content": sys_msg}, {"role": "user", "content": row["question"]}])
+        completions.append(_make_completion(row, behaviour, rng))
+        answers.append(row["answer"])
+    return prompts, completions, answers
+
+def _make_completion(row: Dict[str, str], behaviour: str, rng: random.Random) -> Conversation:
+    try:
+        expression = parse_infix(row["expression"])
+        result = calculate(expression)
+    except (ValueError, ZeroDivisionError):
+        expression, result = None, None
+
+    if behaviour == "no_call" or not isinstance(expression, Expression):
+        return [_assistant(f"The answer is {rng.uniform(-1000, 1000):.2f}.")]
+
+    call = f"<calculator>\n{_to_yaml(expression)}</calculator>"
+    if behaviour == "bad_yaml":
+        call = f"<calculator>\noperation: {expression.operation}\noperands: [{row['expression']}\n</calculator>"
+    elif behaviour == "multiple_tags":
+        call = call + "\n" + call
+    elif behaviour == "extra_text":
+        call = f"Let me work this out with the calculator.\n{call}"
+
+    if behaviour == "bad_yaml":
+        return [_assistant(call), _user("Error: Unable to parse yaml expression inside <calculator> tag."), _assistant("I could not calculate it.")]
+
+    final = result if behaviour != "wrong_answer" else result * rng.uniform(1.1, 2.0) + 1
+    return [_assistant(call), _user(f"<output>{result}</output>"), _assistant(f"The answer is {final}.")]
+
+def _to_yaml(expression: Expression) -> str:
+    return yaml.safe_dump(dataclasses.asdict(expression), sort_keys=False, default_flow_style=None)
+
+def _assistant(content: str) -> Dict[str, str]:
+    return {"role": "assistant", "content": content}
+
+def _user(content: str) -> Dict[str, str]:
+    return {"role": "user", "content": content}
@@ -0,0 +1,305 @@
+import re
+from array import array
+from functools import lru_cache
+from typing import Iterator, List, Optional, Tuple, Union
+
+import yaml
+
+from environment.tools.calculator import (
+    DEFAULT_MAX_DEPTH,
+    DEFAULT_MAX_NODES,
+    OP_ADD,
+    OP_DIVIDE,
+    OP_MULTIPLY,
+    OP_PUSH,
+    OP_SUBTRACT,
+    CompiledExpression,
+    Expression,
+    compile_expression,
+)
+from environment.tools.numeric import MAX_EXACT_FLOAT_INT
+
+
+
+def extract_agent_actions(content: str) -> Tuple[Tuple[str, str], ...]:
+    """
+    Finds all instances of <identifier>content</identifier>
+
+    Equivalent to `re.findall(r'<([^>]+)>(.*?)</\\1>', content, re.DOTALL)`.
+    """
+    return tuple((name, body) for name, body, _, _ in _iter_actions(content))
+
+def text_outside_actions(content: str) -> str:
+    """Returns the message text with every <identifier>content</identifier> block removed."""
+    parts = []
+    position = 0
+    for _, _, start, end in _iter_actions(content):
+        parts.append(content[position:start])
+        position = end
+    parts.append(content[position:])
+    return "".join(parts).strip()
+
+def extract_yaml_from_markdown(content: str) -> str:
+    """
+    Returns the contents of the first ``` or ```yaml code block, or the content unchanged if there is none.
+
+    Equivalent to searching for r'```(?:yaml)?\\s*([\\s\\S]*?)\\s*```' and stripping the group.
+    """
+    opening = content.find("```")
+    if opening == -1:
+        return content
+
+    body_start = opening + 3
+    if content.startswith("yaml", body_start):
+        body_start += 4
+
+    closing = content.find("```", body_start)
+    if closing == -1:
+        return content
+
+    return content[body_start:closing].strip()
+
+def parse_calculator_expression(action_content: str) -> Expression:
+    """
+    Parses the body of a <calculator> tag into an Expression. Raises if it is not a valid expression.
+
+    Bodies in the YAML subset shown in the system prompt are parsed directly into Expression
+    nodes. Anything else goes through PyYAML and `Expression.from_dict`, so results and
+    errors are the same as parsing everything with PyYAML. Results are cached per body.
+    """
+    expression, error = _parse_calculator_body(action_content)
+    if error is not None:
+        raise error.with_traceback(None)
+    return expression
+
+def parse_calculator_program(action_content: str) -> CompiledExpression:
+    """
+    Parses the body of a <calculator> tag straight into a CompiledExpression.
+
+    Bodies in the YAML subset are emitted as postfix arrays while they are parsed, without
+    building Expression nodes, for holding many parsed calls at once, e.g. in an
+    ExpressionTable. Results and errors are the same as compiling `parse_calculator_expression`.
+    Not cached, since bodies in bulk rescoring rarely repeat.
+    """
+    try:
+        return _ProgramYAMLParser(extract_yaml_from_markdown(action_content)).parse_program()
+    except _UnsupportedYAML:
+        return compile_expression(parse_calculator_expression(action_content))
+
+
+def _iter_actions(content: str) -> Iterator[Tuple[str, str, int, int]]:
+    """
+    Yields (identifier, body, start, end) for each non-overlapping <identifier>body</identifier>.
+
+    An identifier runs from '<' to the next '>', so each '<' has exactly one candidate tag and
+    its body ends at the first matching closing tag. Identifiers that have no closing tag after
+    some position can never close later, so each one is only searched for once.
+    """
+    unclosed = set()
+    position = content.find("<")
+    while position != -1:
+        name_end = content.find(">", position + 1)
+        if name_end == -1:
+            return
+
+        name = content[position + 1:name_end]
+        if name and name not in unclosed:
+            closing_tag = f"</{name}>"
+            closing = content.find(closing_tag, name_end + 1)
+            if closing != -1:
+                end = closing + len(closing_tag)
+                yield name, content[name_end + 1:closing], position, end
+                position = content.find("<", end)
+                continue
+            unclosed.add(name)
+
+        position = content.find("<", position + 1)
+
+
+@lru_cache(maxsize=4096)
+def _parse_calculator_body(action_content: str) -> Tuple[Optional[Expression], Optional[Exception]]:
+    yaml_content = extract_yaml_from_markdown(action_content)
+    try:
+        return _ExpressionYAMLParser(yaml_content).parse(), None
+    except _UnsupportedYAML:
+        pass
+
+    try:
+        parsed_yaml = yaml.safe_load(yaml_content)
+        return Expression.from_dict(parsed_yaml), None
+    except Exception as e:
+        return None, e
+
+
+class _UnsupportedYAML(Exception):
+    """Raised when YAML falls outside the subset `_ExpressionYAMLParser` handles."""
+
+
+# Plain scalars that PyYAML resolves to numbers, restricted to the forms without ambiguity
+_YAML_INT = re.compile(r"[-+]?(?:0|[1-9][0-9]*)")
+_YAML_FLOAT = re.compile(r"[-+]?[0-9]+\.[0-9]*(?:[eE][-+][0-9]+)?")
+_YAML_KEY = re.compile(r"(operation|operands):(?: +(.*))?")
+_OPERATIONS = {"add", "subtract", "multiply", "divide"}
+_OPCODES = {"add": OP_ADD, "subtract": OP_SUBTRACT, "multiply": OP_MULTIPLY, "divide": OP_DIVIDE}
+# Characters that introduce YAML features outside the subset (comments, anchors, tags, block scalars,
+# flow mappings...) or that PyYAML treats as line breaks
+_UNSUPPORTED_CHARACTERS = set("\t\r#&*!|>%@`{}\\\x85\u2028\u2029\ufeff")
+
+
+class _ExpressionYAMLParser:
+    """
+    Parses the restricted YAML used for calculator calls straight into Expression nodes:
+
+        operation: add
+        operands:
+          - 5
+          - operation: multiply
+            operands: [3, 4]
+
+    Raises `_UnsupportedYAML` for anything it is not certain PyYAML would read the same way,
+    including every invalid expression, so callers can fall back to PyYAML.
+    """
+
+    def __init__(self, text: str):
+        if any(char in _UNSUPPORTED_CHARACTERS for char in text):
+            raise _UnsupportedYAML()
+
+        self.lines: List[Tuple[int, str]] = []
+        for line in text.split("\n"):
+            stripped = line.strip(" ")
+            if stripped:
+                self.lines.append((len(line) - len(line.lstrip(" ")), stripped))
+        self.position = 0
+
+    def parse(self) -> Expression:
+        if not self.lines or self.lines[0][1].startswith(("---", "...")):
+            raise _UnsupportedYAML()
+
+        expression = self._parse_mapping(column=self.lines[0][0], depth=1)
+        if self.position != len(self.lines):
+            raise _UnsupportedYAML()
+        return expression
+
+    def _parse_mapping(self, column: int, depth: int, inline_text: Optional[str] = None) -> Expression:
+        """Parses an expression mapping whose keys sit at `column`. `inline_text` is the text after a sequence dash."""
+        if depth > DEFAULT_MAX_DEPTH:
+            raise _UnsupportedYAML()
+
+        fields = {}
+        while self.position < len(self.lines):
+            if inline_text is not None:
+                text, inline_text = inline_text, None
+            else:
+                indent, text = self.lines[self.position]
+                if indent < column:
+                    break
+                if indent > column or text.startswith("-"):
+                    raise _UnsupportedYAML()
+            self.position += 1
+
+            match = _YAML_KEY.fullmatch(text)
+            if match is None or match.group(1) in fields:
+                raise _UnsupportedYAML()
+
+            key, value = match.group(1), match.group(2)
+            if key == "operation":
+                fields[key] = self._parse_operation(value)
+            else:
+                fields[key] = self._parse_operands(value, column, depth)
+
+        if len(fields) != 2:
+            raise _UnsupportedYAML()
+        return self._build(fields["operation"], fields["operands"])
+
+    def _build(self, operation: str, operands: List[Union[Expression, float, int]]) -> Expression:
+        return Expression(operation=operation, operands=operands)
+
+    @staticmethod
+    def _parse_operation(value: Optional[str]) -> str:
+        if value is None:
+            raise _UnsupportedYAML()
+        if len(value) >= 2 and value[0] == value[-1] and value[0] in "\"'":
+            value = value[1:-1]
+        if value not in _OPERATIONS:
+            raise _UnsupportedYAML()
+        return value
+
+    def _parse_operands(self, value: Optional[str], column: int, depth: int) -> List[Union[Expression, float, int]]:
+        if value is not None:
+            return self._parse_flow_sequence(value)
+
+        if self.position >= len(self.lines):
+            raise _UnsupportedYAML()
+        dash_column, text = self.lines[self.position]
+        if dash_column < column or not text.startswith("- "):
+            raise _UnsupportedYAML()
+
+        operands: List[Union[Expression, float, int]] = []
+        while self.position < len(self.lines):
+            indent, text = self.lines[self.position]
+            if indent < dash_column or (indent == dash_column == column and not text.startswith("-")):
+                break
+            if indent != dash_column or not text.startswith("- "):
+                raise _UnsupportedYAML()
+
+            item = text[2:].lstrip(" ")
+            if _YAML_KEY.match(item):
+                item_column = indent + len(text) - len(item)
+                operands.append(self._parse_mapping(item_column, depth + 1, inline_text=item))
+            else:
+                operands.append(self._parse_number(item))
+                self.position += 1
+        return operands
+
+    def _parse_flow_sequence(self, value: str) -> List[Union[float, int]]:
+        if not (value.startswith("[") and value.endswith("]")):
+            raise _UnsupportedYAML()
+        inner = value[1:-1].strip(" ")
+        if not inner:
+            return []
+        return [self._parse_number(item.strip(" ")) for item in inner.split(",")]
+
+    @staticmethod
+    def _parse_number(text: str) -> Union[float, int]:
+        if _YAML_INT.fullmatch(text):
+            return int(text)
+        if _YAML_FLOAT.fullmatch(text):
+            return float(text)
+        raise _UnsupportedYAML()
+
+
+class _ProgramYAMLParser(_ExpressionYAMLParser):
+    """
+    Parses the same YAML subset into postfix arrays as it goes.
+
+    Operands are parsed in order and every mapping is closed after its operands, so numbers
+    are pushed when they are read and each operation is emitted when its mapping ends. Literals
+    that need more than the float arrays (integers beyond 2**53) and expressions over the node
+    limit are left to `compile_expression`.
+    """
+
+    def __init__(self, text: str):
+        super().__init__(text)
+        self.opcodes = array("B")
+        self.args = array("q")
+        self.constants = array("d")
+
+    def parse_program(self) -> CompiledExpression:
+        self.parse()
+        # Checked once at the end: the text already bounds the work done while parsing
+        if len(self.opcodes) > DEFAULT_MAX_NODES:
+            raise _UnsupportedYAML()
+        return CompiledExpression(opcodes=self.opcodes, args=self.args, constants=self.constants)
+
+    def _build(self, operation: str, operands: List[Union[Expression, float, int]]) -> None:
+        self.opcodes.append(_OPCODES[operation])
+        self.args.append(len(operands))
+
+    def _parse_number(self, text: str) -> Union[float, int]:
+        value = _ExpressionYAMLParser._parse_number(text)
+        if type(value) is int and not -MAX_EXACT_FLOAT_INT <= value <= MAX_EXACT_FLOAT_INT:
+            raise _UnsupportedYAML()
+        self.opcodes.append(OP_PUSH)
+        self.args.append(len(self.constants))
+        self.constants.append(value)
+        return value
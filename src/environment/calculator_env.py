@@ -1,78 +1,88 @@
-import re
-from typing import Any, Dict, List, Optional, Tuple
+import os
+from typing import Any, Dict, List
 
-import yaml
-from rewards.calculator_reward_func import judge_tool_use, verify_correctness
+from rewards.calculator_reward_func import (
+    judge_tool_use,
+    prefetch_rollout_rewards,
+    reference_answers,
+    verify_correctness,
+    verify_grounded_answer,
+)
 from verifiers import RewardFunc
 from verifiers.envs.multiturn_env import MultiTurnEnv
 
-from environment.tools.calculator import Expression, calculate
+from environment.parsed_turn import ParsedTurn, parse_turn
+from environment.tools.numeric import format_result
+from metrics.step_metrics import step_metrics
 
+JUDGE_REWARD_WEIGHT = 0.80
+CORRECTNESS_REWARD_WEIGHT = 0.20
+# Share of the judge's weight given to the deterministic grounded correctness checks instead
+GROUNDED_REWARD_WEIGHT = min(max(float(os.getenv("GROUNDED_REWARD_WEIGHT", "0")), 0.0), JUDGE_REWARD_WEIGHT)
 
 
 class CalculatorEnv(MultiTurnEnv):
+    def __init__(self, *args: Any, **kwargs: Any):
+        super().__init__(*args, **kwargs)
+        # Parse each correct answer once rather than for every generation that is verified
+        if self.dataset is not None and "answer" in self.dataset.column_names:
+            reference_answers.add(self.dataset["answer"])
+
     def get_reward_funcs(self, **kwargs: Any) -> List[RewardFunc]:
+        if GROUNDED_REWARD_WEIGHT > 0:
+            return [judge_tool_use, verify_correctness, verify_grounded_answer]
         return [judge_tool_use, verify_correctness]
 
     def get_reward_weights(self, **kwargs: Any) -> List[float]:
-       return [0.80, 0.20]
+        if GROUNDED_REWARD_WEIGHT > 0:
+            return [JUDGE_REWARD_WEIGHT - GROUNDED_REWARD_WEIGHT, CORRECTNESS_REWARD_WEIGHT, GROUNDED_REWARD_WEIGHT]
+        return [JUDGE_REWARD_WEIGHT, CORRECTNESS_REWARD_WEIGHT]
 
     def is_completed(self, messages: List[Dict[str, str]], **kwargs: Any) -> bool:       
         """Checks if the response is complete. The response is considered complete if it contains a valid action."""       
-        content = messages[-1]["content"]       
-        action_id, _ = self._extract_agent_action(content)
+        turn = self._parse_last_turn(messages)
 
-        if action_id == "calculator":
+        if turn.action_id == "calculator":
             return False
+
+        # Start judging now, overlapping with the rollouts still generating
+        prefetch_rollout_rewards(messages)
         return True
     
     def _build_env_resp_dict(self, content: str) -> Dict[str, str]:
         return {"role": "user", "content": content}
 
     def env_response(self, messages: List[Dict[str, str]], **kwargs: Any) -> Dict[str, str]:
-        content = messages[-1]["content"]
-        action_id, action_content = self._extract_agent_action(content)
-        if action_id == "calculator":
-
-            try:
-                yaml_content = _extract_yaml_from_markdown(action_content)
-                parsed_yaml = yaml.safe_load(yaml_content)
-                expression = Expression.from_dict(parsed_yaml)
-            except Exception as e:
-                self.logger.debug(f"Failed to parse calculator expression: {e}")
+        with step_metrics.timer("env/env_response"):
+            return self._env_response(messages)
+
+    def _env_response(self, messages: List[Dict[str, str]]) -> Dict[str, str]:
+        turn = self._parse_last_turn(messages)
+        if turn.action_id == "calculator":
+
+            if turn.parse_error is not None:
+                self.logger.debug(f"Failed to parse calculator expression: {turn.parse_error}")
+                step_metrics.increment("env/parse_errors")
                 return self._build_env_resp_dict("Error: Unable to parse yaml expression inside <calculator> tag.")
             
-            try:
-                result = calculate(expression)
-                result_str = f"<output>{result}</output>"
-                return self._build_env_resp_dict(result_str)
-            except Exception as e:
-                self.logger.debug(f"Failed to calculate expression: {e}")
-                return self._build_env_resp_dict(f"Error: Unable to calculate the expression. Details: {str(e)[0:100]}")
+            result, error = turn.calculation
+            if error is not None:
+                self.logger.debug(f"Failed to calculate expression: {error}")
+                step_metrics.increment("env/calculate_errors")
+                return self._build_env_resp_dict(f"Error: Unable to calculate the expression. Details: {str(error)[0:100]}")
+
+            result_str = f"<output>{format_result(result)}</output>"
+            return self._build_env_resp_dict(result_str)
             
+        step_metrics.increment("env/missing_calculator_tag")
         return self._build_env_resp_dict("Error: No <calculator> tag found in the response.")
 
 
-    def _extract_agent_action(self, content: str) -> Tuple[Optional[str], Optional[str]]:
-        """Finds all instances of <identifier>content</identifier> """
-        pattern = r'<([^>]+)>(.*?)</\1>'
-        matches = re.findall(pattern, content, re.DOTALL)
+    def _parse_last_turn(self, messages: List[Dict[str, str]]) -> ParsedTurn:
+        """Parses the last message. The parse is cached, so both env hooks share it."""
+        turn = parse_turn(messages[-1]["content"])
 
-        if not matches:
-            return None, None
+        if turn.tag_count > 1:
+            self.logger.debug(f"Multiple tags. All tags found: {[action[0] for action in turn.actions]}")
         
-        if len(matches) > 1:
-            self.logger.debug(f"Multiple tags. All tags found: {[match[0] for match in matches]}")
-        
-        return matches[0]
-    
-def _extract_yaml_from_markdown(content: str) -> str:
-    # Pattern to match code blocks with optional yaml specification
-    # This matches: ```yaml ... ``` or ``` ... ``` or just raw content
-    pattern = r'```(?:yaml)?\s*([\s\S]*?)\s*```'
-    
-    match = re.search(pattern, content)
-    if match:
-        return match.group(1).strip()
-    
-    return content
\ No newline at end of file
+        return turn
@@ -0,0 +1,123 @@
+import os
+from dataclasses import dataclass
+from functools import cached_property, lru_cache
+from typing import Optional, Tuple
+
+from environment.action_parser import extract_agent_actions, parse_calculator_expression, text_outside_actions
+from environment.tools.calculator import Expression, calculate
+from environment.tools.canonical import CALCULATION_CACHE_SIZE as DEFAULT_CALCULATION_CACHE_SIZE
+from environment.tools.canonical import CalculationCache, CanonicalExpression, canonicalize
+from environment.tools.calculator_pool import get_calculator_pool
+from environment.tools.numeric import DEFAULT_DECIMAL_PRECISION, Number, numeric_backend
+from metrics.step_metrics import step_metrics
+from rewards.verifiers.answer_verifier import extract_final_number
+
+PARSED_TURN_CACHE_SIZE = 8192
+# Arithmetic the env calculates tool calls with: "float", "decimal" or "fraction"
+CALCULATOR_NUMBERS = numeric_backend(
+    os.getenv("CALCULATOR_NUMBERS", "float"),
+    precision=int(os.getenv("CALCULATOR_DECIMAL_PRECISION", str(DEFAULT_DECIMAL_PRECISION))),
+)
+# Results shared by calls that compile to the same program, off when 0. Unset, the cache is on
+# where it pays off: in front of the sandboxed pool or an exact backend, which cost more per call
+# than looking up the result. Inline float calculations are as cheap as the lookup
+_CALCULATIONS_ARE_COSTLY = int(os.getenv("CALCULATOR_POOL_WORKERS", "0")) > 0 or os.getenv("CALCULATOR_NUMBERS", "float") != "float"
+CALCULATION_CACHE_SIZE = int(os.getenv("CALCULATOR_CACHE_SIZE") or (DEFAULT_CALCULATION_CACHE_SIZE if _CALCULATIONS_ARE_COSTLY else 0))
+calculation_cache = CalculationCache(CALCULATION_CACHE_SIZE) if CALCULATION_CACHE_SIZE > 0 else None
+
+
+@dataclass
+class ParsedTurn:
+    """
+    Everything the env and reward functions need to know about one assistant message.
+
+    Built once per distinct message content by `parse_turn`, so `is_completed`, `env_response`,
+    the rule judge and the answer verifier all share the same parse. The calculation and the
+    final answer are only computed when first asked for.
+    """
+
+    content: str
+    actions: Tuple[Tuple[str, str], ...]
+    expression: Optional[Expression] = None
+    parse_error: Optional[Exception] = None
+
+    @property
+    def action_id(self) -> Optional[str]:
+        """Identifier of the first tag, which is the one the env acts on."""
+        return self.actions[0][0] if self.actions else None
+
+    @property
+    def action_content(self) -> Optional[str]:
+        return self.actions[0][1] if self.actions else None
+
+    @property
+    def tag_count(self) -> int:
+        return len(self.actions)
+
+    @property
+    def calls_calculator(self) -> bool:
+        """Whether any tag in the message is a calculator call."""
+        return any(action_id == "calculator" for action_id, _ in self.actions)
+
+    @cached_property
+    def extra_text(self) -> str:
+        """Message text outside of the tags."""
+        return text_outside_actions(self.content)
+
+    @cached_property
+    def calculation(self) -> Tuple[Optional[Number], Optional[Exception]]:
+        """
+        (result, error) of calculating the parsed expression. Both are None if nothing was parsed.
+
+        Uses the CALCULATOR_NUMBERS backend, in the sandboxed calculator pool when
+        CALCULATOR_POOL_WORKERS is set, and behind the calculation cache unless
+        CALCULATION_CACHE_SIZE is 0.
+        """
+        if self.expression is None:
+            return None, None
+        pool = get_calculator_pool()
+        calculate_fn = pool.calculate if pool is not None else calculate
+        try:
+            with step_metrics.timer("calculator/calculate"):
+                if calculation_cache is not None:
+                    return calculation_cache.calculate(self.expression, numbers=CALCULATOR_NUMBERS, calculate_fn=calculate_fn), None
+                return calculate_fn(self.expression, numbers=CALCULATOR_NUMBERS), None
+        except Exception as e:
+            step_metrics.increment("calculator/errors")
+            return None, e
+
+    @cached_property
+    def canonical(self) -> Optional[CanonicalExpression]:
+        """The parsed expression in canonical form, or None if nothing was parsed or it is invalid."""
+        if self.expression is None:
+            return None
+        try:
+            return canonicalize(self.expression)
+        except (ValueError, TypeError):
+            return None
+
+    @property
+    def canonical_hash(self) -> Optional[str]:
+        """
+        Hash of the canonical expression, equal for calls that only differ in operand order,
+        nesting of sums and products, or identity operands. Stable across processes.
+        """
+        return self.canonical.digest if self.canonical is not None else None
+
+    @cached_property
+    def final_number(self) -> Optional[float]:
+        """The last number in the message, as read by the answer verifier."""
+        return extract_final_number(self.content)
+
+
+@lru_cache(maxsize=PARSED_TURN_CACHE_SIZE)
+def parse_turn(content: str) -> ParsedTurn:
+    """Returns the ParsedTurn for a message's content, parsing it only the first time it is seen."""
+    turn = ParsedTurn(content=content, actions=extract_agent_actions(content))
+
+    if turn.action_id == "calculator":
+        try:
+            turn.expression = parse_calculator_expression(turn.action_content)
+        except Exception as e:
+            turn.parse_error = e
+    return turn
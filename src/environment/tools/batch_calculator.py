@@ -0,0 +1,161 @@
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+from environment.tools.calculator import (
+    DEFAULT_MAX_DEPTH,
+    DEFAULT_MAX_NODES,
+    OP_ADD,
+    OP_DIVIDE,
+    OP_MULTIPLY,
+    OP_PUSH,
+    OP_RAISE,
+    OP_SUBTRACT,
+    CompiledExpression,
+    Expression,
+    compile_expression,
+)
+from environment.tools.infix import parse_infix
+
+
+
+@dataclass
+class BatchCalculation:
+    """Results of `calculate_batch`. `values[i]` is NaN wherever `errors[i]` is set."""
+
+    values: np.ndarray
+    errors: List[Optional[Exception]]
+
+    def __len__(self) -> int:
+        return len(self.errors)
+
+    def result(self, index: int) -> float:
+        """Returns the result for one expression, raising its error as `calculate` would."""
+        error = self.errors[index]
+        if error is not None:
+            raise error
+        return float(self.values[index])
+
+
+def calculate_batch(
+    expressions: Sequence[Union[Expression, CompiledExpression, float, int]],
+    max_depth: Optional[int] = DEFAULT_MAX_DEPTH,
+    max_nodes: Optional[int] = DEFAULT_MAX_NODES,
+) -> BatchCalculation:
+    """
+    Calculates many expressions, evaluating structurally identical ones together as NumPy columns.
+
+    Expressions that compile to the same postfix program (same operations and nesting, any
+    constants) form one group. Each group is evaluated once with every operation applied to a
+    whole column of rows, in the same order as `calculate`, so each value matches `calculate`
+    exactly. Errors are tracked per row and the first error a row hits is the one reported.
+    """
+    values = np.full(len(expressions), np.nan)
+    errors: List[Optional[Exception]] = [None] * len(expressions)
+    groups: Dict[Tuple[bytes, bytes], List[Tuple[int, CompiledExpression]]] = {}
+
+    for index, expression in enumerate(expressions):
+        try:
+            if isinstance(expression, (int, float)):
+                values[index] = float(expression)
+                continue
+            if isinstance(expression, Expression):
+                expression = compile_expression(expression, max_depth=max_depth, max_nodes=max_nodes)
+            elif not isinstance(expression, CompiledExpression):
+                raise TypeError(f"Unsupported expression type: {type(expression)}")
+
+            if OP_RAISE in expression.opcodes:
+                # The error is part of the program, so evaluating it raises at the right point
+                values[index] = expression.evaluate()
+                continue
+        except Exception as e:
+            errors[index] = e
+            continue
+
+        signature = (expression.opcodes.tobytes(), expression.args.tobytes())
+        groups.setdefault(signature, []).append((index, expression))
+
+    for members in groups.values():
+        indices = [index for index, _ in members]
+        group_values, group_errors = _evaluate_group([program for _, program in members])
+        values[indices] = group_values
+        for index, error in zip(indices, group_errors):
+            errors[index] = error
+
+    return BatchCalculation(values=values, errors=errors)
+
+def calculate_infix_batch(sources: Sequence[str]) -> BatchCalculation:
+    """
+    Calculates infix arithmetic strings, e.g. to recompute a dataset's `answer` column
+    from its `expression` column.
+    """
+    expressions: List[Union[Expression, float, int]] = []
+    parse_errors: Dict[int, Exception] = {}
+    for index, source in enumerate(sources):
+        try:
+            expressions.append(parse_infix(source))
+        except ValueError as e:
+            parse_errors[index] = e
+            expressions.append(0)
+
+    calculation = calculate_batch(expressions)
+    for index, error in parse_errors.items():
+        calculation.values[index] = np.nan
+        calculation.errors[index] = error
+    return calculation
+
+def _evaluate_group(programs: List[CompiledExpression]) -> Tuple[np.ndarray, List[Optional[Exception]]]:
+    """Evaluates programs that share opcodes and args, one column operation per instruction."""
+    template = programs[0]
+    num_rows = len(programs)
+    constants = np.array([np.frombuffer(program.constants, dtype=np.float64) for program in programs]).T
+    error_messages: List[Optional[Tuple[type, str]]] = [None] * num_rows
+    has_error = np.zeros(num_rows, dtype=bool)
+
+    def record_error(mask: np.ndarray, error_type: type, message: str) -> None:
+        for row in np.flatnonzero(mask & ~has_error):
+            error_messages[row] = (error_type, message)
+        has_error[mask] = True
+
+    stack: List[np.ndarray] = []
+    with np.errstate(all="ignore"):
+        for opcode, arg in zip(template.opcodes, template.args):
+            if opcode == OP_PUSH:
+                stack.append(constants[arg])
+                continue
+
+            start = len(stack) - arg
+            operands = stack[start:]
+            del stack[start:]
+
+            if opcode == OP_ADD:
+                # sum() starts from 0, which turns a leading -0.0 into 0.0
+                result = np.zeros(num_rows)
+                for operand in operands:
+                    result = result + operand
+            elif opcode == OP_SUBTRACT:
+                result = operands[0] if operands else np.zeros(num_rows)
+                for operand in operands[1:]:
+                    result = result - operand
+            elif opcode == OP_MULTIPLY:
+                result = np.ones(num_rows)
+                for operand in operands:
+                    result = result * operand
+            elif opcode == OP_DIVIDE:
+                if not operands:
+                    record_error(np.ones(num_rows, dtype=bool), ValueError, "Division requires at least one operand")
+                    result = np.full(num_rows, np.nan)
+                else:
+                    result = operands[0]
+                    for operand in operands[1:]:
+                        record_error(operand == 0.0, ZeroDivisionError, "Division by zero")
+                        result = result / operand
+            else:
+                raise ValueError(f"Unexpected opcode in compiled expression: {opcode}")
+
+            stack.append(result)
+
+    values = np.where(has_error, np.nan, stack[0])
+    errors = [None if error is None else error[0](error[1]) for error in error_messages]
+    return values, errors
@@ -1,10 +1,13 @@
+from array import array
 from dataclasses import dataclass
-from typing import Any, List, Literal, Union, Dict, Callable
+from typing import Any, List, Literal, Optional, Tuple, Type, Union, Dict, Callable
 
+from environment.tools.numeric import MAX_EXACT_FLOAT_INT, FloatNumbers, Number, NumericBackend
 
-@dataclass
+
+@dataclass(slots=True)
 class Expression:
-    """Represents a mathematical expression or sub-expression."""
+    """Represents a mathematical expression or sub-expression. Slotted, so nodes carry no __dict__."""
 
     operation: Literal[
         "add",
@@ -81,39 +84,219 @@ def _divide(operands: List[float]) -> float:
         result /= operand
     return result
 
-_operations: Dict[str, Callable[[List[float]], float]] = {
-    "add": _add,
-    "subtract": _subtract,
-    "multiply": _multiply,
-    "divide": _divide,
+# Opcodes of a compiled expression. Operations take the number of operands from their argument.
+OP_PUSH = 0
+OP_ADD = 1
+OP_SUBTRACT = 2
+OP_MULTIPLY = 3
+OP_DIVIDE = 4
+OP_RAISE = 5
+
+_opcodes: Dict[str, int] = {
+    "add": OP_ADD,
+    "subtract": OP_SUBTRACT,
+    "multiply": OP_MULTIPLY,
+    "divide": OP_DIVIDE,
 }
+_opcode_funcs: Tuple[Optional[Callable[[List[float]], float]], ...] = (None, _add, _subtract, _multiply, _divide)
+_operation_names: Tuple[Optional[str], ...] = (None, "add", "subtract", "multiply", "divide")
+
+DEFAULT_MAX_DEPTH = 64
+DEFAULT_MAX_NODES = 10_000
+
+
+@dataclass(frozen=True, slots=True)
+class CompiledExpression:
+    """
+    An expression flattened into postfix order.
+
+    `opcodes[i]` is applied with `args[i]`: a constant index for OP_PUSH, an operand count for
+    operations, or an error index for OP_RAISE. Errors that the recursive evaluator would raise
+    part-way through (unsupported operations or operand types) are compiled into OP_RAISE so they
+    surface at the same point during evaluation. Integer constants too large to be exact in a
+    double are also kept in `big_integers`, as (constant index, value), for the exact backends.
+    """
+
+    opcodes: array
+    args: array
+    constants: array
+    errors: Tuple[Tuple[Type[Exception], str], ...] = ()
+    big_integers: Tuple[Tuple[int, int], ...] = ()
+
+    def evaluate(self, numbers: Optional[NumericBackend] = None) -> Number:
+        """Evaluates the program with an explicit stack, with floats unless another backend is given."""
+        if numbers is not None and not isinstance(numbers, FloatNumbers):
+            return self._evaluate_exact(numbers)
+
+        stack: List[float] = []
+        constants = self.constants
+        for opcode, arg in zip(self.opcodes, self.args):
+            if opcode == OP_PUSH:
+                stack.append(constants[arg])
+            elif opcode == OP_RAISE:
+                error_type, message = self.errors[arg]
+                raise error_type(message)
+            else:
+                start = len(stack) - arg
+                operands = stack[start:]
+                del stack[start:]
+                stack.append(_opcode_funcs[opcode](operands))
+        return stack[0]
+
+    def to_expression(self) -> Union[Expression, float, int]:
+        """
+        Rebuilds the program as an Expression tree, which calculates to the same result.
+
+        Constants come back as floats, except integers kept exactly in `big_integers`.
+
+        Raises:
+            ValueError: If the program has compiled errors, which do not record the original nodes.
+        """
+        if self.errors:
+            raise ValueError("A program with compiled errors cannot be rebuilt as an Expression")
+        big_integers = dict(self.big_integers)
+        constants = self.constants
+        stack: List[Any] = []
+        for opcode, arg in zip(self.opcodes, self.args):
+            if opcode == OP_PUSH:
+                stack.append(big_integers.get(arg, constants[arg]))
+            else:
+                start = len(stack) - arg
+                operands = stack[start:]
+                del stack[start:]
+                stack.append(Expression(operation=_operation_names[opcode], operands=operands))
+        return stack[0]
+
+    def _evaluate_exact(self, numbers: Any) -> Number:
+        operations = (None, numbers.add, numbers.subtract, numbers.multiply, numbers.divide)
+        # Each constant is converted once, however often the program pushes it
+        constants = [numbers.constant(value) for value in self.constants]
+        for index, value in self.big_integers:
+            constants[index] = value
+
+        stack: List[Any] = []
+        for opcode, arg in zip(self.opcodes, self.args):
+            if opcode == OP_PUSH:
+                stack.append(constants[arg])
+            elif opcode == OP_RAISE:
+                error_type, message = self.errors[arg]
+                raise error_type(message)
+            else:
+                start = len(stack) - arg
+                operands = stack[start:]
+                del stack[start:]
+                stack.append(operations[opcode](operands))
+        return numbers.result(stack[0])
+
 
-def calculate(expression: Union[Expression, float, int]) -> float:
+def compile_expression(
+    expression: Expression,
+    max_depth: Optional[int] = DEFAULT_MAX_DEPTH,
+    max_nodes: Optional[int] = DEFAULT_MAX_NODES,
+) -> CompiledExpression:
     """
-    Calculates the result of the given expression recursively.
+    Compiles an Expression into a CompiledExpression without recursion.
 
     Args:
-        expression: An Expression object, float, or int to evaluate.
+        expression: The Expression to compile.
+        max_depth: Maximum nesting depth, counting the root expression as 1. None for no limit.
+        max_nodes: Maximum number of expressions and operands in the tree. None for no limit.
+
+    Raises:
+        ValueError: If the expression exceeds `max_depth` or `max_nodes`.
+    """
+    opcodes = array("B")
+    args = array("q")
+    constants = array("d")
+    errors: List[Tuple[Type[Exception], str]] = []
+    big_integers: List[Tuple[int, int]] = []
+
+    def emit_error(error_type: Type[Exception], message: str) -> None:
+        opcodes.append(OP_RAISE)
+        args.append(len(errors))
+        errors.append((error_type, message))
+
+    num_nodes = 0
+    # Entries are (node, depth, operands already emitted)
+    pending: List[Tuple[Any, int, bool]] = [(expression, 1, False)]
+    while pending:
+        node, depth, operands_emitted = pending.pop()
+
+        if operands_emitted:
+            opcode = _opcodes.get(node.operation)
+            if opcode is None:
+                emit_error(ValueError, f"Unsupported operation: {node.operation}")
+            else:
+                opcodes.append(opcode)
+                args.append(len(node.operands))
+            continue
+
+        num_nodes += 1
+        if max_nodes is not None and num_nodes > max_nodes:
+            raise ValueError(f"Expression exceeds the maximum of {max_nodes} nodes")
+
+        if isinstance(node, (int, float)):
+            try:
+                constants.append(float(node))
+            except OverflowError as e:
+                emit_error(OverflowError, str(e))
+                continue
+            opcodes.append(OP_PUSH)
+            args.append(len(constants) - 1)
+            if isinstance(node, int) and not -MAX_EXACT_FLOAT_INT <= node <= MAX_EXACT_FLOAT_INT:
+                big_integers.append((len(constants) - 1, node))
+        elif isinstance(node, Expression):
+            if max_depth is not None and depth > max_depth:
+                raise ValueError(f"Expression exceeds the maximum depth of {max_depth}")
+            pending.append((node, depth, True))
+            for operand in reversed(node.operands):
+                pending.append((operand, depth + 1, False))
+        else:
+            emit_error(TypeError, f"Unsupported expression type: {type(node)}")
+
+    return CompiledExpression(
+        opcodes=opcodes, args=args, constants=constants, errors=tuple(errors), big_integers=tuple(big_integers)
+    )
+
+
+def calculate(
+    expression: Union[Expression, CompiledExpression, float, int],
+    max_depth: Optional[int] = DEFAULT_MAX_DEPTH,
+    max_nodes: Optional[int] = DEFAULT_MAX_NODES,
+    numbers: Optional[NumericBackend] = None,
+) -> Number:
+    """
+    Calculates the result of the given expression.
+
+    Expressions are compiled to postfix form and evaluated with an explicit stack, so deeply
+    nested expressions cannot hit Python's recursion limit. Results and errors are identical
+    to evaluating the tree recursively.
+
+    Args:
+        expression: An Expression object, CompiledExpression, float, or int to evaluate.
+        max_depth: Maximum nesting depth of an Expression. None for no limit.
+        max_nodes: Maximum number of expressions and operands in an Expression. None for no limit.
+        numbers: The numeric backend from `environment.tools.numeric`. None for floats.
 
     Returns:
-        The calculated result as a float.
+        The calculated result: a float, or a Decimal or Fraction with those backends.
 
     Raises:
-        ValueError: If an unsupported operation is encountered or if
-                    an operation receives an invalid number of operands.
+        ValueError: If an unsupported operation is encountered, if
+                    an operation receives an invalid number of operands, or
+                    if the expression exceeds `max_depth` or `max_nodes`.
         ZeroDivisionError: If division by zero occurs.
         TypeError: If the input is not an Expression, float, or int.
     """
     if isinstance(expression, (int, float)):
-        return float(expression)
-
-    if isinstance(expression, Expression):
-        evaluated_operands: List[float] = [calculate(operand) for operand in expression.operands]
+        if numbers is None or isinstance(numbers, FloatNumbers):
+            return float(expression)
+        return numbers.result(expression if isinstance(expression, int) else numbers.constant(expression))
 
-        operation_func = _operations.get(expression.operation)
-        if operation_func is None:
-            raise ValueError(f"Unsupported operation: {expression.operation}")
+    if isinstance(expression, CompiledExpression):
+        return expression.evaluate(numbers)
 
-        return operation_func(evaluated_operands)
+    if isinstance(expression, Expression):
+        return compile_expression(expression, max_depth=max_depth, max_nodes=max_nodes).evaluate(numbers)
 
     raise TypeError(f"Unsupported expression type: {type(expression)}")
@@ -0,0 +1,330 @@
+import atexit
+import multiprocessing
+import os
+import queue
+import resource
+import signal
+import sys
+import threading
+import types
+from concurrent.futures import Future
+from contextlib import contextmanager
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Type, Union
+
+from environment.tools.calculator import (
+    DEFAULT_MAX_DEPTH,
+    DEFAULT_MAX_NODES,
+    CompiledExpression,
+    Expression,
+    calculate,
+    compile_expression,
+)
+from environment.tools.numeric import Number, NumericBackend
+
+DEFAULT_CPU_TIME_LIMIT = 1.0
+DEFAULT_MEMORY_LIMIT_MB = 1024
+DEFAULT_MAX_BATCH_SIZE = 16
+
+# Errors a worker can report, rebuilt with their type in the env process
+_ERROR_TYPES: Dict[str, Type[Exception]] = {
+    error_type.__name__: error_type
+    for error_type in (ValueError, TypeError, ZeroDivisionError, OverflowError, ArithmeticError, MemoryError)
+}
+
+# Serializes swapping out `__main__` while workers start
+_main_module_lock = threading.Lock()
+# (result, (error type name, message)) for one calculation, sent back by a worker
+WorkerResult = Tuple[Optional[Number], Optional[Tuple[str, str]]]
+# A calculation waiting for a worker: the program, its numeric backend and the caller's Future
+PendingCalculation = Tuple[CompiledExpression, Optional[NumericBackend], Future]
+
+
+class CalculatorTimeout(TimeoutError):
+    """A calculation ran past its CPU time limit, or its worker stopped responding."""
+
+
+class CalculatorPool:
+    """
+    Runs calculations in separate, resource limited worker processes.
+
+    Workers are started when the pool is created and kept warm. Each calculation may use at
+    most `cpu_time_limit` seconds of CPU time, and each worker at most `memory_limit_mb` of
+    address space. A worker that crashes or stops responding is replaced, failing only the
+    calculation it was running, so one pathological expression cannot stall the others.
+
+    Calls made while workers are busy, e.g. from the env's rollout threads, queue up and are
+    sent to the next free worker together, up to `max_batch_size` per message. Expressions
+    are compiled in the caller, so only flat CompiledExpression arrays and numeric results
+    cross the process boundary. Workers do not import the caller's main script, so it needs
+    no `if __name__ == "__main__"` guard, but nothing sent to them may be defined in it.
+    """
+
+    def __init__(
+        self,
+        num_workers: int = 4,
+        cpu_time_limit: float = DEFAULT_CPU_TIME_LIMIT,
+        memory_limit_mb: Optional[int] = DEFAULT_MEMORY_LIMIT_MB,
+        max_batch_size: int = DEFAULT_MAX_BATCH_SIZE,
+    ):
+        self.num_workers = num_workers
+        self.cpu_time_limit = cpu_time_limit
+        self.memory_limit_mb = memory_limit_mb
+        self.max_batch_size = max_batch_size
+        # Wall clock backstop for a worker that cannot even be interrupted by its CPU timer
+        self.response_timeout = 2 * cpu_time_limit + 1.0
+        # The fork server is started before any training threads touch it, so workers start clean
+        self._context = multiprocessing.get_context("forkserver")
+        self._queue: "queue.Queue[Optional[PendingCalculation]]" = queue.Queue()
+        self._lock = threading.Lock()
+        self._stats: Dict[str, int] = {}
+        self.reset_stats()
+        self._closed = False
+        self._threads = [
+            threading.Thread(target=self._serve, args=(self._start_worker(),), name=f"calculator-pool-{index}", daemon=True)
+            for index in range(num_workers)
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def submit(
+        self,
+        expression: Union[Expression, CompiledExpression, float, int],
+        max_depth: Optional[int] = DEFAULT_MAX_DEPTH,
+        max_nodes: Optional[int] = DEFAULT_MAX_NODES,
+        numbers: Optional[NumericBackend] = None,
+    ) -> Future:
+        """
+        Queues a calculation, returning a Future of its result.
+
+        Raises:
+            ValueError: If the expression exceeds `max_depth` or `max_nodes`, as `calculate` does.
+            TypeError: If the input is not an Expression, CompiledExpression, float, or int.
+        """
+        if self._closed:
+            raise RuntimeError("CalculatorPool is closed")
+
+        future: Future = Future()
+        if isinstance(expression, (int, float)):
+            future.set_result(calculate(expression, numbers=numbers))
+            return future
+        if isinstance(expression, Expression):
+            expression = compile_expression(expression, max_depth=max_depth, max_nodes=max_nodes)
+        elif not isinstance(expression, CompiledExpression):
+            raise TypeError(f"Unsupported expression type: {type(expression)}")
+
+        self._queue.put((expression, numbers, future))
+        return future
+
+    def calculate(
+        self,
+        expression: Union[Expression, CompiledExpression, float, int],
+        max_depth: Optional[int] = DEFAULT_MAX_DEPTH,
+        max_nodes: Optional[int] = DEFAULT_MAX_NODES,
+        numbers: Optional[NumericBackend] = None,
+    ) -> Number:
+        """Calculates the expression in a worker, with the same results and errors as `calculate`."""
+        return self.submit(expression, max_depth=max_depth, max_nodes=max_nodes, numbers=numbers).result()
+
+    def calculate_many(
+        self,
+        expressions: Sequence[Union[Expression, CompiledExpression, float, int]],
+        numbers: Optional[NumericBackend] = None,
+    ) -> List[Tuple[Optional[Number], Optional[Exception]]]:
+        """Submits all the calculations at once and returns (result, error) for each, in order."""
+        futures = []
+        for expression in expressions:
+            try:
+                futures.append(self.submit(expression, numbers=numbers))
+            except (ValueError, TypeError) as e:
+                failed: Future = Future()
+                failed.set_exception(e)
+                futures.append(failed)
+
+        results: List[Tuple[Optional[Number], Optional[Exception]]] = []
+        for future in futures:
+            error = future.exception()
+            results.append((None, error) if error is not None else (future.result(), None))
+        return results
+
+    def stats(self) -> Dict[str, int]:
+        """Counts of calculations, messages sent to workers, CPU time limits hit and workers replaced."""
+        with self._lock:
+            return dict(self._stats)
+
+    def reset_stats(self) -> None:
+        with self._lock:
+            self._stats = {"calculations": 0, "batches": 0, "cpu_time_exceeded": 0, "workers_replaced": 0}
+
+    def close(self) -> None:
+        """Stops the workers once the calculations already queued are done."""
+        if self._closed:
+            return
+        self._closed = True
+        for _ in self._threads:
+            self._queue.put(None)
+        for thread in self._threads:
+            thread.join()
+
+    def _start_worker(self) -> Tuple[Any, Any]:
+        parent_conn, child_conn = self._context.Pipe()
+        memory_limit = self.memory_limit_mb * 1024 * 1024 if self.memory_limit_mb else None
+        process = self._context.Process(
+            target=_worker_main,
+            args=(child_conn, self.cpu_time_limit, memory_limit),
+            daemon=True,
+        )
+        with _hidden_main_module():
+            process.start()
+        child_conn.close()
+        return process, parent_conn
+
+    def _serve(self, worker: Tuple[Any, Any]) -> None:
+        """Feeds one worker with batches of whatever calculations are pending."""
+        while True:
+            item = self._queue.get()
+            if item is None:
+                break
+            batch = [item]
+            while len(batch) < self.max_batch_size:
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is None:
+                    # Leave the shutdown signal for this thread's next loop
+                    self._queue.put(None)
+                    break
+                batch.append(item)
+            worker = self._run_batch(worker, batch)
+
+        process, conn = worker
+        conn.close()
+        process.kill()
+        process.join()
+
+    def _run_batch(self, worker: Tuple[Any, Any], batch: List[PendingCalculation]) -> Tuple[Any, Any]:
+        """Runs a batch on the worker, replacing it if it fails, and returns the worker to use next."""
+        while batch:
+            process, conn = worker
+            with self._lock:
+                self._stats["batches"] += 1
+            try:
+                conn.send([(program, numbers) for program, numbers, _ in batch])
+                while batch:
+                    if not conn.poll(self.response_timeout):
+                        raise CalculatorTimeout(f"Calculator worker did not respond within {self.response_timeout:.1f}s")
+                    result = conn.recv()
+                    self._resolve(batch.pop(0)[2], result)
+            except (CalculatorTimeout, EOFError, OSError) as e:
+                # The calculation in progress is the one that broke the worker; the rest are re-sent
+                process.kill()
+                process.join()
+                conn.close()
+                if isinstance(e, CalculatorTimeout):
+                    error: Exception = e
+                else:
+                    error = CalculatorTimeout(f"Calculator worker exited unexpectedly (exit code {process.exitcode})")
+                self._fail(batch.pop(0)[2], error)
+                with self._lock:
+                    self._stats["workers_replaced"] += 1
+                worker = self._start_worker()
+        return worker
+
+    def _resolve(self, future: Future, result: WorkerResult) -> None:
+        value, error = result
+        if error is None:
+            with self._lock:
+                self._stats["calculations"] += 1
+            future.set_result(value)
+            return
+
+        error_type_name, message = error
+        if error_type_name == CalculatorTimeout.__name__:
+            with self._lock:
+                self._stats["cpu_time_exceeded"] += 1
+            self._fail(future, CalculatorTimeout(message))
+        else:
+            self._fail(future, _ERROR_TYPES.get(error_type_name, RuntimeError)(message))
+
+    def _fail(self, future: Future, error: Exception) -> None:
+        with self._lock:
+            self._stats["calculations"] += 1
+        future.set_exception(error)
+
+
+@contextmanager
+def _hidden_main_module():
+    """
+    Starts processes without the caller's `__main__`, which workers never need.
+
+    The fork server, and each process it starts, otherwise imports the main script again as
+    `__mp_main__`, running whatever the script does at its top level, such as training.
+    """
+    with _main_module_lock:
+        main_module = sys.modules["__main__"]
+        sys.modules["__main__"] = types.ModuleType("__main__")
+        try:
+            yield
+        finally:
+            sys.modules["__main__"] = main_module
+
+
+def _worker_main(conn: Any, cpu_time_limit: float, memory_limit: Optional[int]) -> None:
+    """Evaluates batches of compiled expressions, sending back a WorkerResult for each as soon as it is done."""
+    if memory_limit is not None:
+        resource.setrlimit(resource.RLIMIT_AS, (memory_limit, memory_limit))
+    # The env process handles interrupts; a worker only stops when its pipe closes
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGPROF, _raise_cpu_time_exceeded)
+
+    while True:
+        try:
+            calculations = conn.recv()
+        except (EOFError, OSError):
+            return
+        for program, numbers in calculations:
+            try:
+                # ITIMER_PROF counts this process's CPU time, so time spent waiting is free
+                signal.setitimer(signal.ITIMER_PROF, cpu_time_limit)
+                try:
+                    result: WorkerResult = (program.evaluate(numbers), None)
+                finally:
+                    signal.setitimer(signal.ITIMER_PROF, 0)
+            except CalculatorTimeout:
+                result = (None, (CalculatorTimeout.__name__, f"Calculation exceeded the CPU time limit of {cpu_time_limit}s"))
+            except Exception as e:
+                result = (None, (type(e).__name__, str(e)))
+            conn.send(result)
+
+
+def _raise_cpu_time_exceeded(signum: int, frame: Any) -> None:
+    raise CalculatorTimeout()
+
+
+_pool_lock = threading.Lock()
+_pool: Optional[CalculatorPool] = None
+_pool_pid: Optional[int] = None
+
+
+def get_calculator_pool() -> Optional[CalculatorPool]:
+    """
+    Returns the process-wide calculator pool, or None to calculate inline.
+
+    The pool is used when CALCULATOR_POOL_WORKERS is above 0, with limits set by
+    CALCULATOR_CPU_TIME_LIMIT (seconds) and CALCULATOR_MEMORY_LIMIT_MB.
+    """
+    global _pool, _pool_pid
+    num_workers = int(os.getenv("CALCULATOR_POOL_WORKERS", "0"))
+    if num_workers <= 0:
+        return None
+    with _pool_lock:
+        # A forked child cannot use its parent's worker threads
+        if _pool is None or _pool_pid != os.getpid():
+            _pool = CalculatorPool(
+                num_workers=num_workers,
+                cpu_time_limit=float(os.getenv("CALCULATOR_CPU_TIME_LIMIT", str(DEFAULT_CPU_TIME_LIMIT))),
+                memory_limit_mb=int(os.getenv("CALCULATOR_MEMORY_LIMIT_MB", str(DEFAULT_MEMORY_LIMIT_MB))) or None,
+            )
+            _pool_pid = os.getpid()
+            atexit.register(_pool.close)
+        return _pool
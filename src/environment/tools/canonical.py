@@ -0,0 +1,226 @@
+import math
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from hashlib import blake2b
+from typing import Any, Callable, Dict, List, Optional, Tuple, Type, Union
+
+from environment.tools.calculator import (
+    DEFAULT_MAX_DEPTH,
+    DEFAULT_MAX_NODES,
+    CompiledExpression,
+    Expression,
+    calculate,
+    compile_expression,
+)
+from environment.tools.numeric import MAX_EXACT_FLOAT_INT, Number, NumericBackend
+
+CALCULATION_CACHE_SIZE = 65536
+
+_ASSOCIATIVE_OPERATIONS = ("add", "multiply")
+# Identity operand of each supported operation, dropped wherever it cannot change the result
+_IDENTITIES = {"add": 0, "multiply": 1, "subtract": 0, "divide": 1}
+_OPERATION_KEYS = {operation: operation.encode() for operation in _IDENTITIES}
+
+# A canonical node, its key and, for sums and products, its operands as canonical nodes
+_CanonicalNode = Tuple[Union[Expression, float, int], bytes, List[Any]]
+
+
+@dataclass(frozen=True)
+class CanonicalExpression:
+    """
+    An expression rewritten into a canonical form, with a hash that is stable across processes.
+
+    `digest` is equal for expressions that only differ in the order of the operands of sums and
+    products, in how sums and products are nested, in identity operands (`+ 0`, `* 1`, `- 0`,
+    `/ 1`), single-operand operations, or in writing an integer as `2` or `2.0`. A sum is never
+    -0.0, so a sum left with one operand that may be -0.0 stays a sum: `add [-0.0, 0]` is 0.0
+    and does not share a digest with `-0.0`.
+    """
+
+    expression: Union[Expression, float, int]
+    digest: str
+
+
+def canonicalize(
+    expression: Union[Expression, float, int],
+    max_depth: Optional[int] = DEFAULT_MAX_DEPTH,
+    max_nodes: Optional[int] = DEFAULT_MAX_NODES,
+) -> CanonicalExpression:
+    """
+    Canonicalizes an expression without recursion.
+
+    Sums and products are flattened and their operands sorted; subtractions and divisions keep
+    their operand order. Every leaf is a literal, so folding whole constant subtrees would
+    evaluate the expression to find its key: folding stops at identity operands and
+    single-operand operations. The canonical form calculates the same value, up to the
+    rounding differences of adding or multiplying floats in another order. An expression with
+    several errors, e.g. two divisions by zero, may report a different one of them.
+
+    Raises:
+        ValueError: If the expression exceeds `max_depth` or `max_nodes`, or has an unsupported operation.
+        TypeError: If an operand is not an Expression, float, or int.
+    """
+    if isinstance(expression, (int, float)):
+        node, key, _ = _canonical_number(expression)
+        return CanonicalExpression(expression=node, digest=blake2b(key, digest_size=16).hexdigest())
+
+    results: List[_CanonicalNode] = []
+    num_nodes = 0
+    # Entries are (node, depth, operands already canonicalized)
+    pending: List[Tuple[Any, int, bool]] = [(expression, 1, False)]
+    while pending:
+        node, depth, operands_done = pending.pop()
+
+        if operands_done:
+            start = len(results) - len(node.operands)
+            operands = results[start:]
+            del results[start:]
+            results.append(_canonical_operation(node.operation, operands))
+            continue
+
+        num_nodes += 1
+        if max_nodes is not None and num_nodes > max_nodes:
+            raise ValueError(f"Expression exceeds the maximum of {max_nodes} nodes")
+
+        if isinstance(node, (int, float)):
+            results.append(_canonical_number(node))
+        elif isinstance(node, Expression):
+            if max_depth is not None and depth > max_depth:
+                raise ValueError(f"Expression exceeds the maximum depth of {max_depth}")
+            if node.operation not in _IDENTITIES:
+                raise ValueError(f"Unsupported operation: {node.operation}")
+            pending.append((node, depth, True))
+            for operand in reversed(node.operands):
+                pending.append((operand, depth + 1, False))
+        else:
+            raise TypeError(f"Unsupported expression type: {type(node)}")
+
+    node, key, _ = results[0]
+    return CanonicalExpression(expression=node, digest=blake2b(key, digest_size=16).hexdigest())
+
+
+def _canonical_number(value: Union[float, int]) -> _CanonicalNode:
+    # Integer-valued floats calculate the same as ints, except -0.0, whose sign can survive a product
+    if isinstance(value, float) and value.is_integer() and abs(value) <= MAX_EXACT_FLOAT_INT and math.copysign(1.0, value) > 0:
+        value = int(value)
+    if isinstance(value, int):
+        return value, b"i" + str(value).encode(), []
+    return value, b"f" + repr(value).encode(), []
+
+_IDENTITY_KEYS = {operation: _canonical_number(identity)[1] for operation, identity in _IDENTITIES.items()}
+
+def _canonical_operation(operation: str, operands: List[_CanonicalNode]) -> _CanonicalNode:
+    identity_key = _IDENTITY_KEYS[operation]
+
+    if operation in _ASSOCIATIVE_OPERATIONS:
+        merged: List[_CanonicalNode] = []
+        for operand in operands:
+            node, key, children = operand
+            if isinstance(node, Expression) and node.operation == operation:
+                merged.extend(children)
+            elif key != identity_key:
+                merged.append(operand)
+        merged.sort(key=lambda operand: operand[1])
+        if not merged:
+            return _canonical_number(_IDENTITIES[operation])
+        operands = merged
+    elif operands:
+        operands = operands[:1] + [operand for operand in operands[1:] if operand[1] != identity_key]
+
+    # A sum adds its operands to 0, so unwrapping a lone operand that may be -0.0 would change its sign
+    if len(operands) == 1 and not (operation == "add" and _may_be_negative_zero(operands[0][0])):
+        return operands[0]
+
+    # Keys are s-expressions; number keys never contain the delimiters, so keys are unambiguous
+    key = b"(" + _OPERATION_KEYS[operation] + b" " + b" ".join(key for _, key, _ in operands) + b")"
+    node = Expression(operation=operation, operands=[operand for operand, _, _ in operands])
+    return node, key, operands if operation in _ASSOCIATIVE_OPERATIONS else []
+
+def _may_be_negative_zero(node: Union[Expression, float, int]) -> bool:
+    if isinstance(node, Expression):
+        return True
+    return node == 0 and math.copysign(1.0, node) < 0
+
+
+class CalculationCache:
+    """
+    A bounded LRU of calculation results, keyed by compiled program and numeric backend.
+
+    Generations in a GRPO group often make the same calculation, which `parse_turn` sees as
+    different messages when the text around it differs. The key is the postfix program, which
+    keeps the operand order the model wrote, so a cached result is always what `calculate`
+    returns for the call itself: reordering a float sum or product can change its result, e.g.
+    `1e308 * 10 * 0.1` overflows where `1e308 * 0.1 * 10` does not. Calls that only differ in
+    formatting, or in writing `2` as `2.0`, share an entry. Errors of the expression itself are
+    cached too; timeouts and other failures of the calculation are not.
+    """
+
+    def __init__(self, maxsize: int = CALCULATION_CACHE_SIZE):
+        self.maxsize = maxsize
+        self._entries: "OrderedDict[Tuple[Any, ...], Tuple[Optional[Number], Optional[Tuple[Type[Exception], str]]]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+
+    def calculate(
+        self,
+        expression: Union[Expression, CompiledExpression, float, int],
+        numbers: Optional[NumericBackend] = None,
+        calculate_fn: Callable[..., Number] = calculate,
+    ) -> Number:
+        """
+        Returns the result of the expression, calculating its compiled program with `calculate_fn` on a miss.
+
+        Bare numbers, and expressions that cannot be compiled, are passed to `calculate_fn` as
+        they are, so they raise the same errors as without the cache.
+        """
+        if isinstance(expression, Expression):
+            try:
+                expression = compile_expression(expression)
+            except (ValueError, TypeError):
+                return calculate_fn(expression, numbers=numbers)
+        elif not isinstance(expression, CompiledExpression):
+            return calculate_fn(expression, numbers=numbers)
+
+        key = (
+            expression.opcodes.tobytes(),
+            expression.args.tobytes(),
+            expression.constants.tobytes(),
+            expression.big_integers,
+            expression.errors,
+            numbers,
+        )
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self._hits += 1
+            else:
+                self._misses += 1
+
+        if entry is None:
+            try:
+                entry = (calculate_fn(expression, numbers=numbers), None)
+            except (ValueError, TypeError, ArithmeticError) as e:
+                entry = (None, (type(e), str(e)))
+            with self._lock:
+                self._entries[key] = entry
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.maxsize:
+                    self._entries.popitem(last=False)
+
+        result, error = entry
+        if error is not None:
+            raise error[0](error[1])
+        return result
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"hits": self._hits, "misses": self._misses, "entries": len(self._entries)}
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._hits = 0
+            self._misses = 0
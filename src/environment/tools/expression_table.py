@@ -0,0 +1,104 @@
+from array import array
+from typing import Dict, Iterable, Iterator, Optional, Tuple, Type, Union
+
+from environment.tools.calculator import (
+    DEFAULT_MAX_DEPTH,
+    DEFAULT_MAX_NODES,
+    CompiledExpression,
+    Expression,
+    compile_expression,
+)
+
+
+class ExpressionTable:
+    """
+    Many compiled expressions stored as one struct of arrays.
+
+    A CompiledExpression is an object with three arrays of its own, and an Expression tree is
+    an object and a list per node. A table keeps every program's opcodes, args and constants in
+    three shared arrays, with offset arrays marking where each row starts, so a typical tool call
+    takes tens of bytes. Meant for holding millions of parsed calls, e.g. in offline rescoring:
+    fill it with `parse_calculator_program` results and read rows back as CompiledExpression
+    for `calculate` and `calculate_batch`, or as Expression views.
+    """
+
+    def __init__(self, expressions: Iterable[Union[Expression, CompiledExpression, float, int]] = ()):
+        self.opcodes = array("B")
+        self.args = array("q")
+        self.constants = array("d")
+        # Row i spans [offsets[i], offsets[i + 1]) of its arrays
+        self.program_offsets = array("q", [0])
+        self.constant_offsets = array("q", [0])
+        # Compiled errors and exact big integers are rare, so only rows that have them are stored
+        self._errors: Dict[int, Tuple[Tuple[Type[Exception], str], ...]] = {}
+        self._big_integers: Dict[int, Tuple[Tuple[int, int], ...]] = {}
+        self.extend(expressions)
+
+    def __len__(self) -> int:
+        return len(self.program_offsets) - 1
+
+    def __iter__(self) -> Iterator[CompiledExpression]:
+        for index in range(len(self)):
+            yield self[index]
+
+    def __getitem__(self, index: int) -> CompiledExpression:
+        """Copies row `index` out as a CompiledExpression."""
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("ExpressionTable index out of range")
+        program_start, program_end = self.program_offsets[index], self.program_offsets[index + 1]
+        constant_start, constant_end = self.constant_offsets[index], self.constant_offsets[index + 1]
+        return CompiledExpression(
+            opcodes=self.opcodes[program_start:program_end],
+            args=self.args[program_start:program_end],
+            constants=self.constants[constant_start:constant_end],
+            errors=self._errors.get(index, ()),
+            big_integers=self._big_integers.get(index, ()),
+        )
+
+    def append(
+        self,
+        expression: Union[Expression, CompiledExpression, float, int],
+        max_depth: Optional[int] = DEFAULT_MAX_DEPTH,
+        max_nodes: Optional[int] = DEFAULT_MAX_NODES,
+    ) -> int:
+        """
+        Adds an expression, compiling it if needed, and returns its row index.
+
+        Raises:
+            ValueError: If the expression exceeds `max_depth` or `max_nodes`, as `calculate` does.
+            TypeError: If the input is not an Expression, CompiledExpression, float, or int.
+        """
+        if isinstance(expression, (Expression, int, float)):
+            expression = compile_expression(expression, max_depth=max_depth, max_nodes=max_nodes)
+        elif not isinstance(expression, CompiledExpression):
+            raise TypeError(f"Unsupported expression type: {type(expression)}")
+
+        index = len(self)
+        self.opcodes.extend(expression.opcodes)
+        self.args.extend(expression.args)
+        self.constants.extend(expression.constants)
+        self.program_offsets.append(len(self.opcodes))
+        self.constant_offsets.append(len(self.constants))
+        if expression.errors:
+            self._errors[index] = expression.errors
+        if expression.big_integers:
+            self._big_integers[index] = expression.big_integers
+        return index
+
+    def extend(self, expressions: Iterable[Union[Expression, CompiledExpression, float, int]]) -> None:
+        for expression in expressions:
+            self.append(expression)
+
+    def expression(self, index: int) -> Union[Expression, float, int]:
+        """Row `index` as an Expression view, see `CompiledExpression.to_expression`."""
+        return self[index].to_expression()
+
+    @property
+    def nbytes(self) -> int:
+        """Bytes held by the table's arrays."""
+        return sum(
+            len(column) * column.itemsize
+            for column in (self.opcodes, self.args, self.constants, self.program_offsets, self.constant_offsets)
+        )
@@ -0,0 +1,58 @@
+import ast
+from typing import Union
+
+from environment.tools.calculator import Expression
+
+
+_binary_operations = {
+    ast.Add: "add",
+    ast.Sub: "subtract",
+    ast.Mult: "multiply",
+    ast.Div: "divide",
+}
+
+
+def parse_infix(source: str) -> Union[Expression, float, int]:
+    """
+    Parses an infix arithmetic string, like the dataset's `expression` column, into an Expression.
+
+    Supports numbers, parentheses, unary signs and `+ - * /`. Left-associative chains of the
+    same operation are flattened (`a - b - c` becomes one subtract with three operands), which
+    evaluates in the same order as Python. Surrounding whitespace and double quotes are ignored.
+
+    Raises:
+        ValueError: If the source is not a supported arithmetic expression.
+    """
+    source = source.strip()
+    if len(source) >= 2 and source[0] == source[-1] == '"':
+        source = source[1:-1].strip()
+
+    try:
+        tree = ast.parse(source, mode="eval")
+    except SyntaxError as e:
+        raise ValueError(f"Invalid arithmetic expression: {source!r}") from e
+
+    return _convert(tree.body, source)
+
+def _convert(node: ast.AST, source: str) -> Union[Expression, float, int]:
+    if isinstance(node, ast.Constant) and isinstance(node.value, (int, float)) and not isinstance(node.value, bool):
+        return node.value
+
+    if isinstance(node, ast.UnaryOp) and isinstance(node.op, (ast.USub, ast.UAdd)):
+        operand = _convert(node.operand, source)
+        if isinstance(node.op, ast.UAdd):
+            return operand
+        if isinstance(operand, (int, float)):
+            return -operand
+        # Multiplying by -1 flips the sign exactly, including for zero
+        return Expression(operation="multiply", operands=[-1, operand])
+
+    if isinstance(node, ast.BinOp) and type(node.op) in _binary_operations:
+        operation = _binary_operations[type(node.op)]
+        left = _convert(node.left, source)
+        right = _convert(node.right, source)
+        if isinstance(left, Expression) and left.operation == operation:
+            return Expression(operation=operation, operands=left.operands + [right])
+        return Expression(operation=operation, operands=[left, right])
+
+    raise ValueError(f"Unsupported syntax in arithmetic expression: {source!r}")
@@ -0,0 +1,195 @@
+from dataclasses import dataclass
+from decimal import Context, Decimal
+from fractions import Fraction
+from functools import cached_property
+from typing import List, Optional, Union
+
+Number = Union[float, Decimal, Fraction]
+# Operands during exact evaluation: Python ints until an operation needs the backend's type
+ExactOperand = Union[int, Decimal, Fraction]
+
+DEFAULT_DECIMAL_PRECISION = 28
+# Integers up to this size are exact in a double, so integer-valued constants can be read back as ints
+MAX_EXACT_FLOAT_INT = 2 ** 53
+
+
+@dataclass(frozen=True)
+class FloatNumbers:
+    """
+    IEEE doubles, the default. Results match the original recursive evaluator bit for bit.
+
+    CompiledExpression evaluates float programs with its own loop; this class names the choice.
+    """
+
+    name = "float"
+
+
+class _ExactNumbers:
+    """
+    Shared evaluation for the exact backends.
+
+    Integer-valued constants are evaluated as Python ints, which are exact and cheaper than
+    Decimal or Fraction objects. Addition, subtraction, multiplication and exact division keep
+    ints as ints, so integer-only trees only build a backend number for the final result.
+    """
+
+    name = ""
+
+    def constant(self, value: float) -> ExactOperand:
+        """Converts a compiled constant, reading non-integers as the decimal literal the model wrote."""
+        if value.is_integer() and -MAX_EXACT_FLOAT_INT <= value <= MAX_EXACT_FLOAT_INT:
+            return int(value)
+        return self._from_literal(repr(value))
+
+    def add(self, operands: List[ExactOperand]) -> ExactOperand:
+        result: ExactOperand = 0
+        for operand in operands:
+            result = self._add(result, operand)
+        return result
+
+    def subtract(self, operands: List[ExactOperand]) -> ExactOperand:
+        if not operands:
+            return 0
+        result = operands[0]
+        for operand in operands[1:]:
+            result = self._subtract(result, operand)
+        return result
+
+    def multiply(self, operands: List[ExactOperand]) -> ExactOperand:
+        result: ExactOperand = 1
+        for operand in operands:
+            result = self._multiply(result, operand)
+        return result
+
+    def divide(self, operands: List[ExactOperand]) -> ExactOperand:
+        if not operands:
+            raise ValueError("Division requires at least one operand")
+        result = operands[0]
+        for operand in operands[1:]:
+            if operand == 0:
+                raise ZeroDivisionError("Division by zero")
+            if type(result) is int and type(operand) is int and result % operand == 0:
+                result //= operand
+            else:
+                result = self._divide(result, operand)
+        return result
+
+    def _from_literal(self, literal: str) -> ExactOperand:
+        raise NotImplementedError
+
+    def _add(self, a: ExactOperand, b: ExactOperand) -> ExactOperand:
+        raise NotImplementedError
+
+    def _subtract(self, a: ExactOperand, b: ExactOperand) -> ExactOperand:
+        raise NotImplementedError
+
+    def _multiply(self, a: ExactOperand, b: ExactOperand) -> ExactOperand:
+        raise NotImplementedError
+
+    def _divide(self, a: ExactOperand, b: ExactOperand) -> ExactOperand:
+        raise NotImplementedError
+
+    def result(self, value: ExactOperand) -> Number:
+        raise NotImplementedError
+
+
+@dataclass(frozen=True)
+class DecimalNumbers(_ExactNumbers):
+    """
+    decimal.Decimal arithmetic rounded to `precision` significant digits.
+
+    Integer-only subtrees are exact and rounded once, when they meet a non-integer or at the
+    end, so results are at least as accurate as rounding every operation.
+    """
+
+    name = "decimal"
+    precision: int = DEFAULT_DECIMAL_PRECISION
+
+    @cached_property
+    def context(self) -> Context:
+        return Context(prec=self.precision)
+
+    def _from_literal(self, literal: str) -> ExactOperand:
+        return self.context.create_decimal(literal)
+
+    def _add(self, a: ExactOperand, b: ExactOperand) -> ExactOperand:
+        return a + b if type(a) is int and type(b) is int else self.context.add(a, b)
+
+    def _subtract(self, a: ExactOperand, b: ExactOperand) -> ExactOperand:
+        return a - b if type(a) is int and type(b) is int else self.context.subtract(a, b)
+
+    def _multiply(self, a: ExactOperand, b: ExactOperand) -> ExactOperand:
+        return a * b if type(a) is int and type(b) is int else self.context.multiply(a, b)
+
+    def _divide(self, a: ExactOperand, b: ExactOperand) -> ExactOperand:
+        return self.context.divide(a, b)
+
+    def result(self, value: ExactOperand) -> Decimal:
+        return self.context.plus(Decimal(value)) if type(value) is int else value
+
+
+@dataclass(frozen=True)
+class FractionNumbers(_ExactNumbers):
+    """
+    Exact rational arithmetic with fractions.Fraction.
+
+    Operand sizes are unbounded, so run untrusted expressions in the calculator pool, which
+    limits the CPU time a calculation can use.
+    """
+
+    name = "fraction"
+
+    def _from_literal(self, literal: str) -> ExactOperand:
+        return Fraction(literal)
+
+    def _add(self, a: ExactOperand, b: ExactOperand) -> ExactOperand:
+        return a + b
+
+    def _subtract(self, a: ExactOperand, b: ExactOperand) -> ExactOperand:
+        return a - b
+
+    def _multiply(self, a: ExactOperand, b: ExactOperand) -> ExactOperand:
+        return a * b
+
+    def _divide(self, a: ExactOperand, b: ExactOperand) -> ExactOperand:
+        return Fraction(a) / b
+
+    def result(self, value: ExactOperand) -> Fraction:
+        return Fraction(value)
+
+
+NumericBackend = Union[FloatNumbers, DecimalNumbers, FractionNumbers]
+
+FLOAT = FloatNumbers()
+
+# How exact results are shown to the model, so outputs stay plain decimal numbers
+_FRACTION_DISPLAY_CONTEXT = Context(prec=DEFAULT_DECIMAL_PRECISION)
+
+
+def numeric_backend(name: str, precision: int = DEFAULT_DECIMAL_PRECISION) -> NumericBackend:
+    """
+    Returns the backend called `name`: "float", "decimal" or "fraction".
+
+    Raises:
+        ValueError: If the name is not one of them.
+    """
+    if name == FloatNumbers.name:
+        return FLOAT
+    if name == DecimalNumbers.name:
+        return DecimalNumbers(precision)
+    if name == FractionNumbers.name:
+        return FractionNumbers()
+    raise ValueError(f"Unknown numeric backend: {name!r}. Expected 'float', 'decimal' or 'fraction'")
+
+def format_result(value: Optional[Number]) -> str:
+    """
+    Renders a calculation result for the env's `<output>` tag.
+
+    Floats render as they always have and Decimals with all their digits. Fractions render as
+    an integer when they are one, and otherwise as a decimal to 28 significant digits.
+    """
+    if isinstance(value, Fraction):
+        if value.denominator == 1:
+            return str(value.numerator)
+        return str(_FRACTION_DISPLAY_CONTEXT.divide(Decimal(value.numerator), value.denominator))
+    return str(value)
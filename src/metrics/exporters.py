@@ -0,0 +1,100 @@
+import json
+import os
+import re
+import time
+from typing import Dict, List, Optional
+
+PROMETHEUS_PREFIX = "calculator_agent"
+# The step key the trainer's wandb integration logs and plots against
+STEP_KEY = "train/global_step"
+
+
+class JSONLExporter:
+    """Appends each step's metrics to a JSON lines file as `{step, time, pid, metrics}`."""
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def export(self, step: int, metrics: Dict[str, float]) -> None:
+        line = json.dumps({"step": step, "time": time.time(), "pid": os.getpid(), "metrics": metrics})
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(line + "\n")
+
+
+class PrometheusTextExporter:
+    """
+    Writes the latest step's metrics in the Prometheus text format, e.g. for node_exporter's textfile collector.
+
+    The file is replaced atomically, so a scrape never reads a half-written file.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def export(self, step: int, metrics: Dict[str, float]) -> None:
+        lines = [
+            f"# TYPE {PROMETHEUS_PREFIX}_step gauge",
+            f"{PROMETHEUS_PREFIX}_step {step}",
+            f"# TYPE {PROMETHEUS_PREFIX}_timer gauge",
+            f"# TYPE {PROMETHEUS_PREFIX}_counter gauge",
+        ]
+        for key, value in metrics.items():
+            kind, _, rest = key.partition("/")
+            if kind == "timers":
+                name, _, stat = rest.rpartition("/")
+                lines.append(f'{PROMETHEUS_PREFIX}_timer{{name="{_escape(name)}",stat="{stat}"}} {value}')
+            else:
+                lines.append(f'{PROMETHEUS_PREFIX}_counter{{name="{_escape(rest)}"}} {value}')
+
+        temporary_path = f"{self.path}.tmp"
+        with open(temporary_path, "w", encoding="utf-8") as f:
+            f.write("\n".join(lines) + "\n")
+        os.replace(temporary_path, self.path)
+
+
+class WandbExporter:
+    """
+    Logs each step's metrics to the active wandb run, if there is one.
+
+    Every step is committed as its own row, tagged with `train/global_step`, the x-axis the
+    trainer's wandb integration plots against. An uncommitted row would be overwritten by the
+    next step's values until the trainer's next log call, losing the steps in between. wandb's
+    `step` argument is not used, as the trainer logs without one and wandb drops rows whose
+    step goes backwards.
+    """
+
+    def export(self, step: int, metrics: Dict[str, float]) -> None:
+        try:
+            import wandb
+        except ImportError:
+            return
+        if wandb.run is not None:
+            row = {f"step_metrics/{key}": value for key, value in metrics.items()}
+            wandb.log({**row, STEP_KEY: step})
+
+
+def exporters_from_env() -> List[object]:
+    """
+    Exporters configured by METRICS_JSONL_PATH, METRICS_PROMETHEUS_PATH and METRICS_WANDB.
+
+    Paths may contain `{rank}`, replaced by the RANK env var, so that each training process
+    writes its own file.
+    """
+    rank = os.getenv("RANK", "0")
+    exporters: List[object] = []
+    jsonl_path = _path_from_env("METRICS_JSONL_PATH", rank)
+    if jsonl_path:
+        exporters.append(JSONLExporter(jsonl_path))
+    prometheus_path = _path_from_env("METRICS_PROMETHEUS_PATH", rank)
+    if prometheus_path:
+        exporters.append(PrometheusTextExporter(prometheus_path))
+    if os.getenv("METRICS_WANDB", "1") == "1":
+        exporters.append(WandbExporter())
+    return exporters
+
+def _path_from_env(name: str, rank: str) -> Optional[str]:
+    path = os.getenv(name)
+    return path.replace("{rank}", rank) if path else None
+
+def _escape(label: str) -> str:
+    return re.sub(r'(["\\])', r"\\\1", label)
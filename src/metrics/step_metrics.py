@@ -0,0 +1,115 @@
+import os
+import random
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Mapping
+
+# Latency samples kept per timer per step for percentiles. Count, total and max are always exact.
+MAX_TIMER_SAMPLES = 2048
+
+
+class _Timer:
+    __slots__ = ("count", "total", "max", "samples")
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.samples: List[float] = []
+
+    def add(self, seconds: float) -> None:
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+        # Reservoir sampling keeps a uniform sample of the step's latencies
+        if len(self.samples) < MAX_TIMER_SAMPLES:
+            self.samples.append(seconds)
+        else:
+            index = random.randrange(self.count)
+            if index < MAX_TIMER_SAMPLES:
+                self.samples[index] = seconds
+
+
+class StepMetrics:
+    """
+    Timers and counters aggregated over one training step.
+
+    Instrumented code records into the process-wide `step_metrics` with `timer` and `increment`;
+    a StepMetricsCallback takes a `snapshot` after every step and exports it. Recording is a
+    clock read and a dict update under a lock, and does nothing when `enabled` is False.
+    """
+
+    def __init__(self, enabled: bool = True):
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._timers: Dict[str, _Timer] = {}
+        self._counters: Dict[str, float] = {}
+
+    @contextmanager
+    def timer(self, name: str) -> Iterator[None]:
+        """Times the block under `name`, including blocks that raise."""
+        if not self.enabled:
+            yield
+            return
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record_time(name, time.perf_counter() - start)
+
+    def record_time(self, name: str, seconds: float) -> None:
+        if not self.enabled:
+            return
+        with self._lock:
+            timer = self._timers.get(name)
+            if timer is None:
+                timer = self._timers[name] = _Timer()
+            timer.add(seconds)
+
+    def increment(self, name: str, value: float = 1) -> None:
+        if not self.enabled:
+            return
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + value
+
+    def add_counts(self, prefix: str, counts: Mapping[str, float]) -> None:
+        """Adds a stats dict, such as JudgeCache.stats(), as counters named `prefix/key`."""
+        for key, value in counts.items():
+            self.increment(f"{prefix}/{key}", value)
+
+    def snapshot(self, reset: bool = True) -> Dict[str, float]:
+        """
+        Returns the step's metrics as a flat dict, e.g. for wandb.
+
+        Timers become `timers/<name>/{count,total_s,mean_ms,p50_ms,p99_ms,max_ms}` and counters
+        `counters/<name>`.
+        """
+        with self._lock:
+            timers, counters = self._timers, self._counters
+            if reset:
+                self._timers, self._counters = {}, {}
+            else:
+                timers, counters = dict(timers), dict(counters)
+
+        flat: Dict[str, float] = {}
+        for name, timer in sorted(timers.items()):
+            samples = sorted(timer.samples)
+            flat[f"timers/{name}/count"] = timer.count
+            flat[f"timers/{name}/total_s"] = timer.total
+            flat[f"timers/{name}/mean_ms"] = timer.total / timer.count * 1000
+            flat[f"timers/{name}/p50_ms"] = _percentile(samples, 50) * 1000
+            flat[f"timers/{name}/p99_ms"] = _percentile(samples, 99) * 1000
+            flat[f"timers/{name}/max_ms"] = timer.max * 1000
+        for name, value in sorted(counters.items()):
+            flat[f"counters/{name}"] = value
+        return flat
+
+
+def _percentile(ordered: List[float], percentile: float) -> float:
+    """Nearest-rank percentile of an already sorted, non-empty list."""
+    return ordered[min(len(ordered) - 1, max(0, round(percentile / 100 * (len(ordered) - 1))))]
+
+
+# The process-wide metrics that env, judge and reward code record into
+step_metrics = StepMetrics(enabled=os.getenv("STEP_METRICS_ENABLED", "1") == "1")
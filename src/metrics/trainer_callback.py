@@ -0,0 +1,28 @@
+import logging
+from typing import List, Optional
+
+from transformers import TrainerCallback
+
+from metrics.exporters import exporters_from_env
+from metrics.step_metrics import StepMetrics, step_metrics
+
+
+logger = logging.getLogger(__name__)
+
+
+class StepMetricsCallback(TrainerCallback):
+    """Exports the env, judge and verifier timers and counters at the end of every training step."""
+
+    def __init__(self, metrics: StepMetrics = step_metrics, exporters: Optional[List[object]] = None):
+        self.metrics = metrics
+        self.exporters = exporters if exporters is not None else exporters_from_env()
+
+    def on_step_end(self, args, state, control, **kwargs):
+        snapshot = self.metrics.snapshot(reset=True)
+        if not snapshot:
+            return
+        for exporter in self.exporters:
+            try:
+                exporter.export(state.global_step, snapshot)
+            except Exception as e:
+                logger.warning(f"Failed to export step metrics with {type(exporter).__name__}: {e}")
@@ -1,8 +1,17 @@
-from typing import List, Dict, Any
+import asyncio
+import importlib.util
+import json
+import os
+import threading
+import time
+import weakref
+from typing import List, Dict, Any, Optional
 
-from anthropic import Anthropic
+import httpx
+from anthropic import APIConnectionError, APIStatusError, Anthropic, AsyncAnthropic, DefaultAsyncHttpxClient, DefaultHttpxClient
 
-from model_exec.model_executor import Message, ModelExecutor
+from model_exec.model_executor import BatchRequest, Message, ModelExecutor, OutputSchema, TokenUsage, UsageTracker
+from model_exec.rate_limit import AdaptiveRateLimiter, RetryPolicy, is_retryable_status, parse_retry_after
 
 
 
@@ -10,25 +19,197 @@ SONNET_3_5_MODEL_NAME = "claude-3-5-sonnet-20241022"
 SONNET_3_7_MODEL_NAME = "claude-3-7-sonnet-20250219"
 HAIKU_3_5_MODEL_NAME = "claude-3-5-haiku-20241022"
 
+MAX_REQUESTS_PER_MESSAGE_BATCH = 10_000
+
+# Shortest prompt prefix, in tokens, that each model caches. Shorter prefixes are processed normally.
+MIN_CACHEABLE_TOKENS = {
+    SONNET_3_5_MODEL_NAME: 1024,
+    SONNET_3_7_MODEL_NAME: 1024,
+    HAIKU_3_5_MODEL_NAME: 2048,
+}
+
+# Connection pool shared by every executor in the process. Judge calls come in bursts once per
+# training step, so idle connections are kept open long enough to be reused by the next step.
+HTTP_LIMITS = httpx.Limits(max_connections=256, max_keepalive_connections=128, keepalive_expiry=120.0)
+HTTP2_AVAILABLE = importlib.util.find_spec("h2") is not None  # httpx only speaks HTTP/2 with h2 installed
+
+_pool_lock = threading.Lock()
+_sync_pool: Optional[httpx.Client] = None
+_sync_pool_pid: Optional[int] = None
+_async_pools: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, httpx.AsyncClient]" = weakref.WeakKeyDictionary()
+_rate_limiters: Dict[str, AdaptiveRateLimiter] = {}
+
+
+def shared_http_client() -> httpx.Client:
+    """Returns the process-wide keep-alive connection pool for Anthropic API calls."""
+    global _sync_pool, _sync_pool_pid
+    with _pool_lock:
+        # A forked child must not reuse the parent's sockets
+        if _sync_pool is None or _sync_pool_pid != os.getpid():
+            _sync_pool = DefaultHttpxClient(limits=HTTP_LIMITS, http2=HTTP2_AVAILABLE)
+            _sync_pool_pid = os.getpid()
+        return _sync_pool
+
+def shared_async_http_client() -> httpx.AsyncClient:
+    """Returns the connection pool for async Anthropic API calls on the running event loop."""
+    loop = asyncio.get_running_loop()
+    with _pool_lock:
+        if loop not in _async_pools:
+            _async_pools[loop] = DefaultAsyncHttpxClient(limits=HTTP_LIMITS, http2=HTTP2_AVAILABLE)
+        return _async_pools[loop]
+
+def shared_rate_limiter(model_name: str) -> AdaptiveRateLimiter:
+    """
+    Returns the process-wide rate limiter for a model, as Anthropic rate limits are per model.
+
+    ANTHROPIC_REQUESTS_PER_MINUTE sets the limit used until the API reports one.
+    """
+    with _pool_lock:
+        if model_name not in _rate_limiters:
+            initial_limit = os.getenv("ANTHROPIC_REQUESTS_PER_MINUTE")
+            _rate_limiters[model_name] = AdaptiveRateLimiter(float(initial_limit) if initial_limit else None)
+        return _rate_limiters[model_name]
+
 
 class ClaudeModelExecutor(ModelExecutor):
     """
     Executes requests to Claude models via the Anthropic API.
+
+    With `cache_system_prompt` set, the system message is marked for prompt caching so repeated
+    calls with the same system message only pay for its prefill once per cache lifetime. Only
+    prefixes of at least `MIN_CACHEABLE_TOKENS` are cached: the default judge rubric,
+    tool_judge.md, is about 2k tokens, at or just under Haiku 3.5's minimum, so on Haiku its
+    marker may have no effect. Token usage, including cache reads and writes, is accumulated in
+    `usage`, where `cache_read_input_tokens` staying at zero shows the prefix was too short.
+
+    Unless clients are passed in, all executors share one keep-alive connection pool per process
+    and one rate limiter per model. Rate limited, overloaded and failed connections are retried
+    with jittered backoff according to `retry_policy`; the SDK's own retries are turned off.
     """
 
     ai_model_name = None  # To be set by subclasses
 
-    def __init__(self):
-        self.client = Anthropic()
-
+    def __init__(
+        self,
+        client: Optional[Anthropic] = None,
+        cache_system_prompt: bool = False,
+        async_client: Optional[AsyncAnthropic] = None,
+        retry_policy: Optional[RetryPolicy] = None,
+        rate_limiter: Optional[AdaptiveRateLimiter] = None,
+    ):
         # Ensure subclasses properly set the model name
         if self.ai_model_name is None:
             raise ValueError(f"Model name must be set in {self.__class__.__name__}")
 
+        self._client = client
+        self._client_pid: Optional[int] = None
+        self._async_client = async_client
+        self._async_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, AsyncAnthropic]" = weakref.WeakKeyDictionary()
+        self._owns_client = client is None
+        self.cache_system_prompt = cache_system_prompt
+        self.retry_policy = retry_policy or RetryPolicy()
+        self.rate_limiter = rate_limiter or shared_rate_limiter(self.ai_model_name)
+        self.usage = UsageTracker()
+
+    @property
+    def client(self) -> Anthropic:
+        if self._owns_client and (self._client is None or self._client_pid != os.getpid()):
+            self._client = Anthropic(http_client=shared_http_client(), max_retries=0)
+            self._client_pid = os.getpid()
+        return self._client
+
+    def _get_async_client(self) -> AsyncAnthropic:
+        """The async client for the running event loop, created on first use so it binds to that loop."""
+        if self._async_client is not None:
+            return self._async_client
+
+        loop = asyncio.get_running_loop()
+        if loop not in self._async_clients:
+            self._async_clients[loop] = AsyncAnthropic(http_client=shared_async_http_client(), max_retries=0)
+        return self._async_clients[loop]
+
     @staticmethod
-    def _create_api_message(role: str, content: str) -> Dict[str, Any]:
+    def _create_api_message(role: str, content: str, cacheable: bool = False) -> Dict[str, Any]:
         """Creates a properly formatted message for the Claude API."""
-        return {"role": role, "content": [{"type": "text", "text": content}]}
+        block = {"type": "text", "text": content}
+        if cacheable:
+            block["cache_control"] = {"type": "ephemeral"}
+        return {"role": role, "content": [block]}
+
+    def _create_system(self, sys_msg: str, cache_system: Optional[bool]) -> Any:
+        """
+        Creates the system parameter, marked as cacheable if requested.
+
+        Tools come before the system message in the prompt, so this one breakpoint caches a
+        forced output tool together with the system message and both count towards the
+        model's `MIN_CACHEABLE_TOKENS`. Shorter prefixes are processed normally by the API and
+        report zero cache tokens.
+        """
+        if cache_system is None:
+            cache_system = self.cache_system_prompt
+        if not cache_system:
+            return sys_msg
+        return [{"type": "text", "text": sys_msg, "cache_control": {"type": "ephemeral"}}]
+
+    def _record_usage(self, message: Any) -> None:
+        usage = getattr(message, "usage", None)
+        if usage is None:
+            return
+        self.usage.record(TokenUsage(
+            input_tokens=usage.input_tokens or 0,
+            output_tokens=usage.output_tokens or 0,
+            cache_creation_input_tokens=getattr(usage, "cache_creation_input_tokens", None) or 0,
+            cache_read_input_tokens=getattr(usage, "cache_read_input_tokens", None) or 0,
+        ))
+
+    def _build_request(
+        self,
+        sys_msg: str,
+        messages: List[Message],
+        temperature: float,
+        stop_sequences: List[str],
+        max_tokens: int,
+        cache_system: Optional[bool] = None,
+        output_schema: Optional[OutputSchema] = None,
+    ) -> Dict[str, Any]:
+        """Builds the keyword arguments for a messages.create call, forcing a call to `output_schema`'s tool if given."""
+        api_messages = []
+
+        for msg in messages:
+            api_messages.append(self._create_api_message(msg.role, msg.content, msg.cacheable))
+
+        request = dict(
+            model=self.ai_model_name,
+            max_tokens=max_tokens,
+            temperature=temperature,
+            system=self._create_system(sys_msg, cache_system),
+            messages=api_messages,
+            stop_sequences=stop_sequences,
+        )
+        if output_schema is not None:
+            request["tools"] = [{
+                "name": output_schema.name,
+                "description": output_schema.description,
+                "input_schema": output_schema.json_schema,
+            }]
+            request["tool_choice"] = {"type": "tool", "name": output_schema.name}
+        return request
+
+    @staticmethod
+    def _response_text(message: Any, stop_sequences: List[str]) -> str:
+        """Extracts the response text, re-appending the stop sequence if one ended the response."""
+        if stop_sequences and message.stop_reason == "stop_sequence":
+            return message.content[0].text + message.stop_sequence
+
+        return message.content[0].text
+
+    @staticmethod
+    def _response_output(message: Any, output_schema: OutputSchema) -> Dict[str, Any]:
+        """Extracts the input of the forced tool call, or an empty dict if the response was cut off before it."""
+        for block in message.content:
+            if block.type == "tool_use" and block.name == output_schema.name:
+                return block.input if isinstance(block.input, dict) else {}
+        return {}
 
     def execute(
         self,
@@ -37,38 +218,190 @@ class ClaudeModelExecutor(ModelExecutor):
         temperature: float = 0.2,
         stop_sequences: List[str] = None,
         max_tokens: int = 4000,
+        cache_system: Optional[bool] = None,
     ) -> str:
         """
         Makes an API call to Claude, handling message preprocessing and conversion.
 
         Args:
             sys_msg: System message providing conversation context
-            messages: List of Message objects representing the conversation
+            messages: List of Message objects representing the conversation. Messages with
+                `cacheable` set are marked for prompt caching along with everything before them.
             temperature: Controls response randomness (0.0-1.0)
             stop_sequences: List of strings that, if generated, will end the response
             max_tokens: Maximum tokens in the response
+            cache_system: Whether to mark the system message for prompt caching. Defaults to
+                `cache_system_prompt`.
 
         Returns:
             str: Claude's response text
         """
-        api_messages = []
+        request = self._build_request(sys_msg, messages, temperature, stop_sequences, max_tokens, cache_system)
+        return self._response_text(self._create(request), stop_sequences)
 
-        for msg in messages:
-            api_messages.append(self._create_api_message(msg.role, msg.content))
+    async def execute_async(
+        self,
+        sys_msg: str,
+        messages: List[Message],
+        temperature: float = 0.2,
+        stop_sequences: List[str] = None,
+        max_tokens: int = 4000,
+        cache_system: Optional[bool] = None,
+    ) -> str:
+        """
+        Async variant of `execute` using `AsyncAnthropic`, with the same rate limiting and retries.
+        """
+        request = self._build_request(sys_msg, messages, temperature, stop_sequences, max_tokens, cache_system)
+        return self._response_text(await self._create_async(request), stop_sequences)
 
-        message = self.client.beta.messages.create(
-            model=self.ai_model_name,
-            max_tokens=max_tokens,
-            temperature=temperature,
-            system=sys_msg,
-            messages=api_messages,
-            stop_sequences=stop_sequences,
-        )
+    def execute_structured(
+        self,
+        sys_msg: str,
+        messages: List[Message],
+        output_schema: OutputSchema,
+        temperature: float = 0.2,
+        max_tokens: int = 4000,
+        cache_system: Optional[bool] = None,
+    ) -> Dict[str, Any]:
+        """
+        Makes an API call that forces Claude to call `output_schema` as a tool, returning the call's input.
 
-        if stop_sequences and message.stop_reason == "stop_sequence":
-            return message.content[0].text + message.stop_sequence
+        The API validates the call against the schema, so the response needs no text parsing. A
+        response cut off by `max_tokens` before the call returns an empty dict.
+        """
+        request = self._build_request(sys_msg, messages, temperature, None, max_tokens, cache_system, output_schema)
+        return self._response_output(self._create(request), output_schema)
 
-        return message.content[0].text
+    async def execute_structured_async(
+        self,
+        sys_msg: str,
+        messages: List[Message],
+        output_schema: OutputSchema,
+        temperature: float = 0.2,
+        max_tokens: int = 4000,
+        cache_system: Optional[bool] = None,
+    ) -> Dict[str, Any]:
+        """Async variant of `execute_structured`."""
+        request = self._build_request(sys_msg, messages, temperature, None, max_tokens, cache_system, output_schema)
+        return self._response_output(await self._create_async(request), output_schema)
+
+    def _create(self, request: Dict[str, Any]) -> Any:
+        """Sends a messages.create request with rate limiting and retries, returning the parsed message."""
+        attempt = 0
+        while True:
+            self.rate_limiter.acquire()
+            try:
+                raw_response = self.client.beta.messages.with_raw_response.create(**request)
+            except (APIStatusError, APIConnectionError) as e:
+                time.sleep(self._retry_delay(e, attempt))
+                attempt += 1
+                continue
+
+            self.rate_limiter.update(raw_response.headers)
+            message = raw_response.parse()
+            self._record_usage(message)
+            return message
+
+    async def _create_async(self, request: Dict[str, Any]) -> Any:
+        client = self._get_async_client()
+        attempt = 0
+        while True:
+            await self.rate_limiter.acquire_async()
+            try:
+                raw_response = await client.beta.messages.with_raw_response.create(**request)
+            except (APIStatusError, APIConnectionError) as e:
+                await asyncio.sleep(self._retry_delay(e, attempt))
+                attempt += 1
+                continue
+
+            self.rate_limiter.update(raw_response.headers)
+            message = raw_response.parse()
+            self._record_usage(message)
+            return message
+
+    def _retry_delay(self, error: Exception, attempt: int) -> float:
+        """
+        Returns how long to wait before retrying a failed request, re-raising `error` if it should not be retried.
+
+        These retries cover transport and capacity failures only. Responses that arrive but cannot
+        be parsed are handled by the caller, e.g. JudgeExecutor's retry prompt.
+        """
+        retry_after = None
+        if isinstance(error, APIStatusError):
+            headers = error.response.headers
+            self.rate_limiter.update(headers)
+            if not is_retryable_status(error.status_code, headers):
+                raise error
+            retry_after = parse_retry_after(headers)
+
+        if attempt >= self.retry_policy.max_retries:
+            raise error
+        return self.retry_policy.delay(attempt, retry_after)
+
+    def execute_batch(
+        self,
+        requests: List[BatchRequest],
+        max_tokens: int = 4000,
+        poll_interval: float = 30.0,
+        timeout: Optional[float] = None,
+    ) -> Dict[str, Optional[str]]:
+        """
+        Executes the requests through the Message Batches API.
+
+        Requests are submitted in batches of up to `MAX_REQUESTS_PER_MESSAGE_BATCH`, which are
+        polled every `poll_interval` seconds until they end. Batches can take up to 24 hours.
+
+        Args:
+            requests: The requests to run, each with a unique `custom_id`
+            max_tokens: Maximum tokens in each response
+            poll_interval: Seconds to wait between status checks
+            timeout: Seconds to wait for all batches to end before raising TimeoutError
+
+        Returns:
+            Dict mapping each `custom_id` to Claude's response text, or to the forced tool call's
+            input encoded as JSON for requests with an `output_schema`, or None if it errored or expired
+        """
+        # Batch calls are few and not latency sensitive, so the SDK's own retries are enough
+        client = self.client.with_options(max_retries=self.retry_policy.max_retries)
+        requests_by_id: Dict[str, BatchRequest] = {}
+        batch_ids = []
+        for start in range(0, len(requests), MAX_REQUESTS_PER_MESSAGE_BATCH):
+            api_requests = []
+            for request in requests[start:start + MAX_REQUESTS_PER_MESSAGE_BATCH]:
+                params = self._build_request(
+                    request.sys_msg, request.messages, request.temperature, request.stop_sequences, max_tokens,
+                    output_schema=request.output_schema,
+                )
+                api_requests.append({
+                    "custom_id": request.custom_id,
+                    "params": {key: value for key, value in params.items() if value is not None},
+                })
+                requests_by_id[request.custom_id] = request
+            batch_ids.append(client.messages.batches.create(requests=api_requests).id)
+
+        deadline = None if timeout is None else time.monotonic() + timeout
+        results: Dict[str, Optional[str]] = {request.custom_id: None for request in requests}
+        for batch_id in batch_ids:
+            batch = client.messages.batches.retrieve(batch_id)
+            while batch.processing_status != "ended":
+                if deadline is not None and time.monotonic() > deadline:
+                    raise TimeoutError(f"Message batch {batch_id} did not end within {timeout} seconds")
+                time.sleep(poll_interval)
+                batch = client.messages.batches.retrieve(batch_id)
+
+            for entry in client.messages.batches.results(batch_id):
+                if entry.result.type == "succeeded":
+                    self._record_usage(entry.result.message)
+                    request = requests_by_id[entry.custom_id]
+                    if request.output_schema is not None:
+                        output = self._response_output(entry.result.message, request.output_schema)
+                        results[entry.custom_id] = json.dumps(output)
+                    else:
+                        results[entry.custom_id] = self._response_text(entry.result.message, request.stop_sequences)
+                else:
+                    print(f"Batch request {entry.custom_id} did not succeed: {entry.result.type}")
+
+        return results
 
 
 class Claude35SonnetExec(ClaudeModelExecutor):
@@ -0,0 +1,232 @@
+import asyncio
+import json
+import math
+import random
+import re
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from model_exec.model_executor import Message, ModelExecutor, OutputSchema, TokenUsage, UsageTracker
+
+
+
+# Judge responses the fake can produce, covering every branch of YAMLResponseParser and JudgeExecutor
+VALID = "valid"  # Parses directly
+FENCED = "fenced"  # Parses directly from a ```yaml block
+UNESCAPED_QUOTES = "unescaped_quotes"  # Parses after _preprocess_yaml quotes the thoughts
+MULTILINE_THOUGHTS = "multiline_thoughts"  # Parses after _preprocess_yaml folds the continuation line
+INVALID_YAML = "invalid_yaml"  # YAML error, recovered by extract_score_fallback
+SCORE_ONLY = "score_only"  # No thoughts key, recovered by extract_score_fallback
+NO_SCORE = "no_score"  # Nothing to recover, so the judge retries with error details
+TIMEOUT = "timeout"  # Raises TimeoutError after `timeout` seconds
+TRUNCATED = "truncated"  # Cut off by max_tokens before the score, so even a structured response is retried
+
+# Conversations in a JudgeExecutor packed prompt
+_PACKED_CONVERSATION_PATTERN = re.compile(r"^## Conversation (\d+)\n```(.*?)\n```", re.MULTILINE | re.DOTALL)
+
+DEFAULT_RESPONSE_WEIGHTS: Dict[str, float] = {
+    VALID: 0.55,
+    FENCED: 0.15,
+    UNESCAPED_QUOTES: 0.08,
+    MULTILINE_THOUGHTS: 0.05,
+    INVALID_YAML: 0.05,
+    SCORE_ONLY: 0.05,
+    NO_SCORE: 0.05,
+    TIMEOUT: 0.02,
+}
+
+
+class FakeModelExecutor(ModelExecutor):
+    """
+    A judge model stand-in for benchmarks and tests that never calls an API.
+
+    Each response kind is drawn from `response_weights` and each latency from a log-normal
+    distribution with median `latency_p50` seconds. Both are seeded from `seed` and the request
+    itself, so the same request always gets the same response regardless of concurrency. The
+    n-th repeat of a request always gets the same latency, which differs between repeats.
+    Retries are recognised by JudgeExecutor's retry prompt and counted in `stats()`.
+
+    Packed prompts get a YAML list with an entry per conversation. Each conversation draws its
+    own kind and score: NO_SCORE and TRUNCATED leave their entry out, INVALID_YAML leaves out its score, and
+    every other kind gives a valid entry.
+
+    Structured requests are answered with `{thoughts, score}`, or `{verdicts: [...]}` for packed
+    prompts, drawing kinds the same way. A forced tool call always follows its schema, so every
+    kind but TIMEOUT and TRUNCATED gives a valid response. TRUNCATED is not drawn by default.
+    """
+
+    ai_model_name = "fake-judge"
+
+    def __init__(
+        self,
+        response_weights: Optional[Dict[str, float]] = None,
+        latency_p50: float = 0.8,
+        latency_sigma: float = 0.4,
+        timeout: float = 10.0,
+        seed: int = 0,
+    ):
+        self.response_weights = response_weights or DEFAULT_RESPONSE_WEIGHTS
+        self.latency_p50 = latency_p50
+        self.latency_sigma = latency_sigma
+        self.timeout = timeout
+        self.seed = seed
+        self.usage = UsageTracker()
+        self._lock = threading.Lock()
+        self._stats: Dict[str, int] = {}
+        self._occurrences: Dict[str, int] = {}
+        self.reset_stats()
+
+    def execute(
+            self,
+            sys_msg: str,
+            messages: List[Message],
+            temperature: float = 0.2,
+            stop_sequences: List[str] = None
+    ) -> str:
+        kind, latency, score, packed_conversations = self._draw(sys_msg, messages)
+        time.sleep(latency)
+        return self._finish(kind, sys_msg, messages, self._render(kind, score, sys_msg, packed_conversations))
+
+    async def execute_async(
+            self,
+            sys_msg: str,
+            messages: List[Message],
+            temperature: float = 0.2,
+            stop_sequences: List[str] = None
+    ) -> str:
+        kind, latency, score, packed_conversations = self._draw(sys_msg, messages)
+        await asyncio.sleep(latency)
+        return self._finish(kind, sys_msg, messages, self._render(kind, score, sys_msg, packed_conversations))
+
+    def execute_structured(
+            self,
+            sys_msg: str,
+            messages: List[Message],
+            output_schema: OutputSchema,
+            temperature: float = 0.2
+    ) -> Dict[str, Any]:
+        kind, latency, score, packed_conversations = self._draw(sys_msg, messages)
+        time.sleep(latency)
+        output = self._render_output(kind, score, sys_msg, packed_conversations)
+        self._finish(kind, sys_msg, messages, json.dumps(output))
+        return output
+
+    async def execute_structured_async(
+            self,
+            sys_msg: str,
+            messages: List[Message],
+            output_schema: OutputSchema,
+            temperature: float = 0.2
+    ) -> Dict[str, Any]:
+        kind, latency, score, packed_conversations = self._draw(sys_msg, messages)
+        await asyncio.sleep(latency)
+        output = self._render_output(kind, score, sys_msg, packed_conversations)
+        self._finish(kind, sys_msg, messages, json.dumps(output))
+        return output
+
+    def stats(self) -> Dict[str, int]:
+        """Returns counts of calls, retries, timeouts and each response kind."""
+        with self._lock:
+            return dict(self._stats)
+
+    def reset_stats(self) -> None:
+        with self._lock:
+            self._stats = {"calls": 0, "retries": 0, "timeouts": 0}
+            self._stats.update({kind: 0 for kind in self.response_weights})
+
+    def _draw(self, sys_msg: str, messages: List[Message]) -> Tuple[str, float, float, List[Tuple[str, str]]]:
+        """Draws the response kind, latency and score for a request, and finds the conversations of a packed prompt."""
+        request_key = f"{self.seed}\x00{sys_msg}\x00{messages[-1].content}"
+        kind, score = self._draw_verdict(request_key)
+
+        with self._lock:
+            occurrence = self._occurrences.get(request_key, 0)
+            self._occurrences[request_key] = occurrence + 1
+            self._stats["calls"] += 1
+            self._stats["retries"] += "# Previous Failed Response" in messages[-1].content
+            self._stats[kind] += 1
+
+        if kind == TIMEOUT:
+            return kind, self.timeout, score, []
+
+        # Repeats of a request get their own latency, as a hedged duplicate would
+        latency_rng = random.Random(f"{request_key}\x00{occurrence}")
+        latency = self.latency_p50 * math.exp(latency_rng.gauss(0.0, self.latency_sigma))
+
+        packed_conversations = _PACKED_CONVERSATION_PATTERN.findall(messages[-1].content)
+        return kind, latency, score, packed_conversations if len(packed_conversations) > 1 else []
+
+    def _draw_verdict(self, key: str) -> Tuple[str, float]:
+        rng = random.Random(key)
+        kind = rng.choices(list(self.response_weights), weights=list(self.response_weights.values()))[0]
+        return kind, round(rng.uniform(0.0, 1.0), 2)
+
+    def _render(self, kind: str, score: float, sys_msg: str, packed_conversations: List[Tuple[str, str]]) -> str:
+        if kind == TIMEOUT:
+            return ""
+        if packed_conversations:
+            return self._render_packed_response(sys_msg, packed_conversations)
+        return _render_response(kind, score)
+
+    def _render_output(self, kind: str, score: float, sys_msg: str, packed_conversations: List[Tuple[str, str]]) -> Dict[str, Any]:
+        if kind == TIMEOUT:
+            return {}
+        if not packed_conversations:
+            return _render_output(kind, score)
+
+        verdicts = []
+        for entry_id, conversation in packed_conversations:
+            entry_kind, entry_score = self._draw_verdict(f"{self.seed}\x00{sys_msg}\x00{conversation}")
+            if entry_kind != TRUNCATED:
+                verdicts.append({"id": int(entry_id), **_render_output(entry_kind, entry_score)})
+        return {"verdicts": verdicts}
+
+    def _render_packed_response(self, sys_msg: str, conversations: List[Tuple[str, str]]) -> str:
+        entries = []
+        for entry_id, conversation in conversations:
+            kind, score = self._draw_verdict(f"{self.seed}\x00{sys_msg}\x00{conversation}")
+            if kind in (NO_SCORE, TRUNCATED):
+                continue
+            entry = f'- id: {entry_id}\n  thoughts: "The calculator call in this conversation was well formed."'
+            if kind != INVALID_YAML:
+                entry += f"\n  score: {score}"
+            entries.append(entry)
+        return "```yaml\n" + "\n".join(entries) + "\n```"
+
+    def _finish(self, kind: str, sys_msg: str, messages: List[Message], response: str) -> str:
+        if kind == TIMEOUT:
+            with self._lock:
+                self._stats["timeouts"] += 1
+            raise TimeoutError(f"Fake judge request timed out after {self.timeout}s")
+
+        # Roughly 4 characters per token
+        prompt_chars = len(sys_msg) + sum(len(message.content) for message in messages)
+        self.usage.record(TokenUsage(input_tokens=prompt_chars // 4, output_tokens=len(response) // 4))
+        return response
+
+
+def _render_response(kind: str, score: float) -> str:
+    if kind == VALID:
+        return f'thoughts: "The calculator call was well formed and the answer was presented clearly."\nscore: {score}'
+    if kind == FENCED:
+        return f'```yaml\nthoughts: "Correct use of the calculator tool."\nscore: {score}\n```'
+    if kind == UNESCAPED_QUOTES:
+        return f'thoughts: The model said "let me calculate" before calling the tool\nscore: {score}'
+    if kind == MULTILINE_THOUGHTS:
+        return f'thoughts: "The tool call was correct.\nThe final answer restated the result."\nscore: {score}'
+    if kind == INVALID_YAML:
+        return f'thoughts: [the call, was mostly fine\nscore: {score}'
+    if kind == SCORE_ONLY:
+        return f'The assistant used the calculator sensibly.\nScore: {score}'
+    if kind == NO_SCORE:
+        return "I am unable to grade this conversation."
+    if kind == TRUNCATED:
+        return 'thoughts: "The calculator call was well formed and the'
+    raise ValueError(f"Unknown fake response kind: {kind}")
+
+
+def _render_output(kind: str, score: float) -> Dict[str, Any]:
+    if kind == TRUNCATED:
+        return {}
+    return {"thoughts": "The calculator call was well formed and the answer was presented clearly.", "score": score}
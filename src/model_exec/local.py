@@ -0,0 +1,238 @@
+import asyncio
+import threading
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from model_exec.model_executor import BatchRequest, Message, ModelExecutor, TokenUsage, UsageTracker
+
+
+
+DEFAULT_LOCAL_JUDGE_MODEL = "Qwen/Qwen2.5-0.5B-Instruct"
+
+# Generation is constrained to this YAML, which YAMLResponseParser always parses directly
+THOUGHTS_PREFIX = 'thoughts: "'
+SCORE_PREFIX = '"\nscore:'
+SCORE_CANDIDATES = tuple(f" {tenths / 10:.1f}" for tenths in range(11))
+# Characters that would end or break the double-quoted thoughts string
+FORBIDDEN_THOUGHT_CHARACTERS = frozenset('"\\\n\r')
+
+
+class LocalModelExecutor(ModelExecutor):
+    """
+    A judge model running in-process on CPU with Hugging Face transformers, for judging without the API.
+
+    Output is constrained to the judge's YAML format: thoughts are generated inside a quoted
+    string that cannot contain quotes, backslashes or newlines, and the score is restricted to
+    0.0, 0.1, ..., 1.0. Every response therefore parses without fallbacks. Prompts asking for
+    another format, such as JudgeExecutor's packed prompts, get this format too, so judge with
+    a pack size of 1.
+
+    Concurrent `execute_async` calls are gathered into batches of up to `max_batch_size` and
+    generated together in a worker thread. `execute_batch` generates in batches directly.
+    Decoding is greedy, so `temperature` is ignored.
+    """
+
+    def __init__(
+        self,
+        model_name: str = DEFAULT_LOCAL_JUDGE_MODEL,
+        max_batch_size: int = 16,
+        max_thought_tokens: int = 48,
+        batch_linger: float = 0.01,
+        num_threads: Optional[int] = None,
+    ):
+        # Imported here so that importing this module stays cheap
+        import torch
+        from transformers import AutoModelForCausalLM, AutoTokenizer
+
+        if num_threads is not None:
+            torch.set_num_threads(num_threads)
+        self._torch = torch
+        self.ai_model_name = f"local:{model_name}"
+        self.max_batch_size = max_batch_size
+        self.max_thought_tokens = max_thought_tokens
+        self.batch_linger = batch_linger
+        self.usage = UsageTracker()
+
+        self.tokenizer = AutoTokenizer.from_pretrained(model_name)
+        self.tokenizer.padding_side = "left"  # Generated tokens must follow every prompt directly
+        if self.tokenizer.pad_token is None:
+            self.tokenizer.pad_token = self.tokenizer.eos_token
+        self.model = AutoModelForCausalLM.from_pretrained(model_name, torch_dtype=torch.float32)
+        self.model.eval()
+
+        token_texts = self.tokenizer.batch_decode([[token_id] for token_id in range(len(self.tokenizer))])
+        special_ids = set(self.tokenizer.all_special_ids)
+        # Text of each token as generation constraints see it, with special tokens skipped
+        self._token_texts = ["" if i in special_ids else text for i, text in enumerate(token_texts)]
+        self._quote_id = next(i for i, text in enumerate(token_texts) if text == '"' and i not in special_ids)
+        self._thought_token_ids = [
+            i for i, text in enumerate(token_texts)
+            if text and i not in special_ids and not FORBIDDEN_THOUGHT_CHARACTERS.intersection(text)
+        ] + [self._quote_id]
+        self._score_tokens = build_score_token_table(
+            (i, text) for i, text in enumerate(token_texts) if i not in special_ids
+        )
+
+        self._generate_lock = threading.Lock()  # One batch at a time uses all CPU threads best
+        self._queue: List[Tuple[str, List[Message], asyncio.Future]] = []
+        self._batcher: Optional[asyncio.Task] = None
+
+    def execute(
+            self,
+            sys_msg: str,
+            messages: List[Message],
+            temperature: float = 0.2,
+            stop_sequences: List[str] = None
+    ) -> str:
+        return self.generate_batch([(sys_msg, messages)])[0]
+
+    async def execute_async(
+            self,
+            sys_msg: str,
+            messages: List[Message],
+            temperature: float = 0.2,
+            stop_sequences: List[str] = None
+    ) -> str:
+        response = asyncio.get_running_loop().create_future()
+        self._queue.append((sys_msg, messages, response))
+        if self._batcher is None or self._batcher.done():
+            self._batcher = asyncio.ensure_future(self._run_batches())
+        return await response
+
+    def execute_batch(self, requests: List[BatchRequest]) -> Dict[str, Optional[str]]:
+        """Generates the requests in batches of `max_batch_size`. Returns None for requests in a failed batch."""
+        results: Dict[str, Optional[str]] = {}
+        for start in range(0, len(requests), self.max_batch_size):
+            chunk = requests[start:start + self.max_batch_size]
+            try:
+                responses = self.generate_batch([(request.sys_msg, request.messages) for request in chunk])
+            except Exception as e:
+                print(f"Error executing local judge batch: {e}")
+                responses = [None] * len(chunk)
+            results.update({request.custom_id: response for request, response in zip(chunk, responses)})
+        return results
+
+    def generate_batch(self, requests: Sequence[Tuple[str, List[Message]]]) -> List[str]:
+        """Generates a judge response for each (system message, messages) pair in one batch."""
+        prompts = [self._build_prompt(sys_msg, messages) for sys_msg, messages in requests]
+
+        with self._generate_lock, self._torch.inference_mode():
+            if self.max_thought_tokens > 0:
+                generated = self._generate(
+                    prompts,
+                    max_new_tokens=self.max_thought_tokens,
+                    allowed_tokens=lambda text: self._thought_token_ids,
+                    eos_token_id=self._quote_id,
+                )
+                thoughts = [text.split('"')[0] for text in generated]
+            else:
+                thoughts = [""] * len(prompts)
+
+            score_texts = self._generate(
+                [prompt + thought + SCORE_PREFIX for prompt, thought in zip(prompts, thoughts)],
+                max_new_tokens=max(len(candidate) for candidate in SCORE_CANDIDATES),
+                allowed_tokens=lambda text: allowed_score_tokens(text, self._score_tokens) or [self.tokenizer.eos_token_id],
+                eos_token_id=self.tokenizer.eos_token_id,
+            )
+
+        # A score cut off before a complete candidate raises rather than counting as a 0.0 verdict
+        return [render_judge_response(thought, parse_score(text)) for thought, text in zip(thoughts, score_texts)]
+
+    async def _run_batches(self) -> None:
+        while self._queue:
+            # Let requests made at the same time join this batch
+            await asyncio.sleep(self.batch_linger)
+            batch, self._queue = self._queue[:self.max_batch_size], self._queue[self.max_batch_size:]
+            try:
+                responses = await asyncio.to_thread(self.generate_batch, [(sys_msg, messages) for sys_msg, messages, _ in batch])
+            except Exception as e:
+                for _, _, response in batch:
+                    if not response.done():
+                        response.set_exception(e)
+                continue
+            for (_, _, response), text in zip(batch, responses):
+                if not response.done():
+                    response.set_result(text)
+
+    def _build_prompt(self, sys_msg: str, messages: List[Message]) -> str:
+        chat = [{"role": "system", "content": sys_msg}] + [{"role": m.role, "content": m.content} for m in messages]
+        return self.tokenizer.apply_chat_template(chat, tokenize=False, add_generation_prompt=True) + THOUGHTS_PREFIX
+
+    def _generate(
+            self,
+            prompts: List[str],
+            max_new_tokens: int,
+            allowed_tokens: Callable[[str], List[int]],
+            eos_token_id: int,
+    ) -> List[str]:
+        """Greedy batched generation where `allowed_tokens(text generated so far)` lists the token ids allowed next."""
+        inputs = self.tokenizer(prompts, return_tensors="pt", padding=True, add_special_tokens=False)
+        prompt_length = inputs["input_ids"].shape[1]
+
+        outputs = self.model.generate(
+            **inputs,
+            max_new_tokens=max_new_tokens,
+            do_sample=False,
+            prefix_allowed_tokens_fn=incremental_prefix_fn(self._token_texts, prompt_length, allowed_tokens),
+            eos_token_id=eos_token_id,
+            pad_token_id=self.tokenizer.pad_token_id,
+        )
+        generated = outputs[:, prompt_length:]
+
+        input_tokens = inputs["attention_mask"].sum(dim=1).tolist()
+        output_tokens = (generated != self.tokenizer.pad_token_id).sum(dim=1).tolist()
+        for request_input_tokens, request_output_tokens in zip(input_tokens, output_tokens):
+            self.usage.record(TokenUsage(input_tokens=int(request_input_tokens), output_tokens=int(request_output_tokens)))
+
+        return self.tokenizer.batch_decode(generated, skip_special_tokens=True)
+
+
+def incremental_prefix_fn(
+        token_texts: Sequence[str],
+        prompt_length: int,
+        allowed_tokens: Callable[[str], List[int]],
+) -> Callable[[int, Sequence[int]], List[int]]:
+    """
+    A `prefix_allowed_tokens_fn` calling `allowed_tokens` with the text each row generated after its prompt.
+
+    The text is kept per row and only the tokens added since the previous call are decoded, so
+    constraining a row costs time linear in its length rather than quadratic.
+    """
+    decoded: Dict[int, Tuple[int, str]] = {}  # Row -> (length of input_ids decoded, generated text)
+
+    def prefix_allowed_tokens_fn(batch_id: int, input_ids: Sequence[int]) -> List[int]:
+        length, text = decoded.get(batch_id, (prompt_length, ""))
+        text += "".join(token_texts[int(token_id)] for token_id in input_ids[length:])
+        decoded[batch_id] = (len(input_ids), text)
+        return allowed_tokens(text)
+
+    return prefix_allowed_tokens_fn
+
+def build_score_token_table(tokens: Iterable[Tuple[int, str]]) -> Dict[str, List[int]]:
+    """Maps each token text that can appear inside a score candidate to the ids of the tokens with that text."""
+    table: Dict[str, List[int]] = {}
+    for token_id, text in tokens:
+        if text and any(text in candidate for candidate in SCORE_CANDIDATES):
+            table.setdefault(text, []).append(token_id)
+    return table
+
+def allowed_score_tokens(generated: str, score_tokens: Dict[str, List[int]]) -> List[int]:
+    """Token ids that keep `generated` on the way to one of SCORE_CANDIDATES. Empty once a candidate is complete."""
+    if generated in SCORE_CANDIDATES:
+        return []
+    return [
+        token_id
+        for text, token_ids in score_tokens.items()
+        if any(candidate.startswith(generated + text) for candidate in SCORE_CANDIDATES)
+        for token_id in token_ids
+    ]
+
+def parse_score(text: str) -> float:
+    """The score from constrained generation. Raises ValueError if generation stopped before a candidate was complete."""
+    if text not in SCORE_CANDIDATES:
+        raise ValueError(f"Local judge score was cut off before a complete candidate: {text!r}")
+    return float(text)
+
+def render_judge_response(thoughts: str, score: float) -> str:
+    """Renders a verdict in the judge's YAML format, dropping characters that would break the quoted thoughts."""
+    thoughts = "".join(c for c in thoughts if c not in FORBIDDEN_THOUGHT_CHARACTERS).strip()
+    return f'thoughts: "{thoughts}"\nscore: {score:.1f}'
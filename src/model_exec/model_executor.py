@@ -1,5 +1,9 @@
+import asyncio
+import json
+import threading
 from abc import ABC, abstractmethod
-from typing import List, Literal, TypeAlias
+from dataclasses import dataclass, fields
+from typing import Any, Dict, List, Literal, Optional, TypeAlias
 
 from pydantic import BaseModel
 
@@ -8,6 +12,66 @@ MSG_ROLE: TypeAlias = Literal["user", "assistant"]
 class Message(BaseModel):
     role: MSG_ROLE
     content: str
+    cacheable: bool = False  # Mark stable leading content for prompt caching, where supported
+
+
+@dataclass
+class TokenUsage:
+    """Token counts for one or more model calls."""
+    input_tokens: int = 0
+    output_tokens: int = 0
+    cache_creation_input_tokens: int = 0
+    cache_read_input_tokens: int = 0
+
+    def __add__(self, other: "TokenUsage") -> "TokenUsage":
+        return TokenUsage(**{f.name: getattr(self, f.name) + getattr(other, f.name) for f in fields(self)})
+
+
+class UsageTracker:
+    """Thread-safe accumulator of token usage across model calls."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._usage = TokenUsage()
+
+    def record(self, usage: TokenUsage) -> None:
+        with self._lock:
+            self._usage = self._usage + usage
+
+    def snapshot(self, reset: bool = False) -> TokenUsage:
+        """Returns the usage accumulated so far, optionally starting a new accumulation period."""
+        with self._lock:
+            usage = self._usage
+            if reset:
+                self._usage = TokenUsage()
+            return usage
+
+
+class OutputSchema(BaseModel):
+    """
+    A JSON schema a structured response must follow.
+
+    Claude is given it as a tool named `name`, which it is forced to call, so the response is
+    the tool call's input rather than free text.
+    """
+    name: str
+    description: str
+    json_schema: Dict[str, Any]
+
+
+class BatchRequest(BaseModel):
+    """
+    One request within a bulk `execute_batch` call, identified by `custom_id`.
+
+    With `output_schema` set, the request is made with `execute_structured` and its result is
+    the structured response encoded as JSON.
+    """
+    custom_id: str
+    sys_msg: str
+    messages: List[Message]
+    temperature: float = 0.2
+    stop_sequences: Optional[List[str]] = None
+    output_schema: Optional[OutputSchema] = None
 
 
 class ModelExecutor(ABC):
@@ -22,3 +86,82 @@ class ModelExecutor(ABC):
             stop_sequences: List[str] = None
     ) -> str:
         pass
+
+    async def execute_async(
+            self,
+            sys_msg: str,
+            messages: List[Message],
+            temperature: float = 0.2,
+            stop_sequences: List[str] = None
+    ) -> str:
+        """Async variant of `execute`. Runs the blocking call in a worker thread unless overridden."""
+        return await asyncio.to_thread(
+            self.execute,
+            sys_msg=sys_msg,
+            messages=messages,
+            temperature=temperature,
+            stop_sequences=stop_sequences,
+        )
+
+    def execute_structured(
+            self,
+            sys_msg: str,
+            messages: List[Message],
+            output_schema: OutputSchema,
+            temperature: float = 0.2
+    ) -> Dict[str, Any]:
+        """
+        Makes a request whose response follows `output_schema`, returned already parsed.
+
+        Not every model can be constrained this way; check with `supports_structured_output`.
+        """
+        raise NotImplementedError(f"{self.__class__.__name__} does not support structured output")
+
+    async def execute_structured_async(
+            self,
+            sys_msg: str,
+            messages: List[Message],
+            output_schema: OutputSchema,
+            temperature: float = 0.2
+    ) -> Dict[str, Any]:
+        """Async variant of `execute_structured`. Runs the blocking call in a worker thread unless overridden."""
+        return await asyncio.to_thread(
+            self.execute_structured,
+            sys_msg=sys_msg,
+            messages=messages,
+            output_schema=output_schema,
+            temperature=temperature,
+        )
+
+    @property
+    def supports_structured_output(self) -> bool:
+        return type(self).execute_structured is not ModelExecutor.execute_structured
+
+    def execute_batch(self, requests: List[BatchRequest]) -> Dict[str, Optional[str]]:
+        """
+        Executes many independent requests, e.g. for offline scoring.
+
+        Returns a mapping of `custom_id` to response text, or to None if that request failed.
+        Runs the requests one by one unless overridden with a native bulk API.
+        """
+        results: Dict[str, Optional[str]] = {}
+        for request in requests:
+            try:
+                if request.output_schema is not None:
+                    results[request.custom_id] = json.dumps(self.execute_structured(
+                        sys_msg=request.sys_msg,
+                        messages=request.messages,
+                        output_schema=request.output_schema,
+                        temperature=request.temperature,
+                    ))
+                    continue
+                results[request.custom_id] = self.execute(
+                    sys_msg=request.sys_msg,
+                    messages=request.messages,
+                    temperature=request.temperature,
+                    stop_sequences=request.stop_sequences,
+                )
+            except Exception as e:
+                print(f"Error executing batch request {request.custom_id}: {e}")
+                results[request.custom_id] = None
+        return results
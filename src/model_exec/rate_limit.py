@@ -0,0 +1,168 @@
+import asyncio
+import email.utils
+import random
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Mapping, Optional
+
+
+
+# Anthropic reports per-minute limits and what is left of them on every response
+REQUESTS_LIMIT_HEADER = "anthropic-ratelimit-requests-limit"
+REQUESTS_REMAINING_HEADER = "anthropic-ratelimit-requests-remaining"
+TOKEN_LIMIT_PREFIXES = (
+    "anthropic-ratelimit-tokens",
+    "anthropic-ratelimit-input-tokens",
+    "anthropic-ratelimit-output-tokens",
+)
+
+RETRYABLE_STATUS_CODES = {408, 409, 429}
+
+
+class AdaptiveRateLimiter:
+    """
+    A token bucket for API requests that adapts to the rate-limit headers of each response.
+
+    The bucket refills at the reported requests-per-minute limit and is drained to the reported
+    remaining requests, so several processes sharing one API key converge on the key's limit.
+    When the server asks callers to back off (Retry-After, or an exhausted token limit), every
+    caller waits until then. Until a limit is known, only `requests_per_minute` applies, and
+    nothing does if it is None.
+
+    Safe to share between threads and event loops: callers reserve a slot under a lock and then
+    sleep outside it.
+    """
+
+    def __init__(self, requests_per_minute: Optional[float] = None):
+        self._lock = threading.Lock()
+        self._rate: Optional[float] = None  # Requests per second
+        self._capacity = 0.0
+        self._tokens = 0.0
+        self._updated_at = time.monotonic()
+        self._paused_until = 0.0
+        if requests_per_minute is not None:
+            self._set_limit(requests_per_minute)
+            self._tokens = self._capacity
+
+    def acquire(self) -> None:
+        """Blocks until a request may be sent."""
+        delay = self._reserve()
+        if delay > 0:
+            time.sleep(delay)
+
+    async def acquire_async(self) -> None:
+        """Waits until a request may be sent without blocking the event loop."""
+        delay = self._reserve()
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    def update(self, headers: Mapping[str, str]) -> None:
+        """Adjusts the bucket to the rate-limit headers of a response."""
+        now = time.monotonic()
+        with self._lock:
+            limit = _parse_float(headers.get(REQUESTS_LIMIT_HEADER))
+            if limit:
+                self._refill(now)
+                self._set_limit(limit)
+
+            remaining = _parse_float(headers.get(REQUESTS_REMAINING_HEADER))
+            if remaining is not None and self._rate is not None:
+                self._refill(now)
+                self._tokens = min(self._tokens, remaining)
+
+            for prefix in TOKEN_LIMIT_PREFIXES:
+                if _parse_float(headers.get(f"{prefix}-remaining")) == 0:
+                    reset_in = _seconds_until(headers.get(f"{prefix}-reset"))
+                    if reset_in is not None:
+                        self._paused_until = max(self._paused_until, now + reset_in)
+
+            retry_after = parse_retry_after(headers)
+            if retry_after is not None:
+                self._paused_until = max(self._paused_until, now + retry_after)
+
+    def _set_limit(self, requests_per_minute: float) -> None:
+        self._rate = requests_per_minute / 60.0
+        self._capacity = requests_per_minute
+
+    def _refill(self, now: float) -> None:
+        if self._rate is not None:
+            self._tokens = min(self._capacity, self._tokens + (now - self._updated_at) * self._rate)
+        self._updated_at = now
+
+    def _reserve(self) -> float:
+        """Takes a request slot and returns how long the caller must wait before using it."""
+        now = time.monotonic()
+        with self._lock:
+            pause = max(0.0, self._paused_until - now)
+            if self._rate is None:
+                return pause
+
+            self._refill(now)
+            # The bucket may go negative: each waiter owns the slot that refills next
+            self._tokens -= 1
+            wait = -self._tokens / self._rate if self._tokens < 0 else 0.0
+            return max(pause, wait)
+
+
+@dataclass
+class RetryPolicy:
+    """Exponential backoff with full jitter for transient API failures (rate limits, overload, network)."""
+
+    max_retries: int = 5
+    base_delay: float = 0.5
+    max_delay: float = 30.0
+
+    def delay(self, attempt: int, retry_after: Optional[float] = None) -> float:
+        """Seconds to wait before retry number `attempt` (0-based), never less than the server's Retry-After."""
+        backoff = random.uniform(0.0, min(self.max_delay, self.base_delay * 2 ** attempt))
+        if retry_after is not None:
+            return max(backoff, min(retry_after, self.max_delay))
+        return backoff
+
+
+def is_retryable_status(status_code: int, headers: Mapping[str, str]) -> bool:
+    """Whether a failed response should be retried, following the server's x-should-retry hint if given."""
+    should_retry = headers.get("x-should-retry")
+    if should_retry == "true":
+        return True
+    if should_retry == "false":
+        return False
+    return status_code in RETRYABLE_STATUS_CODES or status_code >= 500
+
+def parse_retry_after(headers: Mapping[str, str]) -> Optional[float]:
+    """Returns the seconds to wait from retry-after-ms or Retry-After (seconds or HTTP date), if present."""
+    retry_after_ms = _parse_float(headers.get("retry-after-ms"))
+    if retry_after_ms is not None:
+        return max(0.0, retry_after_ms / 1000)
+
+    retry_after = headers.get("retry-after")
+    if retry_after is None:
+        return None
+    seconds = _parse_float(retry_after)
+    if seconds is not None:
+        return max(0.0, seconds)
+
+    date = email.utils.parsedate_tz(retry_after)
+    if date is None:
+        return None
+    return max(0.0, email.utils.mktime_tz(date) - time.time())
+
+def _parse_float(value: Optional[str]) -> Optional[float]:
+    if value is None:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        return None
+
+def _seconds_until(timestamp: Optional[str]) -> Optional[float]:
+    """Seconds from now until an RFC 3339 timestamp, as used by the *-reset headers."""
+    if not timestamp:
+        return None
+    try:
+        reset_at = datetime.fromisoformat(timestamp.replace("Z", "+00:00"))
+    except ValueError:
+        return None
+    return max(0.0, reset_at.timestamp() - time.time())
@@ -0,0 +1,69 @@
+import asyncio
+import concurrent.futures
+import os
+import threading
+from typing import Any, Coroutine, Optional, TypeVar
+
+T = TypeVar("T")
+
+
+
+class BackgroundEventLoop:
+    """
+    A persistent asyncio event loop running on a daemon thread.
+
+    The trainer calls reward functions synchronously, so they submit their coroutines here.
+    Keeping one loop alive for the whole process lets async clients (and their connection
+    pools) be reused across training steps instead of being rebuilt on every call.
+    """
+
+    def __init__(self, name: str = "background-event-loop"):
+        self.name = name
+        self._lock = threading.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._pid: Optional[int] = None
+
+    def submit(self, coro: Coroutine[Any, Any, T]) -> "concurrent.futures.Future[T]":
+        """Schedules `coro` on the loop and returns a future for its result."""
+        return asyncio.run_coroutine_threadsafe(coro, self._ensure_running())
+
+    def run(self, coro: Coroutine[Any, Any, T], timeout: Optional[float] = None) -> T:
+        """Runs `coro` on the loop and blocks until it finishes."""
+        return self.submit(coro).result(timeout=timeout)
+
+    def close(self, timeout: Optional[float] = None) -> None:
+        """
+        Cancels pending tasks, stops the loop and joins its thread.
+
+        Futures of cancelled coroutines raise CancelledError. A later `submit` starts a new loop.
+        """
+        with self._lock:
+            loop, thread = self._loop, self._thread
+            if loop is None or self._pid != os.getpid():
+                return
+            self._loop = self._thread = None
+
+        async def cancel_pending() -> None:
+            tasks = [task for task in asyncio.all_tasks() if task is not asyncio.current_task()]
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+        try:
+            asyncio.run_coroutine_threadsafe(cancel_pending(), loop).result(timeout=timeout)
+        finally:
+            loop.call_soon_threadsafe(loop.stop)
+            thread.join(timeout=timeout)
+            if not thread.is_alive():
+                loop.close()
+
+    def _ensure_running(self) -> asyncio.AbstractEventLoop:
+        with self._lock:
+            # A forked child inherits the loop object but not the thread running it
+            if self._loop is None or self._pid != os.getpid():
+                self._loop = asyncio.new_event_loop()
+                self._pid = os.getpid()
+                self._thread = threading.Thread(target=self._loop.run_forever, name=self.name, daemon=True)
+                self._thread.start()
+            return self._loop
@@ -1,18 +1,33 @@
-import concurrent.futures
+import asyncio
+import logging
 import os
 from typing import List, Dict, Any, Optional
 
-from model_exec.claude import Claude35HaikuExec
+import numpy as np
+
+from environment.parsed_turn import parse_turn
+from metrics.step_metrics import step_metrics
+from rewards.background_loop import BackgroundEventLoop
 from rewards.exec_judge import JudgeExecutor
-from rewards.verifiers.answer_verifier import is_correct_answer
+from rewards.judge_factory import get_judge_cache, get_tool_judge, peek_judge_model
+from rewards.prefetch import PrefetchRegistry
+from rewards.rule_judge import prejudge_conversation, rule_score_cap
+from rewards.verifiers.answer_verifier import AnswerIndex
+from rewards.verifiers.grounded_verifier import check_grounded_answer, count_repeated_tool_calls
+
 
+logger = logging.getLogger(__name__)
 
-llm_judge = Claude35HaikuExec()
-current_dir_of_this_file = os.path.dirname(os.path.abspath(__file__))
-tool_judge = JudgeExecutor(
-    model_exec=llm_judge,
-    sys_msg_path=os.path.join(current_dir_of_this_file, "tool_judge.md"),
-)
+# The judge model, cache and executor are created by rewards.judge_factory on first use
+judge_loop = BackgroundEventLoop(name="judge-event-loop")
+use_rule_judge = os.getenv("RULE_JUDGE_ENABLED", "1") == "1"
+# Judge calls started by the env as each rollout finishes, collected by judge_tool_use
+reward_prefetch = PrefetchRegistry(judge_loop)
+# GRPOEnvTrainer generates every rank's rollouts in the main process but each rank scores only its
+# own slice, so with several ranks prefetching would judge most rollouts twice
+use_reward_prefetch = os.getenv("REWARD_PREFETCH_ENABLED", "1") == "1" and int(os.getenv("WORLD_SIZE", "1")) == 1
+# Correct answers parsed once, filled from the dataset by CalculatorEnv
+reference_answers = AnswerIndex()
 
 def _format_conversation_for_judge(prompt_msgs: List[Dict[str, str]], completion_msgs: List[Dict[str, str]]) -> Optional[str]:
     """Formats a single conversation into the required string format for the judge."""
@@ -38,20 +53,142 @@ def _format_conversation_for_judge(prompt_msgs: List[Dict[str, str]], completion
     # Join with the separator
     return "\n-\n".join(conversation_parts) if conversation_parts else None
 
-def _process_single_conversation_for_judge(prompt_msgs: List[Dict[str, str]], completion_msgs: List[Dict[str, str]]) -> float:
-    """Formats and judges a single conversation."""
+async def _judge_conversation_str(tool_judge: JudgeExecutor, conversation_str: str) -> float:
+    """Judges an already formatted conversation."""
+    try:
+        judge_result = await tool_judge.run_judge_async(conversation_as_str=conversation_str)
+        return judge_result.score if judge_result and hasattr(judge_result, 'score') else 0.3
+    except Exception as e:
+        print(f"Error during judging conversation: {e}\nConversation:\n{conversation_str}")
+        return 0.0
+
+async def _process_single_conversation_for_judge(
+    tool_judge: JudgeExecutor,
+    prompt_msgs: List[Dict[str, str]],
+    completion_msgs: List[Dict[str, str]],
+) -> float:
+    """Formats and judges a single conversation, collecting the prefetched score if there is one."""
     conversation_str = _format_conversation_for_judge(prompt_msgs, completion_msgs)
 
     if conversation_str is None:
         print(f"Warning: Skipping judge for conversation due to formatting error. Prompt: {prompt_msgs}, Completion: {completion_msgs}")
         return 0.0
 
-    try:
-        judge_result = tool_judge.run_judge(conversation_as_str=conversation_str)
-        return judge_result.score if judge_result and hasattr(judge_result, 'score') else 0.3
-    except Exception as e:
-        print(f"Error during judging conversation: {e}\nConversation:\n{conversation_str}")
-        return 0.0
+    prefetched = reward_prefetch.pop(conversation_str)
+    if prefetched is not None:
+        return await asyncio.wrap_future(prefetched)
+    return await _judge_conversation_str(tool_judge, conversation_str)
+
+def prefetch_rollout_rewards(messages: List[Dict[str, str]]) -> None:
+    """
+    Starts the reward work for a finished rollout so the reward functions only collect it.
+
+    Called by the env as soon as a rollout completes, while the rest of the batch is still
+    generating. The LLM judge call runs on `judge_loop` and is registered in `reward_prefetch`
+    under the same conversation string `judge_tool_use` will build. The final answer is parsed
+    here too, which warms the cache `verify_correctness` reads. Rollouts whose completion
+    `judge_tool_use` receives differently are simply judged again there. Prefetching is off in
+    multi-process runs (WORLD_SIZE above 1), where the process generating the rollouts does not
+    score most of them.
+
+    Args:
+        messages: The whole rollout: the prompt messages followed by the completion.
+    """
+    if not use_reward_prefetch:
+        return
+
+    # The completion starts at the first message the policy generated
+    first_assistant = next((i for i, msg in enumerate(messages) if msg.get("role") == "assistant"), None)
+    if first_assistant is None:
+        return
+    prompt_msgs, completion_msgs = messages[:first_assistant], messages[first_assistant:]
+
+    # verify_correctness reads the final number from the same cached parse
+    if completion_msgs[-1].get("role") == "assistant":
+        parse_turn(completion_msgs[-1].get("content", "")).final_number
+
+    if use_rule_judge and prejudge_conversation(completion_msgs) is not None:
+        return
+    conversation_str = _format_conversation_for_judge(prompt_msgs, completion_msgs)
+    if conversation_str is None:
+        return
+
+    tool_judge = get_tool_judge()
+    reward_prefetch.submit(conversation_str, lambda: _judge_conversation_str(tool_judge, conversation_str))
+
+async def _judge_batch(
+    prompts: List[List[Dict[str, str]]],
+    completions: List[List[Dict[str, str]]],
+) -> List[float]:
+    """
+    Judges every conversation in the batch concurrently.
+
+    Conversations whose score a rubric rule fixes are scored by the rule judge without an LLM
+    call. Rules that only cap the score lower the LLM judge's score of the conversation.
+    """
+    rule_verdicts = [prejudge_conversation(c) if use_rule_judge else None for c in completions]
+    llm_indices = [i for i, verdict in enumerate(rule_verdicts) if verdict is None]
+    tool_judge = get_tool_judge() if llm_indices else None
+
+    results = await asyncio.gather(
+        *(_process_single_conversation_for_judge(tool_judge, prompts[i], completions[i]) for i in llm_indices),
+        return_exceptions=True,
+    )
+
+    rewards = [verdict.score if verdict is not None else 0.0 for verdict in rule_verdicts]
+    num_capped = 0
+    for index, result in zip(llm_indices, results):
+        if isinstance(result, BaseException):
+            print(f'Conversation at index {index} generated an exception during judging: {result}')
+            rewards[index] = 0.0 # Assign default score on exception
+            continue
+        rewards[index] = result
+        cap = rule_score_cap(completions[index]) if use_rule_judge else None
+        if cap is not None and result > cap.score:
+            rewards[index] = cap.score
+            num_capped += 1
+
+    if tool_judge is not None and tool_judge.hedger is not None:
+        hedge_stats = tool_judge.hedger.stats()
+        tool_judge.hedger.reset_stats()
+        step_metrics.add_counts("judge/hedging", {key: hedge_stats[key] for key in ("calls", "hedges", "hedge_wins", "deadline_exceeded")})
+        logger.info(
+            f"Judge hedging: {hedge_stats['hedges']} of {hedge_stats['calls']} calls hedged, "
+            f"{hedge_stats['hedge_wins']} hedges won, {hedge_stats['deadline_exceeded']} past deadline, "
+            f"call latency p50 {hedge_stats['p50_latency']:.2f}s p99 {hedge_stats['p99_latency']:.2f}s"
+        )
+
+    if tool_judge is not None and tool_judge.pack_size > 1:
+        pack_stats = tool_judge.pack_stats()
+        tool_judge.reset_pack_stats()
+        step_metrics.add_counts("judge/packing", pack_stats)
+        logger.info(
+            f"Judge packing: {pack_stats['packed_conversations']} conversations judged in "
+            f"{pack_stats['packed_requests']} packed requests, {pack_stats['fallbacks']} judged on their own after a bad entry"
+        )
+
+    if tool_judge is not None:
+        parse_stats = tool_judge.parse_stats()
+        tool_judge.reset_parse_stats()
+        num_retries = parse_stats.pop("retries", 0)
+        num_parsed = sum(parse_stats.values())
+        if num_parsed:
+            logger.info(
+                f"Judge parsing ({'structured' if tool_judge.structured_output else 'yaml'}): {num_parsed} responses, "
+                f"{num_retries} retry requests ({num_retries / num_parsed:.1%}), "
+                f"{parse_stats.get('failed', 0)} failed ({parse_stats.get('failed', 0) / num_parsed:.1%})"
+            )
+
+    num_rule_judged = len(rule_verdicts) - len(llm_indices)
+    step_metrics.increment("judge/rule_judged", num_rule_judged)
+    step_metrics.increment("judge/llm_judged", len(llm_indices))
+    step_metrics.increment("judge/rule_capped", num_capped)
+    logger.info(
+        f"Rule judge scored {num_rule_judged}/{len(rule_verdicts)} conversations "
+        f"({num_rule_judged / len(rule_verdicts):.0%} of judge calls removed), "
+        f"capped {num_capped} LLM judge scores"
+    )
+    return rewards
 
 def judge_tool_use(
     prompts: List[List[Dict[str, str]]],
@@ -74,25 +211,69 @@ def judge_tool_use(
     if len(prompts) != len(completions):
          raise ValueError(f"Prompts ({len(prompts)}) and completions ({len(completions)}) must have the same length.")
 
-    rewards = [0.0] * len(prompts)
+    with step_metrics.timer("rewards/judge_tool_use"):
+        rewards = judge_loop.run(_judge_batch(prompts, completions))
 
-    with concurrent.futures.ThreadPoolExecutor(max_workers=10) as executor:
-        future_to_index = {
-            executor.submit(_process_single_conversation_for_judge, p, c): i
-            for i, (p, c) in enumerate(zip(prompts, completions))
-        }
+    # Prefetched judge calls for rollouts this step did not score are not needed again
+    reward_prefetch.end_step()
+    prefetch_stats = reward_prefetch.stats()
+    reward_prefetch.reset_stats()
+    step_metrics.add_counts("judge/prefetch", prefetch_stats)
+    if prefetch_stats["submitted"] or prefetch_stats["collected"]:
+        logger.info(
+            f"Reward prefetch: {prefetch_stats['collected']}/{len(prompts)} judge scores prefetched, "
+            f"{prefetch_stats['ready_when_collected']} already finished when collected, "
+            f"{prefetch_stats['discarded']} discarded"
+        )
 
-        for future in concurrent.futures.as_completed(future_to_index):
-            index = future_to_index[future]
-            try:
-                score = future.result()
-                rewards[index] = score
-            except Exception as exc:
-                print(f'Conversation at index {index} generated an exception during judging: {exc}')
-                rewards[index] = 0.0 # Assign default score on exception
+    judge_cache = get_judge_cache()
+    cache_stats = judge_cache.stats()
+    judge_cache.reset_stats()
+    step_metrics.add_counts("judge/cache", cache_stats)
+    logger.info(
+        f"Judge cache: {cache_stats['misses']} judge calls made, "
+        f"{cache_stats['hits'] + cache_stats['disk_hits'] + cache_stats['coalesced']} saved "
+        f"(memory: {cache_stats['hits']}, disk: {cache_stats['disk_hits']}, in-flight: {cache_stats['coalesced']})"
+    )
+    judge_model = peek_judge_model()
+    if hasattr(judge_model, "escalation_stats"):
+        escalation_stats = judge_model.escalation_stats()
+        judge_model.reset_escalation_stats()
+        step_metrics.add_counts("judge/distilled", escalation_stats)
+        logger.info(
+            f"Distilled judge: {escalation_stats['distilled']} scored, "
+            f"{escalation_stats['escalated']} escalated to the LLM judge"
+        )
+    usage_tracker = getattr(judge_model, "usage", None)
+    if usage_tracker is not None:
+        usage = usage_tracker.snapshot(reset=True)
+        logger.info(
+            f"Judge tokens: {usage.input_tokens} uncached input, {usage.cache_read_input_tokens} read from prompt cache, "
+            f"{usage.cache_creation_input_tokens} written to prompt cache, {usage.output_tokens} output"
+        )
 
     return rewards
 
+def _verify_batch(completions: List[List[Dict[str, str]]], correct_answers: List[Any]) -> List[float]:
+    """Scores each completion's final answer against its correct answer, comparing the whole batch at once."""
+    # NaN where there is no final answer, which never matches
+    agent_numbers = np.full(len(completions), np.nan)
+    for i, completion_msgs in enumerate(completions):
+        if not completion_msgs or completion_msgs[-1].get("role") != "assistant":
+            continue
+
+        final_assistant_response = completion_msgs[-1].get("content", "")
+        try:
+            # Shares the extraction with any other reader of this message
+            agent_numerical = parse_turn(final_assistant_response).final_number
+        except Exception as e:
+            print(f"Error during verification for index {i}: {e}. Agent answer: '{final_assistant_response}', Correct answer: '{correct_answers[i]}'")
+            continue
+        if agent_numerical is not None:
+            agent_numbers[i] = agent_numerical
+
+    return reference_answers.matches(agent_numbers, correct_answers).astype(np.float64).tolist()
+
 def verify_correctness(
     prompts: List[List[Dict[str, str]]],
     completions: List[List[Dict[str, str]]],
@@ -123,27 +304,50 @@ def verify_correctness(
     if len(correct_answers) != len(prompts):
          raise ValueError(f"Length mismatch: prompts ({len(prompts)}) vs kwargs['answer'] ({len(correct_answers)}).")
 
-    results = []
-    for i, (prompt_msgs, completion_msgs) in enumerate(zip(prompts, completions)):
-        if not completion_msgs:
-            results.append(0.0)
-            continue
+    with step_metrics.timer("rewards/verify_correctness"):
+        results = _verify_batch(completions, correct_answers)
+    step_metrics.increment("verifier/correct", sum(results))
+    step_metrics.increment("verifier/incorrect", len(results) - sum(results))
+    return results
+
+def verify_grounded_answer(
+    prompts: List[List[Dict[str, str]]],
+    completions: List[List[Dict[str, str]]],
+    **kwargs: Any
+) -> List[float]:
+    """
+    Checks each conversation's final answer against the calculator instead of the dataset's answer.
 
-        last_message = completion_msgs[-1]
-
-        if last_message.get("role") == "assistant":
-            final_assistant_response = last_message.get("content", "")
-            correct_answer_for_this_prompt = correct_answers[i]
-            try:
-                is_correct = is_correct_answer(
-                    agent_answer=final_assistant_response,
-                    correct_answer=correct_answer_for_this_prompt
-                )
-                results.append(1.0 if is_correct else 0.0)
-            except Exception as e:
-                 print(f"Error during verification for index {i}: {e}. Agent answer: '{final_assistant_response}', Correct answer: '{correct_answer_for_this_prompt}'")
-                 results.append(0.0)
-        else:
-            results.append(0.0)
+    Half the score is for transcribing the last calculator output faithfully, however the
+    dataset's answer was rounded. The other half is for a calculator expression whose result
+    matches the reference expression in the dataset's `expression` column. Conversations
+    without a usable reference expression are scored on the transcription alone.
 
-    return results
+    Args:
+        prompts: List of conversation starts (each a list of message dicts).
+        completions: List of conversation continuations (each a list of message dicts).
+        **kwargs: Catches extra arguments passed by the trainer, expected
+                  to contain an "expression" key with a list of reference expressions.
+
+    Returns:
+        List of scores between 0.0 and 1.0.
+    """
+    if not prompts or not completions:
+        return []
+    if len(prompts) != len(completions):
+        raise ValueError(f"Prompts ({len(prompts)}) and completions ({len(completions)}) must have the same length.")
+
+    expressions = kwargs.get("expression")
+    if expressions is None:
+        raise ValueError("Missing 'expression' key in kwargs for verify_grounded_answer.")
+    if len(expressions) != len(prompts):
+        raise ValueError(f"Length mismatch: prompts ({len(prompts)}) vs kwargs['expression'] ({len(expressions)}).")
+
+    with step_metrics.timer("rewards/verify_grounded_answer"):
+        checks = [check_grounded_answer(completion_msgs, expression) for completion_msgs, expression in zip(completions, expressions)]
+        repeated_tool_calls = count_repeated_tool_calls(prompts, completions)
+    step_metrics.increment("verifier/grounded/transcribed", sum(check.transcribed for check in checks))
+    step_metrics.increment("verifier/grounded/expression_correct", sum(bool(check.expression_correct) for check in checks))
+    step_metrics.increment("verifier/grounded/no_reference", sum(check.expression_correct is None for check in checks))
+    step_metrics.increment("verifier/grounded/repeated_tool_calls", repeated_tool_calls)
+    return [check.score for check in checks]
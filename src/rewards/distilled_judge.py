@@ -0,0 +1,392 @@
+import re
+import threading
+import zlib
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from environment.parsed_turn import parse_turn
+from environment.tools.calculator import Expression
+from model_exec.model_executor import Message, ModelExecutor, OutputSchema
+from rewards.exec_judge import extract_judged_conversation, judge_response_from_output
+from rewards.judge_yaml_response_parser import YAMLResponseParser
+from rewards.verdict_log import VerdictLog
+
+
+# The judge scores to one decimal place, so the scorer classifies into these bins
+SCORE_BINS = np.round(np.arange(11) / 10, 1)
+DEFAULT_HASH_BITS = 16
+DEFAULT_MIN_CONFIDENCE = 0.8
+
+_TOKEN_PATTERN = re.compile(r"\w+|[^\w\s]")
+_OUTPUT_PATTERN = re.compile(r"<output>(.*?)</output>", re.DOTALL)
+
+# Sparse features of a batch: (feature indices, feature values, row of each feature)
+SparseBatch = Tuple[np.ndarray, np.ndarray, np.ndarray]
+
+
+def conversation_features(conversation_as_str: str) -> Dict[str, float]:
+    """
+    Named features of a judge conversation, as formatted by `_format_conversation_for_judge`.
+
+    Word unigrams and bigrams of the assistant messages, plus the structure the rubric grades:
+    tags per turn, parse errors, extra text, expression shape, and whether the final answer
+    restates the calculator output.
+    """
+    features: Dict[str, float] = {"bias": 1.0}
+    messages = []
+    for part in conversation_as_str.split("\n-\n"):
+        header, _, content = part.partition("\n")
+        messages.append((header[len("By: "):], content))
+    assistant_turns = [content for role, content in messages if role == "assistant"]
+    # The first user message is the question, later ones are the env's responses
+    env_responses = [content for role, content in messages[1:] if role == "user"]
+    outputs = [output for content in env_responses for output in _OUTPUT_PATTERN.findall(content)]
+
+    def add(name: str, value: float = 1.0) -> None:
+        features[name] = features.get(name, 0.0) + value
+
+    add("assistant_turns", min(len(assistant_turns), 5) / 5)
+    add("calculator_outputs", min(len(outputs), 5) / 5)
+    add("env_errors", float(any(content.startswith("Error:") for content in env_responses)))
+
+    for index, content in enumerate(assistant_turns):
+        position = "first" if index == 0 else "last" if index == len(assistant_turns) - 1 else "middle"
+        tokens = [token.lower() for token in _TOKEN_PATTERN.findall(content)]
+        for token in tokens:
+            add(f"u:{token}", 1 / len(tokens))
+        for first, second in zip(tokens, tokens[1:]):
+            add(f"b:{first} {second}", 1 / len(tokens))
+
+        turn = parse_turn(content)
+        add(f"{position}:tags:{min(turn.tag_count, 3)}")
+        add(f"{position}:calls_calculator", float(turn.calls_calculator))
+        add(f"{position}:parse_error", float(turn.parse_error is not None))
+        add(f"{position}:extra_text", min(len(turn.extra_text.strip()), 200) / 200)
+        if turn.expression is not None:
+            depth, nodes, operations = _expression_shape(turn.expression)
+            add(f"{position}:depth:{min(depth, 4)}")
+            add(f"{position}:nodes", min(nodes, 20) / 20)
+            for operation in operations:
+                add(f"{position}:op:{operation}")
+
+    if assistant_turns:
+        final_number = parse_turn(assistant_turns[-1]).final_number
+        add("final:has_number", float(final_number is not None))
+        if final_number is not None and outputs:
+            try:
+                add("final:matches_output", float(abs(final_number - float(outputs[-1])) < 1e-6))
+            except ValueError:
+                pass
+    return features
+
+def featurize(conversations: Sequence[str], n_features: int) -> SparseBatch:
+    """Hashes each conversation's features into `n_features` columns with a hash that is stable across processes."""
+    indices, values, rows = [], [], []
+    for row, conversation_as_str in enumerate(conversations):
+        for name, value in conversation_features(conversation_as_str).items():
+            indices.append(zlib.crc32(name.encode("utf-8")) % n_features)
+            values.append(value)
+            rows.append(row)
+    return np.array(indices, dtype=np.int64), np.array(values, dtype=np.float64), np.array(rows, dtype=np.int64)
+
+def render_distilled_response(score: float, confidence: float) -> str:
+    return f'thoughts: "Scored by the distilled judge with confidence {confidence:.2f}."\nscore: {score:.1f}'
+
+def render_distilled_output(score: float, confidence: float) -> Dict[str, Any]:
+    return {"thoughts": f"Scored by the distilled judge with confidence {confidence:.2f}.", "score": round(score, 1)}
+
+
+class DistilledScorer(ModelExecutor):
+    """
+    A softmax regression over hashed conversation features that predicts the judge's score bin.
+
+    Trained on logged judge verdicts with `train_distilled_scorer`. As a ModelExecutor it answers
+    first judge prompts in the judge's YAML format. Use it through EscalatingJudgeModel so that
+    predictions it is unsure of are judged by the LLM instead.
+    """
+
+    ai_model_name = "distilled-judge"
+
+    def __init__(self, weights: np.ndarray, bias: np.ndarray):
+        self.weights = weights
+        self.bias = bias
+
+    @property
+    def n_features(self) -> int:
+        return self.weights.shape[0]
+
+    def predict(self, conversations: Sequence[str]) -> Tuple[np.ndarray, np.ndarray]:
+        """Returns the predicted score and its probability for each conversation."""
+        probabilities = _softmax(self._logits(featurize(conversations, self.n_features), len(conversations)))
+        best = probabilities.argmax(axis=1)
+        return SCORE_BINS[best], probabilities[np.arange(len(conversations)), best]
+
+    def execute(
+            self,
+            sys_msg: str,
+            messages: List[Message],
+            temperature: float = 0.2,
+            stop_sequences: List[str] = None
+    ) -> str:
+        conversation_as_str = extract_judged_conversation(messages[-1].content)
+        if conversation_as_str is None:
+            raise ValueError("The distilled judge can only answer a first judge prompt for a single conversation")
+        scores, confidences = self.predict([conversation_as_str])
+        return render_distilled_response(float(scores[0]), float(confidences[0]))
+
+    def save(self, path: str) -> None:
+        # Through a file handle, as np.savez appends .npz to paths without it and `load` would miss the file
+        with open(path, "wb") as f:
+            np.savez(f, weights=self.weights, bias=self.bias)
+
+    @classmethod
+    def load(cls, path: str) -> "DistilledScorer":
+        with np.load(path) as data:
+            return cls(weights=data["weights"], bias=data["bias"])
+
+    def _logits(self, batch: SparseBatch, num_rows: int) -> np.ndarray:
+        indices, values, rows = batch
+        logits = np.tile(self.bias, (num_rows, 1))
+        np.add.at(logits, rows, self.weights[indices] * values[:, None])
+        return logits
+
+
+class EscalatingJudgeModel(ModelExecutor):
+    """
+    Scores conversations with a DistilledScorer and escalates those it is unsure of to an LLM judge model.
+
+    Predictions with a probability of at least `min_confidence` are answered directly; the rest,
+    and any retry or packed prompts, go to `fallback`. Verdicts the fallback makes for single
+    conversations are appended to `verdict_log`, so the scorer can be retrained on them.
+    Structured requests are supported if the fallback supports them.
+    """
+
+    def __init__(
+        self,
+        scorer: DistilledScorer,
+        fallback: ModelExecutor,
+        min_confidence: float = DEFAULT_MIN_CONFIDENCE,
+        verdict_log: Optional[VerdictLog] = None,
+    ):
+        self.scorer = scorer
+        self.fallback = fallback
+        self.min_confidence = min_confidence
+        self.verdict_log = verdict_log
+        self.ai_model_name = f"{fallback.ai_model_name}+{scorer.ai_model_name}"
+        self._lock = threading.Lock()
+        self._stats: Dict[str, int] = {}
+        self.reset_escalation_stats()
+
+    @property
+    def usage(self):
+        """Token usage of the fallback model, as the distilled scorer uses none."""
+        return getattr(self.fallback, "usage", None)
+
+    def execute(
+            self,
+            sys_msg: str,
+            messages: List[Message],
+            temperature: float = 0.2,
+            stop_sequences: List[str] = None
+    ) -> str:
+        conversation_as_str, prediction = self._score(messages)
+        if prediction is not None:
+            return render_distilled_response(*prediction)
+        response = self.fallback.execute(sys_msg, messages, temperature, stop_sequences)
+        self._record_escalation(conversation_as_str, _score_from_response(response))
+        return response
+
+    async def execute_async(
+            self,
+            sys_msg: str,
+            messages: List[Message],
+            temperature: float = 0.2,
+            stop_sequences: List[str] = None
+    ) -> str:
+        conversation_as_str, prediction = self._score(messages)
+        if prediction is not None:
+            return render_distilled_response(*prediction)
+        response = await self.fallback.execute_async(sys_msg, messages, temperature, stop_sequences)
+        self._record_escalation(conversation_as_str, _score_from_response(response))
+        return response
+
+    def execute_structured(
+            self,
+            sys_msg: str,
+            messages: List[Message],
+            output_schema: OutputSchema,
+            temperature: float = 0.2
+    ) -> Dict[str, Any]:
+        conversation_as_str, prediction = self._score(messages)
+        if prediction is not None:
+            return render_distilled_output(*prediction)
+        output = self.fallback.execute_structured(sys_msg, messages, output_schema, temperature)
+        self._record_escalation(conversation_as_str, _score_from_output(output))
+        return output
+
+    async def execute_structured_async(
+            self,
+            sys_msg: str,
+            messages: List[Message],
+            output_schema: OutputSchema,
+            temperature: float = 0.2
+    ) -> Dict[str, Any]:
+        conversation_as_str, prediction = self._score(messages)
+        if prediction is not None:
+            return render_distilled_output(*prediction)
+        output = await self.fallback.execute_structured_async(sys_msg, messages, output_schema, temperature)
+        self._record_escalation(conversation_as_str, _score_from_output(output))
+        return output
+
+    @property
+    def supports_structured_output(self) -> bool:
+        return self.fallback.supports_structured_output
+
+    def escalation_stats(self) -> Dict[str, int]:
+        """Counts of requests the scorer answered and requests escalated to the fallback model."""
+        with self._lock:
+            return dict(self._stats)
+
+    def reset_escalation_stats(self) -> None:
+        with self._lock:
+            self._stats = {"distilled": 0, "escalated": 0}
+
+    def _score(self, messages: List[Message]) -> Tuple[Optional[str], Optional[Tuple[float, float]]]:
+        """Returns the conversation in the prompt and the scorer's score and confidence, or None if it must be escalated."""
+        conversation_as_str = extract_judged_conversation(messages[-1].content)
+        if conversation_as_str is not None:
+            scores, confidences = self.scorer.predict([conversation_as_str])
+            if confidences[0] >= self.min_confidence:
+                with self._lock:
+                    self._stats["distilled"] += 1
+                return conversation_as_str, (float(scores[0]), float(confidences[0]))
+
+        with self._lock:
+            self._stats["escalated"] += 1
+        return conversation_as_str, None
+
+    def _record_escalation(self, conversation_as_str: Optional[str], score: Optional[float]) -> None:
+        if self.verdict_log is not None and conversation_as_str is not None and score is not None:
+            self.verdict_log.record(conversation_as_str, score, self.fallback.ai_model_name)
+
+
+def _score_from_response(response: str) -> Optional[float]:
+    try:
+        return YAMLResponseParser.parse_judge_response(response).score
+    except ValueError:
+        return YAMLResponseParser.extract_score_only(response)
+
+def _score_from_output(output: Dict[str, Any]) -> Optional[float]:
+    judge_response = judge_response_from_output(output)
+    return judge_response.score if judge_response is not None else None
+
+
+def train_distilled_scorer(
+    verdicts: Sequence[Tuple[str, float]],
+    hash_bits: int = DEFAULT_HASH_BITS,
+    epochs: int = 10,
+    batch_size: int = 256,
+    learning_rate: float = 0.5,
+    l2: float = 1e-6,
+    seed: int = 0,
+) -> DistilledScorer:
+    """
+    Trains a DistilledScorer on (conversation, judge score) pairs with minibatch AdaGrad.
+
+    Args:
+        verdicts: Pairs as returned by `rewards.verdict_log.load_verdicts`.
+        hash_bits: The scorer hashes features into 2**hash_bits columns.
+        epochs: Passes over the verdicts.
+        batch_size: Verdicts per gradient step.
+        learning_rate: AdaGrad step size.
+        l2: L2 penalty on the weights.
+        seed: Seed for shuffling.
+
+    Returns:
+        The trained scorer.
+    """
+    n_features = 2 ** hash_bits
+    scorer = DistilledScorer(weights=np.zeros((n_features, len(SCORE_BINS))), bias=np.zeros(len(SCORE_BINS)))
+    if not verdicts:
+        return scorer
+
+    conversations = [conversation_as_str for conversation_as_str, _ in verdicts]
+    labels = np.clip(np.rint(np.array([score for _, score in verdicts]) * 10), 0, len(SCORE_BINS) - 1).astype(np.int64)
+    # Features are hashed once up front, then gathered per batch
+    per_row = [featurize([conversation_as_str], n_features) for conversation_as_str in conversations]
+
+    weights_g2 = np.zeros_like(scorer.weights)
+    bias_g2 = np.zeros_like(scorer.bias)
+    rng = np.random.default_rng(seed)
+    for _ in range(epochs):
+        order = rng.permutation(len(verdicts))
+        for start in range(0, len(order), batch_size):
+            batch_rows = order[start:start + batch_size]
+            batch = _stack([per_row[row] for row in batch_rows])
+            indices, values, rows = batch
+
+            gradient = _softmax(scorer._logits(batch, len(batch_rows)))
+            gradient[np.arange(len(batch_rows)), labels[batch_rows]] -= 1.0
+            gradient /= len(batch_rows)
+
+            weights_gradient = np.zeros_like(scorer.weights)
+            np.add.at(weights_gradient, indices, gradient[rows] * values[:, None])
+            weights_gradient += l2 * scorer.weights
+            bias_gradient = gradient.sum(axis=0)
+
+            weights_g2 += weights_gradient ** 2
+            bias_g2 += bias_gradient ** 2
+            scorer.weights -= learning_rate * weights_gradient / (np.sqrt(weights_g2) + 1e-8)
+            scorer.bias -= learning_rate * bias_gradient / (np.sqrt(bias_g2) + 1e-8)
+    return scorer
+
+def evaluate_distilled_scorer(
+    scorer: DistilledScorer,
+    verdicts: Sequence[Tuple[str, float]],
+    min_confidence: float = DEFAULT_MIN_CONFIDENCE,
+) -> Dict[str, float]:
+    """
+    Agreement of the scorer with held-out judge verdicts when escalating below `min_confidence`.
+
+    Returns the fraction of conversations the scorer would answer ("coverage"), its mean absolute
+    error and exact agreement on those, and the mean absolute error over all conversations when
+    escalated ones get the judge's own score.
+    """
+    if not verdicts:
+        return {"coverage": 0.0, "mae_answered": 0.0, "exact_answered": 0.0, "mae_overall": 0.0}
+
+    scores, confidences = scorer.predict([conversation_as_str for conversation_as_str, _ in verdicts])
+    targets = np.array([score for _, score in verdicts])
+    answered = confidences >= min_confidence
+    errors = np.abs(scores - targets)
+    return {
+        "coverage": float(answered.mean()),
+        "mae_answered": float(errors[answered].mean()) if answered.any() else 0.0,
+        "exact_answered": float((errors[answered] < 0.05).mean()) if answered.any() else 0.0,
+        "mae_overall": float(np.where(answered, errors, 0.0).mean()),
+    }
+
+
+def _expression_shape(expression: Expression) -> Tuple[int, int, List[str]]:
+    """Returns (depth, number of operations, operation names) of an expression."""
+    depth, nodes, operations = 1, 1, [expression.operation]
+    for operand in expression.operands:
+        if isinstance(operand, Expression):
+            operand_depth, operand_nodes, operand_operations = _expression_shape(operand)
+            depth = max(depth, operand_depth + 1)
+            nodes += operand_nodes
+            operations += operand_operations
+    return depth, nodes, operations
+
+def _stack(batches: Iterable[SparseBatch]) -> SparseBatch:
+    indices, values, rows = [], [], []
+    for row, (batch_indices, batch_values, _) in enumerate(batches):
+        indices.append(batch_indices)
+        values.append(batch_values)
+        rows.append(np.full(len(batch_indices), row, dtype=np.int64))
+    return np.concatenate(indices), np.concatenate(values), np.concatenate(rows)
+
+def _softmax(logits: np.ndarray) -> np.ndarray:
+    exp = np.exp(logits - logits.max(axis=1, keepdims=True))
+    return exp / exp.sum(axis=1, keepdims=True)
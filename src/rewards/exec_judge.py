@@ -1,75 +1,537 @@
-from typing import Optional
+import asyncio
+import json
+import threading
+import weakref
+from typing import Any, Dict, Generator, List, Optional, Set, Tuple
 
-from model_exec.model_executor import Message, ModelExecutor
+from metrics.step_metrics import step_metrics
+from model_exec.model_executor import BatchRequest, Message, ModelExecutor, OutputSchema
+from rewards.hedging import HedgedRequests, HedgingPolicy
+from rewards.judge_cache import JudgeCache, make_judge_cache_key
 from rewards.judge_resp import JudgeResponse
 from rewards.judge_yaml_response_parser import YAMLResponseParser
+from rewards.verdict_log import VerdictLog
 
 
+# Each step yields the user message to send to the judge model and receives its response text,
+# or its structured response in structured output mode
+JudgeSteps = Generator[str, Any, Optional[JudgeResponse]]
+
+# The first judge prompt for a conversation is the conversation wrapped in these
+JUDGE_PROMPT_PREFIX = "# Conversation\n```"
+JUDGE_PROMPT_SUFFIX = "\n```\nPlease now provide your output in the yaml format specified."
+JUDGE_STRUCTURED_PROMPT_SUFFIX = "\n```\nPlease now submit your output with the submit_verdict tool."
+
+# Structured output mode asks for verdicts through these tools instead of as YAML
+_SCORE_PROPERTY = {"type": "number", "minimum": 0, "maximum": 1, "description": "The score, between 0 and 1."}
+JUDGE_VERDICT_SCHEMA = OutputSchema(
+    name="submit_verdict",
+    description="Submit your verdict on the conversation.",
+    json_schema={
+        "type": "object",
+        "properties": {
+            "thoughts": {"type": "string", "description": "Your concise thoughts on the conversation."},
+            "score": _SCORE_PROPERTY,
+        },
+        "required": ["thoughts", "score"],
+    },
+)
+PACKED_JUDGE_VERDICTS_SCHEMA = OutputSchema(
+    name="submit_verdicts",
+    description="Submit your verdicts on the conversations, one per conversation in order.",
+    json_schema={
+        "type": "object",
+        "properties": {
+            "verdicts": {
+                "type": "array",
+                "items": {
+                    "type": "object",
+                    "properties": {
+                        "id": {"type": "integer", "description": "The conversation's number."},
+                        "thoughts": {"type": "string", "description": "Your concise thoughts on this conversation."},
+                        "score": _SCORE_PROPERTY,
+                    },
+                    "required": ["id", "thoughts", "score"],
+                },
+            },
+        },
+        "required": ["verdicts"],
+    },
+)
+
+# How long a conversation waits for others to share its packed request
+DEFAULT_PACK_LINGER = 0.05
+
+
+def extract_judged_conversation(user_msg: str) -> Optional[str]:
+    """Returns the conversation in a first judge prompt, or None for retry and packed prompts."""
+    if not user_msg.startswith(JUDGE_PROMPT_PREFIX):
+        return None
+    for suffix in (JUDGE_PROMPT_SUFFIX, JUDGE_STRUCTURED_PROMPT_SUFFIX):
+        if user_msg.endswith(suffix):
+            return user_msg[len(JUDGE_PROMPT_PREFIX):len(user_msg) - len(suffix)]
+    return None
+
+
+def judge_response_from_output(output: Any) -> Optional[JudgeResponse]:
+    """Returns the verdict in a structured judge response, or None if it has no score between 0 and 1."""
+    if not isinstance(output, dict):
+        return None
+    score, thoughts = output.get("score"), output.get("thoughts", "")
+    if isinstance(score, bool) or not isinstance(score, (int, float)) or not 0.0 <= score <= 1.0:
+        return None
+    return JudgeResponse(thoughts=thoughts if isinstance(thoughts, str) else "", score=float(score))
+
 
 class JudgeExecutor:
+    """
+    Judges conversations with a model, parsing its verdict and recovering from malformed responses.
+
+    By default the judge answers in YAML, which is parsed with several fallbacks and, failing
+    those, a retry request that includes the parse error. With `structured_output` set, the
+    model is instead forced to answer through the `submit_verdict` tool, so verdicts arrive
+    already parsed and only a response without a valid score is retried. This needs a model
+    that supports structured output, such as Claude.
+
+    Parse outcomes are counted in `parse_stats()` and in `step_metrics`, under `judge/parse/*`
+    for YAML responses and `judge/structured/*` for structured ones.
+    """
+
     def __init__(
-        self, 
+        self,
         model_exec: ModelExecutor,
         sys_msg_path: str,
         max_retries: int = 1,
+        cache: Optional[JudgeCache] = None,
+        max_concurrency: int = 64,
+        hedging: Optional[HedgingPolicy] = None,
+        pack_size: int = 1,
+        pack_linger: float = DEFAULT_PACK_LINGER,
+        verdict_log: Optional[VerdictLog] = None,
+        structured_output: bool = False,
     ):
+        if structured_output and not model_exec.supports_structured_output:
+            raise ValueError(f"{model_exec.ai_model_name} does not support structured output")
         self.model_exec = model_exec
+        self.structured_output = structured_output
         self.max_retries = max_retries
+        self.cache = cache
+        self.max_concurrency = max_concurrency
+        # Semaphores are bound to the loop that first waits on them, so each event loop gets its own
+        self._semaphores: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Semaphore]" = weakref.WeakKeyDictionary()
+        self.hedger = HedgedRequests(hedging) if hedging is not None else None
+        self.verdict_log = verdict_log
+        self.pack_size = pack_size
+        self.pack_linger = pack_linger
+        self._pack_loop: Optional[asyncio.AbstractEventLoop] = None
+        self._pack_queue: List[Tuple[str, asyncio.Future]] = []
+        self._pack_timer: Optional[asyncio.TimerHandle] = None
+        self._pack_tasks: Set[asyncio.Task] = set()
+        self._pack_stats: Dict[str, int] = {}
+        self.reset_pack_stats()
+        self._parse_lock = threading.Lock()
+        self._parse_stats: Dict[str, int] = {}
 
         with open(sys_msg_path, 'r', encoding='utf-8') as f:
             self.relevant_sys_msg = f.read()
-    
+
     def run_judge(
             self,
             conversation_as_str: str
     ) -> Optional[JudgeResponse]:
         """Run the judge to evaluate a conversation with fallback mechanisms."""
-        
-        user_msg = f'# Conversation\n```{conversation_as_str}\n```\nPlease now provide your output in the yaml format specified.'
-        judge_response_str = self.model_exec.execute(
+        with step_metrics.timer("judge/run_judge"):
+            if self.cache is None:
+                return self._run_judge_uncached(conversation_as_str)
+
+            key = self._cache_key(conversation_as_str)
+            return self.cache.get_or_compute(key, lambda: self._run_judge_uncached(conversation_as_str))
+
+    async def run_judge_async(
+            self,
+            conversation_as_str: str
+    ) -> Optional[JudgeResponse]:
+        """
+        Async variant of `run_judge`.
+
+        At most `max_concurrency` judge model calls are in flight at once across all callers.
+        With a hedging policy, slow calls are duplicated within their concurrency slot, so up
+        to the policy's budget of extra calls may be in flight as well.
+
+        With `pack_size` above 1, conversations judged within `pack_linger` seconds of each other
+        share one judge request of up to `pack_size` conversations, so the rubric is sent once per
+        pack. Conversations the packed response gives no usable verdict for are judged on their own.
+        """
+        with step_metrics.timer("judge/run_judge"):
+            if self.cache is None:
+                return await self._run_judge_uncached_async(conversation_as_str)
+
+            key = self._cache_key(conversation_as_str)
+            return await self.cache.get_or_compute_async(key, lambda: self._run_judge_uncached_async(conversation_as_str))
+
+    def run_judge_bulk(
+            self,
+            conversations_as_str: List[str]
+    ) -> List[Optional[JudgeResponse]]:
+        """
+        Judges many conversations for offline scoring using `ModelExecutor.execute_batch`.
+
+        All first attempts are sent as one bulk request, then any error-detail retries as
+        another, so the same fallbacks as `run_judge` apply. Identical conversations are only
+        judged once. Results are returned in the same order as the input.
+        """
+        results: List[Optional[JudgeResponse]] = [None] * len(conversations_as_str)
+        indices_by_conversation: Dict[str, List[int]] = {}
+        for index, conversation_as_str in enumerate(conversations_as_str):
+            indices_by_conversation.setdefault(conversation_as_str, []).append(index)
+
+        # custom_id -> (conversation, judge steps, next user message)
+        active: Dict[str, Tuple[str, JudgeSteps, str]] = {}
+        for conversation_as_str, indices in indices_by_conversation.items():
+            cached = self.cache.get(self._cache_key(conversation_as_str)) if self.cache else None
+            if cached is not None:
+                for index in indices:
+                    results[index] = cached
+                continue
+
+            steps = self._judge_steps(conversation_as_str)
+            active[f"judge-{indices[0]}"] = (conversation_as_str, steps, next(steps))
+
+        while active:
+            with step_metrics.timer("judge/model_batch_call"):
+                responses = self.model_exec.execute_batch([
+                    BatchRequest(
+                        custom_id=custom_id,
+                        sys_msg=self.relevant_sys_msg,
+                        messages=[Message(role="user", content=user_msg)],
+                        output_schema=JUDGE_VERDICT_SCHEMA if self.structured_output else None,
+                    )
+                    for custom_id, (_, _, user_msg) in active.items()
+                ])
+
+            still_active: Dict[str, Tuple[str, JudgeSteps, str]] = {}
+            for custom_id, (conversation_as_str, steps, _) in active.items():
+                judge_response_str = responses.get(custom_id)
+                if judge_response_str is None:
+                    # The request itself failed, so there is no response to fall back on
+                    steps.close()
+                    continue
+
+                try:
+                    judge_response = json.loads(judge_response_str) if self.structured_output else judge_response_str
+                    still_active[custom_id] = (conversation_as_str, steps, steps.send(judge_response))
+                except StopIteration as stop:
+                    judge_response = self._record_verdict(conversation_as_str, stop.value)
+                    if judge_response is not None and self.cache is not None:
+                        self.cache.put(self._cache_key(conversation_as_str), judge_response)
+                    for index in indices_by_conversation[conversation_as_str]:
+                        results[index] = judge_response
+            active = still_active
+
+        return results
+
+    def pack_stats(self) -> Dict[str, int]:
+        """Counts of packed requests, conversations judged in them and conversations that fell back to a request of their own."""
+        return dict(self._pack_stats)
+
+    def reset_pack_stats(self) -> None:
+        self._pack_stats = {"packed_requests": 0, "packed_conversations": 0, "fallbacks": 0}
+
+    def parse_stats(self) -> Dict[str, int]:
+        """
+        Counts of how single-conversation responses were parsed, by outcome, and of retry requests.
+
+        Outcomes are those of the judge's mode: `direct`, `retry_direct` and `failed` for both,
+        plus `score_fallback`, `retry_score_fallback` and `score_only` for YAML responses.
+        """
+        with self._parse_lock:
+            return dict(self._parse_stats)
+
+    def reset_parse_stats(self) -> None:
+        with self._parse_lock:
+            self._parse_stats = {}
+
+    def _record_parse(self, outcome: str) -> None:
+        step_metrics.increment(f"judge/{'structured' if self.structured_output else 'parse'}/{outcome}")
+        with self._parse_lock:
+            self._parse_stats[outcome] = self._parse_stats.get(outcome, 0) + 1
+
+    def _record_verdict(self, conversation_as_str: str, judge_response: Optional[JudgeResponse]) -> Optional[JudgeResponse]:
+        """Logs a newly computed verdict for distillation, if a verdict log is set."""
+        if judge_response is not None and self.verdict_log is not None:
+            self.verdict_log.record(conversation_as_str, judge_response.score, self.model_exec.ai_model_name)
+        return judge_response
+
+    def _cache_key(self, conversation_as_str: str) -> str:
+        return make_judge_cache_key(
+            conversation_as_str=conversation_as_str,
             sys_msg=self.relevant_sys_msg,
-            messages=[Message(role="user", content=user_msg)]
+            model_name=self.model_exec.ai_model_name,
         )
-        
+
+    def _run_judge_uncached(
+            self,
+            conversation_as_str: str
+    ) -> Optional[JudgeResponse]:
+        steps = self._judge_steps(conversation_as_str)
+        user_msg = next(steps)
+        while True:
+            messages = [Message(role="user", content=user_msg)]
+            with step_metrics.timer("judge/model_call"):
+                if self.structured_output:
+                    judge_response = self.model_exec.execute_structured(
+                        sys_msg=self.relevant_sys_msg,
+                        messages=messages,
+                        output_schema=JUDGE_VERDICT_SCHEMA,
+                    )
+                else:
+                    judge_response = self.model_exec.execute(sys_msg=self.relevant_sys_msg, messages=messages)
+            try:
+                user_msg = steps.send(judge_response)
+            except StopIteration as stop:
+                return self._record_verdict(conversation_as_str, stop.value)
+
+    async def _run_judge_uncached_async(
+            self,
+            conversation_as_str: str
+    ) -> Optional[JudgeResponse]:
+        if self.pack_size > 1:
+            judge_response = await self._run_judge_in_pack(conversation_as_str)
+        else:
+            judge_response = await self._run_judge_single_async(conversation_as_str)
+        return self._record_verdict(conversation_as_str, judge_response)
+
+    async def _run_judge_single_async(
+            self,
+            conversation_as_str: str
+    ) -> Optional[JudgeResponse]:
+        steps = self._judge_steps(conversation_as_str)
+        user_msg = next(steps)
+        while True:
+            async with self._loop_semaphore():
+                judge_response = await self._execute_async(user_msg, JUDGE_VERDICT_SCHEMA if self.structured_output else None)
+            try:
+                user_msg = steps.send(judge_response)
+            except StopIteration as stop:
+                return stop.value
+
+    def _loop_semaphore(self) -> asyncio.Semaphore:
+        """The semaphore limiting judge calls on the running event loop, created on first use."""
+        loop = asyncio.get_running_loop()
+        semaphore = self._semaphores.get(loop)
+        if semaphore is None:
+            semaphore = self._semaphores[loop] = asyncio.Semaphore(self.max_concurrency)
+        return semaphore
+
+    async def _run_judge_in_pack(
+            self,
+            conversation_as_str: str
+    ) -> Optional[JudgeResponse]:
+        """Queues the conversation for the next packed request and waits for its verdict."""
+        loop = asyncio.get_running_loop()
+        if loop is not self._pack_loop:
+            # The queue and timer of a previous, closed loop can never be flushed
+            self._pack_loop, self._pack_queue, self._pack_timer = loop, [], None
+        verdict = loop.create_future()
+        self._pack_queue.append((conversation_as_str, verdict))
+        if len(self._pack_queue) >= self.pack_size:
+            self._flush_pack()
+        elif self._pack_timer is None:
+            self._pack_timer = loop.call_later(self.pack_linger, self._flush_pack)
+        return await verdict
+
+    def _flush_pack(self) -> None:
+        if self._pack_timer is not None:
+            self._pack_timer.cancel()
+            self._pack_timer = None
+        pack, self._pack_queue = self._pack_queue, []
+        if pack:
+            # Hold a reference so the task is not garbage collected while it runs
+            task = asyncio.ensure_future(self._judge_pack(pack))
+            self._pack_tasks.add(task)
+            task.add_done_callback(self._pack_tasks.discard)
+
+    async def _judge_pack(self, pack: List[Tuple[str, asyncio.Future]]) -> None:
+        entries: Dict[int, JudgeResponse] = {}
+        if len(pack) > 1:
+            try:
+                entries = await self._request_pack([conversation_as_str for conversation_as_str, _ in pack])
+            except Exception as e:
+                for _, verdict in pack:
+                    _set_exception(verdict, e)
+                return
+
+        fallbacks = []
+        for entry_id, (conversation_as_str, verdict) in enumerate(pack, start=1):
+            if entry_id in entries:
+                _set_result(verdict, entries[entry_id])
+            else:
+                fallbacks.append((conversation_as_str, verdict))
+        if len(pack) > 1:
+            self._pack_stats["fallbacks"] += len(fallbacks)
+
+        await asyncio.gather(*(self._run_judge_fallback(conversation_as_str, verdict) for conversation_as_str, verdict in fallbacks))
+
+    async def _request_pack(self, conversations_as_str: List[str]) -> Dict[int, JudgeResponse]:
+        """Judges several conversations in one request, returning the verdicts that could be parsed by 1-based id."""
+        output_schema = PACKED_JUDGE_VERDICTS_SCHEMA if self.structured_output else None
+        async with self._loop_semaphore():
+            judge_response = await self._execute_async(self._build_packed_prompt(conversations_as_str), output_schema)
+        self._pack_stats["packed_requests"] += 1
+        self._pack_stats["packed_conversations"] += len(conversations_as_str)
+
+        if self.structured_output:
+            return _packed_verdicts_from_output(judge_response, len(conversations_as_str))
+        judge_response_str = judge_response
+        try:
+            return YAMLResponseParser.parse_judge_list_response(judge_response_str, len(conversations_as_str))
+        except ValueError:
+            return {}
+
+    async def _run_judge_fallback(self, conversation_as_str: str, verdict: asyncio.Future) -> None:
+        try:
+            _set_result(verdict, await self._run_judge_single_async(conversation_as_str))
+        except Exception as e:
+            _set_exception(verdict, e)
+
+    async def _execute_async(self, user_msg: str, output_schema: Optional[OutputSchema] = None) -> Any:
+        """Calls the judge model, returning its response text, or its structured response if `output_schema` is given."""
+        async def request() -> Any:
+            messages = [Message(role="user", content=user_msg)]
+            with step_metrics.timer("judge/model_call"):
+                if output_schema is not None:
+                    return await self.model_exec.execute_structured_async(
+                        sys_msg=self.relevant_sys_msg,
+                        messages=messages,
+                        output_schema=output_schema,
+                    )
+                return await self.model_exec.execute_async(sys_msg=self.relevant_sys_msg, messages=messages)
+
+        if self.hedger is None:
+            return await request()
+        return await self.hedger.call(request)
+
+    def _judge_steps(self, conversation_as_str: str) -> JudgeSteps:
+        """
+        The judge's prompt, parsing and fallback logic, independent of how the model is called.
+
+        Yields each user message to send to the judge model and is sent back the model's response:
+        its text, or its structured response with `structured_output`. Returns the parsed verdict,
+        or None if no score could be recovered.
+        """
+        if self.structured_output:
+            return self._structured_judge_steps(conversation_as_str)
+        return self._yaml_judge_steps(conversation_as_str)
+
+    def _structured_judge_steps(self, conversation_as_str: str) -> JudgeSteps:
+        user_msg = f'{JUDGE_PROMPT_PREFIX}{conversation_as_str}{JUDGE_STRUCTURED_PROMPT_SUFFIX}'
+        output = yield user_msg
+        judge_response = judge_response_from_output(output)
+        if judge_response is not None:
+            self._record_parse("direct")
+            return judge_response
+
+        # The tool call was cut off or had an out of range score, so there is no parse error to explain
+        for _ in range(self.max_retries):
+            self._record_parse("retries")
+            judge_response = judge_response_from_output((yield self._build_structured_retry_prompt(conversation_as_str)))
+            if judge_response is not None:
+                self._record_parse("retry_direct")
+                return judge_response
+
+        self._record_parse("failed")
+        return None
+
+    def _yaml_judge_steps(self, conversation_as_str: str) -> JudgeSteps:
+        user_msg = f'{JUDGE_PROMPT_PREFIX}{conversation_as_str}{JUDGE_PROMPT_SUFFIX}'
+        judge_response_str = yield user_msg
+
         # Try to parse the response
         try:
-            return YAMLResponseParser.parse_judge_response(judge_response_str)
+            judge_response = YAMLResponseParser.parse_judge_response(judge_response_str)
+            self._record_parse("direct")
+            return judge_response
         except ValueError as e:
             # First fallback: Try to extract just the score
             fallback_response = YAMLResponseParser.extract_score_fallback(judge_response_str)
             if fallback_response:
+                self._record_parse("score_fallback")
                 return fallback_response
-            
+
             # Second fallback: Retry with error details
             retry_count = 0
             while retry_count < self.max_retries:
-                retry_response = self._retry_with_error_details(conversation_as_str, judge_response_str, str(e))
+                self._record_parse("retries")
+                retry_response = yield self._build_retry_prompt(conversation_as_str, judge_response_str, str(e))
                 try:
-                    return YAMLResponseParser.parse_judge_response(retry_response)
+                    judge_response = YAMLResponseParser.parse_judge_response(retry_response)
+                    self._record_parse("retry_direct")
+                    return judge_response
                 except ValueError:
                     # If score extraction works on retry, use that
                     fallback_response = YAMLResponseParser.extract_score_fallback(retry_response)
                     if fallback_response:
+                        self._record_parse("retry_score_fallback")
                         return fallback_response
                     retry_count += 1
-            
+
             # Ultimate fallback: Return best-effort response
             # If we can extract a score but parsing fails, return with empty thoughts
             score = YAMLResponseParser.extract_score_only(judge_response_str)
             if score is not None:
+                self._record_parse("score_only")
                 return JudgeResponse(thoughts="", score=score)
-            
+
             # Last resort: Return None
+            self._record_parse("failed")
             return None
 
-    def _retry_with_error_details(
+    def _build_packed_prompt(self, conversations_as_str: List[str]) -> str:
+        """Builds a prompt asking for one verdict per conversation, as a YAML list or through the submit_verdicts tool."""
+        sections = [
+            f'## Conversation {entry_id}\n```{conversation_as_str}\n```'
+            for entry_id, conversation_as_str in enumerate(conversations_as_str, start=1)
+        ]
+        return (
+            f"# Conversations\n\n"
+            f"Judge each of the {len(conversations_as_str)} conversations below on its own, "
+            f"exactly as you would judge a single conversation.\n\n"
+            + "\n\n".join(sections)
+            + self._packed_prompt_instructions()
+        )
+
+    def _packed_prompt_instructions(self) -> str:
+        if self.structured_output:
+            return "\n\nPlease now submit your output with the submit_verdicts tool, with one verdict per conversation, in order."
+        return (
+            "\n\nPlease now provide your output as a yaml list with one entry per conversation, in order:\n"
+            "```yaml\n"
+            "- id: 1\n"
+            "  thoughts: \"Your concise thoughts on conversation 1.\"\n"
+            "  score: 0.0\n"
+            "- id: 2\n"
+            "  thoughts: \"Your concise thoughts on conversation 2.\"\n"
+            "  score: 0.0\n"
+            "```"
+        )
+
+    def _build_structured_retry_prompt(self, conversation_as_str: str) -> str:
+        return (
+            f"# Previous Failed Response\n\n"
+            f"Your previous submission did not include a score between 0 and 1.\n\n"
+            f"# Conversation to Judge\n\n"
+            f"```\n{conversation_as_str}\n```\n\n"
+            f"Please now submit your output with the submit_verdict tool."
+        )
+
+    def _build_retry_prompt(
             self,
             conversation_as_str: str,
             previous_response: str,
             error_message: str
     ) -> str:
-        """Retry the judge with error details to guide correction."""
-        error_prompt = (
+        """Builds the retry prompt containing error details to guide correction."""
+        return (
             f"# Previous Failed Response\n\n"
             f"Your previous response failed to parse correctly with this error:\n"
             f"```\n{error_message}\n```\n\n"
@@ -87,8 +549,32 @@ class JudgeExecutor:
             f"2. Making sure the score is a valid float number\n"
             f"3. Maintaining correct indentation"
         )
-        
-        return self.model_exec.execute(
-            sys_msg=self.relevant_sys_msg,
-            messages=[Message(role="user", content=error_prompt)]
-        )
\ No newline at end of file
+
+
+def _packed_verdicts_from_output(output: Any, num_entries: int) -> Dict[int, JudgeResponse]:
+    """The verdicts in a structured packed response by 1-based id, leaving out invalid, repeated and out of range ones."""
+    verdicts = output.get("verdicts") if isinstance(output, dict) else None
+    if not isinstance(verdicts, list):
+        return {}
+
+    entries: Dict[int, JudgeResponse] = {}
+    seen_ids = set()
+    for verdict in verdicts:
+        entry_id = verdict.get("id") if isinstance(verdict, dict) else None
+        if not isinstance(entry_id, int) or entry_id in seen_ids:
+            continue
+        seen_ids.add(entry_id)
+        judge_response = judge_response_from_output(verdict)
+        if 1 <= entry_id <= num_entries and judge_response is not None:
+            entries[entry_id] = judge_response
+    return entries
+
+
+def _set_result(future: asyncio.Future, result: Any) -> None:
+    # The waiting caller may have been cancelled in the meantime
+    if not future.done():
+        future.set_result(result)
+
+def _set_exception(future: asyncio.Future, error: BaseException) -> None:
+    if not future.done():
+        future.set_exception(error)
@@ -0,0 +1,154 @@
+import asyncio
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Deque, Dict, List, Optional, TypeVar
+
+T = TypeVar("T")
+
+
+
+@dataclass
+class HedgingPolicy:
+    """
+    When to send a duplicate of a slow judge request.
+
+    Attributes:
+        percentile: A request still running after this percentile of recent request latencies is hedged.
+        min_delay: Never hedge before this many seconds, however fast recent requests were.
+        deadline: Seconds after which a call fails with TimeoutError, hedged or not. None for no deadline.
+        budget: Maximum hedged requests as a fraction of calls, e.g. 0.05 for at most 5% extra requests.
+        window: Number of recent request latencies the percentile is taken over.
+        min_samples: No request is hedged until this many latencies have been seen.
+    """
+
+    percentile: float = 95.0
+    min_delay: float = 0.5
+    deadline: Optional[float] = 120.0
+    budget: float = 0.05
+    window: int = 500
+    min_samples: int = 20
+
+
+class HedgedRequests:
+    """
+    Runs requests under a HedgingPolicy: if a request outlives the policy's latency percentile,
+    an identical request is sent and whichever finishes first is used. The other is cancelled.
+
+    `stats()` reports calls, hedges sent, hedges that won, deadlines exceeded and end-to-end
+    call latency percentiles, so the tail latency saved can be compared with hedging off.
+    """
+
+    def __init__(self, policy: HedgingPolicy):
+        self.policy = policy
+        self._lock = threading.Lock()
+        self._latencies: Deque[float] = deque(maxlen=policy.window)
+        self._total_calls = 0
+        self._total_hedges = 0
+        self._stats: Dict[str, int] = {}
+        self._call_latencies: List[float] = []
+        self.reset_stats()
+
+    async def call(self, request: Callable[[], Awaitable[T]]) -> T:
+        """Awaits `request()`, hedging it with a second `request()` if it is slow."""
+        start = time.monotonic()
+        deadline = None if self.policy.deadline is None else start + self.policy.deadline
+        hedge_delay = self._hedge_delay()
+        hedge_at = None if hedge_delay is None else start + hedge_delay
+        with self._lock:
+            self._total_calls += 1
+            self._stats["calls"] += 1
+
+        primary = asyncio.ensure_future(self._timed(request, record_cancelled=True))
+        pending = {primary}
+        last_error: Optional[BaseException] = None
+        try:
+            while pending:
+                wake_times = [t for t in (deadline, hedge_at) if t is not None]
+                timeout = max(0.0, min(wake_times) - time.monotonic()) if wake_times else None
+                done, pending = await asyncio.wait(pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+
+                for task in done:
+                    if task.exception() is None:
+                        self._record_call(time.monotonic() - start, hedge_won=task is not primary)
+                        return task.result()
+                    last_error = task.exception()
+
+                now = time.monotonic()
+                if deadline is not None and now >= deadline:
+                    with self._lock:
+                        self._stats["deadline_exceeded"] += 1
+                    raise TimeoutError(f"Judge request did not finish within {self.policy.deadline}s")
+
+                if hedge_at is not None and now >= hedge_at and pending:
+                    hedge_at = None
+                    if self._spend_budget():
+                        pending.add(asyncio.ensure_future(self._timed(request)))
+
+            raise last_error
+        finally:
+            for task in pending:
+                task.cancel()
+
+    def stats(self) -> Dict[str, float]:
+        """Counts since the last reset, plus p50/p99 end-to-end call latency in seconds."""
+        with self._lock:
+            stats: Dict[str, float] = dict(self._stats)
+            latencies = sorted(self._call_latencies)
+        stats["p50_latency"] = _percentile(latencies, 50) if latencies else 0.0
+        stats["p99_latency"] = _percentile(latencies, 99) if latencies else 0.0
+        return stats
+
+    def reset_stats(self) -> None:
+        with self._lock:
+            self._stats = {"calls": 0, "hedges": 0, "hedge_wins": 0, "deadline_exceeded": 0}
+            self._call_latencies = []
+
+    async def _timed(self, request: Callable[[], Awaitable[T]], record_cancelled: bool = False) -> T:
+        """
+        Awaits `request()`, adding its latency to the sample the hedge delay is taken from.
+
+        With `record_cancelled`, a request cancelled before it finished records its elapsed time,
+        a lower bound on its latency. Primaries cancelled because their hedge won are exactly
+        the slow requests, so leaving them out would pull the percentile, and with it the hedge
+        delay, lower with every hedge. Cancelled hedges are not recorded: they started late.
+        """
+        start = time.monotonic()
+        try:
+            result = await request()
+        except asyncio.CancelledError:
+            if record_cancelled:
+                with self._lock:
+                    self._latencies.append(time.monotonic() - start)
+            raise
+        with self._lock:
+            self._latencies.append(time.monotonic() - start)
+        return result
+
+    def _hedge_delay(self) -> Optional[float]:
+        with self._lock:
+            if len(self._latencies) < self.policy.min_samples:
+                return None
+            latencies = sorted(self._latencies)
+        return max(self.policy.min_delay, _percentile(latencies, self.policy.percentile))
+
+    def _spend_budget(self) -> bool:
+        with self._lock:
+            if self._total_hedges + 1 > self.policy.budget * self._total_calls:
+                return False
+            self._total_hedges += 1
+            self._stats["hedges"] += 1
+            return True
+
+    def _record_call(self, latency: float, hedge_won: bool) -> None:
+        with self._lock:
+            self._call_latencies.append(latency)
+            if hedge_won:
+                self._stats["hedge_wins"] += 1
+
+
+def _percentile(ordered: List[float], percentile: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    index = min(len(ordered) - 1, max(0, round(percentile / 100 * (len(ordered) - 1))))
+    return ordered[index]
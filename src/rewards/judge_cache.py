@@ -0,0 +1,231 @@
+import asyncio
+import hashlib
+import os
+import sqlite3
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Awaitable, Callable, Dict, Optional, Tuple
+
+from rewards.judge_resp import JudgeResponse
+
+
+
+def make_judge_cache_key(conversation_as_str: str, sys_msg: str, model_name: str) -> str:
+    """Builds a content-addressed key from everything that determines a judge verdict."""
+    hasher = hashlib.sha256()
+    for part in (model_name, sys_msg, conversation_as_str):
+        hasher.update(part.encode("utf-8"))
+        hasher.update(b"\x00")
+    return hasher.hexdigest()
+
+
+class JudgeCache:
+    """
+    Caches judge verdicts so byte-identical conversations are only judged once.
+
+    Verdicts are held in a bounded in-memory LRU. When `db_path` is given they are also
+    written to a SQLite database, which lets every rank on a node share the same verdicts.
+    Concurrent lookups of a key that is already being judged wait for that judge call
+    instead of issuing their own.
+    """
+
+    def __init__(self, max_entries: int = 10_000, db_path: Optional[str] = None):
+        self.max_entries = max_entries
+        self.db_path = db_path
+
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, JudgeResponse]" = OrderedDict()
+        self._inflight: Dict[str, Future] = {}
+
+        self._db_lock = threading.Lock()
+        self._db: Optional[sqlite3.Connection] = None
+        self._db_pid: Optional[int] = None
+
+        self.hits = 0
+        self.disk_hits = 0
+        self.coalesced = 0
+        self.misses = 0
+
+    def get(self, key: str) -> Optional[JudgeResponse]:
+        """Returns the cached verdict for `key`, checking memory first and then disk."""
+        with self._lock:
+            response = self._get_from_memory(key)
+            if response is not None:
+                self.hits += 1
+                return response
+
+        response = self._get_from_disk(key)
+        if response is not None:
+            with self._lock:
+                self.disk_hits += 1
+                self._put_in_memory(key, response)
+        return response
+
+    def put(self, key: str, response: JudgeResponse) -> None:
+        """Stores a verdict in memory and, if configured, on disk."""
+        with self._lock:
+            self._put_in_memory(key, response)
+        self._put_on_disk(key, response)
+
+    def get_or_compute(
+            self,
+            key: str,
+            compute: Callable[[], Optional[JudgeResponse]]
+    ) -> Optional[JudgeResponse]:
+        """
+        Returns the cached verdict for `key`, calling `compute` only if no other caller has
+        already judged (or is currently judging) the same conversation.
+
+        `None` results are returned to every waiting caller but are not cached, so a
+        conversation whose verdict could not be parsed will be judged again next time.
+        """
+        response, inflight, is_owner = self._claim(key)
+        if inflight is None:
+            return response
+        if not is_owner:
+            return inflight.result()
+
+        try:
+            response = self._get_from_disk_or_count_miss(key)
+            if response is None:
+                response = compute()
+                if response is not None:
+                    self.put(key, response)
+            inflight.set_result(response)
+            return response
+        except BaseException as e:
+            inflight.set_exception(e)
+            raise
+        finally:
+            self._release(key)
+
+    async def get_or_compute_async(
+            self,
+            key: str,
+            compute: Callable[[], Awaitable[Optional[JudgeResponse]]]
+    ) -> Optional[JudgeResponse]:
+        """Async variant of `get_or_compute`. Sync and async callers share in-flight judge calls."""
+        response, inflight, is_owner = self._claim(key)
+        if inflight is None:
+            return response
+        if not is_owner:
+            return await asyncio.wrap_future(inflight)
+
+        try:
+            response = self._get_from_disk_or_count_miss(key)
+            if response is None:
+                response = await compute()
+                if response is not None:
+                    self.put(key, response)
+            inflight.set_result(response)
+            return response
+        except BaseException as e:
+            inflight.set_exception(e)
+            raise
+        finally:
+            self._release(key)
+
+    def stats(self) -> Dict[str, int]:
+        """Returns hit/miss counters. `misses` is the number of judge calls actually made."""
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "coalesced": self.coalesced,
+                "misses": self.misses,
+                "size": len(self._entries),
+            }
+
+    def reset_stats(self) -> None:
+        """Resets the counters, e.g. at the start of each training step."""
+        with self._lock:
+            self.hits = 0
+            self.disk_hits = 0
+            self.coalesced = 0
+            self.misses = 0
+
+    def _claim(self, key: str) -> Tuple[Optional[JudgeResponse], Optional[Future], bool]:
+        """
+        Looks `key` up in memory, otherwise joins or registers the in-flight judge call for it.
+
+        Returns the cached verdict (with no future) on a hit, else the in-flight future and
+        whether this caller owns it and must compute the verdict.
+        """
+        with self._lock:
+            response = self._get_from_memory(key)
+            if response is not None:
+                self.hits += 1
+                return response, None, False
+
+            inflight = self._inflight.get(key)
+            if inflight is not None:
+                self.coalesced += 1
+                return None, inflight, False
+
+            inflight = Future()
+            self._inflight[key] = inflight
+            return None, inflight, True
+
+    def _release(self, key: str) -> None:
+        with self._lock:
+            self._inflight.pop(key, None)
+
+    def _get_from_disk_or_count_miss(self, key: str) -> Optional[JudgeResponse]:
+        response = self._get_from_disk(key)
+        with self._lock:
+            if response is not None:
+                self.disk_hits += 1
+                self._put_in_memory(key, response)
+            else:
+                self.misses += 1
+        return response
+
+    def _get_from_memory(self, key: str) -> Optional[JudgeResponse]:
+        response = self._entries.get(key)
+        if response is not None:
+            self._entries.move_to_end(key)
+        return response
+
+    def _put_in_memory(self, key: str, response: JudgeResponse) -> None:
+        if self.max_entries <= 0:
+            return
+        self._entries[key] = response
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def _connection(self) -> Optional[sqlite3.Connection]:
+        """Opens the SQLite database lazily, reconnecting after a fork."""
+        if self.db_path is None:
+            return None
+        if self._db is None or self._db_pid != os.getpid():
+            self._db = sqlite3.connect(self.db_path, timeout=30.0, check_same_thread=False, isolation_level=None)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("PRAGMA synchronous=NORMAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS judge_verdicts "
+                "(key TEXT PRIMARY KEY, thoughts TEXT NOT NULL, score REAL NOT NULL)"
+            )
+            self._db_pid = os.getpid()
+        return self._db
+
+    def _get_from_disk(self, key: str) -> Optional[JudgeResponse]:
+        with self._db_lock:
+            db = self._connection()
+            if db is None:
+                return None
+            row = db.execute("SELECT thoughts, score FROM judge_verdicts WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        return JudgeResponse(thoughts=row[0], score=row[1])
+
+    def _put_on_disk(self, key: str, response: JudgeResponse) -> None:
+        with self._db_lock:
+            db = self._connection()
+            if db is None:
+                return
+            db.execute(
+                "INSERT OR REPLACE INTO judge_verdicts (key, thoughts, score) VALUES (?, ?, ?)",
+                (key, str(response.thoughts), float(response.score)),
+            )
@@ -0,0 +1,145 @@
+import os
+import threading
+from typing import Callable, Dict, Optional
+
+from model_exec.model_executor import ModelExecutor
+from rewards.exec_judge import JudgeExecutor
+from rewards.hedging import HedgingPolicy
+from rewards.judge_cache import JudgeCache
+from rewards.verdict_log import VerdictLog
+
+
+DEFAULT_JUDGE_MODEL = "claude-3-5-haiku"
+TOOL_JUDGE_SYS_MSG_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "tool_judge.md")
+
+
+# Model modules are imported inside the factories: importing anthropic is most of the
+# reward module's startup time, and processes that never judge should not pay for it.
+def _claude_3_5_haiku() -> ModelExecutor:
+    from model_exec.claude import Claude35HaikuExec
+    # The rubric is identical for every judge call, but it is close to Haiku's minimum cacheable
+    # length: whether it is cached shows in the cache token counts the judge logs
+    return Claude35HaikuExec(cache_system_prompt=True)
+
+def _claude_3_7_sonnet() -> ModelExecutor:
+    from model_exec.claude import Claude37SonnetExec
+    return Claude37SonnetExec(cache_system_prompt=True)
+
+def _local() -> ModelExecutor:
+    from model_exec.local import DEFAULT_LOCAL_JUDGE_MODEL, LocalModelExecutor
+    return LocalModelExecutor(model_name=os.getenv("LOCAL_JUDGE_MODEL", DEFAULT_LOCAL_JUDGE_MODEL))
+
+def _distilled() -> ModelExecutor:
+    from rewards.distilled_judge import DEFAULT_MIN_CONFIDENCE, DistilledScorer, EscalatingJudgeModel
+    scorer_path = os.getenv("DISTILLED_JUDGE_PATH")
+    if not scorer_path:
+        raise ValueError("DISTILLED_JUDGE_PATH must be set to a trained scorer when JUDGE_MODEL is distilled")
+    fallback_name = os.getenv("DISTILLED_JUDGE_FALLBACK", DEFAULT_JUDGE_MODEL)
+    if fallback_name not in _judge_models or fallback_name == "distilled":
+        raise ValueError(f"Unknown distilled judge fallback model: {fallback_name}")
+    return EscalatingJudgeModel(
+        scorer=DistilledScorer.load(scorer_path),
+        fallback=_judge_models[fallback_name](),
+        min_confidence=float(os.getenv("DISTILLED_JUDGE_MIN_CONFIDENCE", str(DEFAULT_MIN_CONFIDENCE))),
+        verdict_log=_verdict_log_from_env(),
+    )
+
+def _fake() -> ModelExecutor:
+    from model_exec.fake import FakeModelExecutor
+    return FakeModelExecutor()
+
+
+_judge_models: Dict[str, Callable[[], ModelExecutor]] = {
+    "claude-3-5-haiku": _claude_3_5_haiku,
+    "claude-3-7-sonnet": _claude_3_7_sonnet,
+    "local": _local,
+    "distilled": _distilled,
+    "fake": _fake,
+}
+
+_lock = threading.Lock()
+_judge_model: Optional[ModelExecutor] = None
+_judge_cache: Optional[JudgeCache] = None
+_tool_judge: Optional[JudgeExecutor] = None
+
+
+def register_judge_model(name: str, factory: Callable[[], ModelExecutor]) -> None:
+    """Makes a judge model selectable with the JUDGE_MODEL env var."""
+    _judge_models[name] = factory
+
+def get_judge_model() -> ModelExecutor:
+    """
+    Returns the process-wide judge model, creating it on first use.
+
+    The model is chosen by the JUDGE_MODEL env var (default: claude-3-5-haiku).
+
+    Raises:
+        ValueError: If JUDGE_MODEL is not a registered judge model.
+    """
+    global _judge_model
+    with _lock:
+        if _judge_model is None:
+            name = os.getenv("JUDGE_MODEL", DEFAULT_JUDGE_MODEL)
+            if name not in _judge_models:
+                raise ValueError(f"Unknown judge model: {name}. Available: {sorted(_judge_models)}")
+            _judge_model = _judge_models[name]()
+        return _judge_model
+
+def peek_judge_model() -> Optional[ModelExecutor]:
+    """Returns the judge model if it has been created, without creating it."""
+    with _lock:
+        return _judge_model
+
+def get_judge_cache() -> JudgeCache:
+    """Returns the process-wide judge verdict cache, configured by JUDGE_CACHE_SIZE and JUDGE_CACHE_PATH."""
+    global _judge_cache
+    with _lock:
+        if _judge_cache is None:
+            _judge_cache = JudgeCache(
+                max_entries=int(os.getenv("JUDGE_CACHE_SIZE", "10000")),
+                db_path=os.getenv("JUDGE_CACHE_PATH") or None,  # Point all ranks on a node at the same file to share verdicts
+            )
+        return _judge_cache
+
+def get_tool_judge() -> JudgeExecutor:
+    """Returns the process-wide tool use judge, creating it and its model on first use."""
+    global _tool_judge
+    model_exec = get_judge_model()
+    cache = get_judge_cache()
+    with _lock:
+        if _tool_judge is None or _tool_judge.model_exec is not model_exec:
+            _tool_judge = JudgeExecutor(
+                model_exec=model_exec,
+                sys_msg_path=TOOL_JUDGE_SYS_MSG_PATH,
+                cache=cache,
+                max_concurrency=int(os.getenv("JUDGE_MAX_CONCURRENCY", "64")),
+                hedging=_hedging_policy_from_env(),
+                pack_size=int(os.getenv("JUDGE_PACK_SIZE", "1")),
+                structured_output=os.getenv("JUDGE_STRUCTURED_OUTPUT", "0") == "1",
+                # An escalating judge model logs only the verdicts its LLM fallback makes
+                verdict_log=None if hasattr(model_exec, "verdict_log") else _verdict_log_from_env(),
+            )
+        return _tool_judge
+
+def _hedging_policy_from_env() -> Optional[HedgingPolicy]:
+    """Hedging is on when JUDGE_HEDGE_PERCENTILE is set, e.g. to 95."""
+    percentile = os.getenv("JUDGE_HEDGE_PERCENTILE")
+    if not percentile:
+        return None
+    deadline = os.getenv("JUDGE_DEADLINE", "120")
+    return HedgingPolicy(
+        percentile=float(percentile),
+        budget=float(os.getenv("JUDGE_HEDGE_BUDGET", "0.05")),
+        deadline=float(deadline) if deadline else None,
+    )
+
+def _verdict_log_from_env() -> Optional[VerdictLog]:
+    """Judge verdicts are logged for distillation when JUDGE_VERDICT_LOG is set to a file path."""
+    path = os.getenv("JUDGE_VERDICT_LOG")
+    return VerdictLog(path) if path else None
+
+def set_judge_model(model_exec: ModelExecutor) -> None:
+    """Replaces the judge model for this process, e.g. with a FakeModelExecutor for benchmarks."""
+    global _judge_model
+    with _lock:
+        _judge_model = model_exec
@@ -1,5 +1,6 @@
 import re
-from typing import Optional
+import textwrap
+from typing import Dict, Optional
 
 import yaml
 
@@ -43,6 +44,47 @@ class YAMLResponseParser:
         except (TypeError, ValueError) as e:
             raise ValueError(f"Error processing score value: {str(e)}. Response: {response}")
 
+    @staticmethod
+    def parse_judge_list_response(response: str, num_entries: int) -> Dict[int, JudgeResponse]:
+        """
+        Parse a packed judge response: a YAML list of `{id, thoughts, score}` entries, one per conversation.
+
+        Each entry is parsed like a single judge response, falling back to extracting just its
+        score. Entries that still cannot be parsed, repeat an earlier id or have an id outside
+        1..num_entries are left out, so the caller can judge those conversations on their own.
+
+        Returns:
+            The parsed entries keyed by their 1-based id.
+
+        Raises:
+            ValueError: If the response contains no entries at all.
+        """
+        entry_pattern = r"^\s*-\s*id:\s*(\d+)\s*$"
+        matches = list(re.finditer(entry_pattern, response, re.MULTILINE))
+        if not matches:
+            raise ValueError("Could not find any '- id:' entries in packed judge response")
+
+        entries: Dict[int, JudgeResponse] = {}
+        seen_ids = set()
+        for match, next_match in zip(matches, matches[1:] + [None]):
+            entry_id = int(match.group(1))
+            if entry_id in seen_ids or not 1 <= entry_id <= num_entries:
+                seen_ids.add(entry_id)
+                continue
+            seen_ids.add(entry_id)
+
+            end = next_match.start() if next_match is not None else len(response)
+            # Drop a closing code fence and the list indentation, leaving a single judge response
+            entry = textwrap.dedent(response[match.end():end].split("```")[0].strip("\n")).strip()
+            try:
+                entries[entry_id] = YAMLResponseParser.parse_judge_response(entry)
+            except ValueError:
+                fallback_response = YAMLResponseParser.extract_score_fallback(entry)
+                if fallback_response:
+                    entries[entry_id] = fallback_response
+
+        return entries
+
     @staticmethod
     def _preprocess_yaml(yaml_content: str) -> str:
         """Preprocess YAML content to fix common issues."""
@@ -0,0 +1,66 @@
+import concurrent.futures
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Coroutine, Dict, Optional
+
+from rewards.background_loop import BackgroundEventLoop
+
+
+
+class PrefetchRegistry:
+    """
+    Futures for reward work started before the reward function asks for it, keyed by content.
+
+    The env submits work as each rollout finishes, so it runs on `loop` while other rollouts are
+    still generating. The reward function then `pop`s the futures it needs and computes anything
+    missing itself. Entries that are never collected are dropped at the end of each step by
+    `end_step`, and at most `max_entries` are held at once.
+    """
+
+    def __init__(self, loop: BackgroundEventLoop, max_entries: int = 4096):
+        self.loop = loop
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._futures: "OrderedDict[str, concurrent.futures.Future]" = OrderedDict()
+        self._stats: Dict[str, int] = {}
+        self.reset_stats()
+
+    def submit(self, key: str, make_coro: Callable[[], Coroutine[Any, Any, Any]]) -> None:
+        """Starts `make_coro()` on the loop unless work for `key` is already registered."""
+        with self._lock:
+            if key in self._futures:
+                return
+            # Reserve the key before creating the coroutine, so concurrent callers submit it once
+            self._futures[key] = None
+            while len(self._futures) > self.max_entries:
+                self._futures.popitem(last=False)
+                self._stats["discarded"] += 1
+
+        future = self.loop.submit(make_coro())
+        with self._lock:
+            if key in self._futures:
+                self._futures[key] = future
+                self._stats["submitted"] += 1
+
+    def pop(self, key: str) -> Optional[concurrent.futures.Future]:
+        """Removes and returns the future registered for `key`, or None if there is none."""
+        with self._lock:
+            future = self._futures.pop(key, None)
+            if future is not None:
+                self._stats["collected"] += 1
+                self._stats["ready_when_collected"] += future.done()
+            return future
+
+    def end_step(self) -> None:
+        """Drops everything that was not collected this step. Running work still finishes in the background."""
+        with self._lock:
+            self._stats["discarded"] += len(self._futures)
+            self._futures.clear()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self._stats)
+
+    def reset_stats(self) -> None:
+        with self._lock:
+            self._stats = {"submitted": 0, "collected": 0, "ready_when_collected": 0, "discarded": 0}
@@ -0,0 +1,68 @@
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+from environment.parsed_turn import ParsedTurn, parse_turn
+
+
+# Rules of tool_judge.md that can be checked without the LLM judge
+NO_CALCULATOR_CALL = "no_calculator_call"  # Every dataset question needs the calculator: no decision, syntax or answer credit
+MULTIPLE_TAGS = "multiple_tags"  # Multiple calls or placeholder tags: syntax scores 0.0 and the call gives no result to present
+UNPARSEABLE_EXPRESSION = "unparseable_expression"  # Syntax scores at most 0.3 and the failed call gives no result to present
+EXTRA_TEXT = "extra_text"  # Extraneous text alongside the call: syntax scores at most 0.2, or 0.3 for a nested call
+
+# Rules that fix the whole score, so the conversation is not sent to the LLM judge
+RULE_SCORES: Dict[str, float] = {
+    NO_CALCULATOR_CALL: 0.0,
+}
+
+# Rules that only cap one band of the rubric. Each cap is the broken band's ceiling plus full
+# credit in the others (decision 0.1, logic 0.3, syntax 0.5, answer 0.1), and applies to the LLM
+# judge's score
+RULE_CAPS: Dict[str, float] = {
+    MULTIPLE_TAGS: 0.1 + 0.3 + 0.0,
+    UNPARSEABLE_EXPRESSION: 0.1 + 0.3 + 0.3,
+    EXTRA_TEXT: 0.1 + 0.3 + 0.3 + 0.1,
+}
+
+
+@dataclass
+class RuleVerdict:
+    rule: str
+    score: float
+
+
+def prejudge_conversation(completion_msgs: List[Dict[str, str]]) -> Optional[RuleVerdict]:
+    """
+    Scores a conversation deterministically if its tool use breaks a rubric rule that fixes the score.
+
+    Returns None when no such rule applies, in which case the conversation needs the LLM judge.
+    """
+    if not _calling_turns(completion_msgs):
+        return RuleVerdict(rule=NO_CALCULATOR_CALL, score=RULE_SCORES[NO_CALCULATOR_CALL])
+    return None
+
+def rule_score_cap(completion_msgs: List[Dict[str, str]]) -> Optional[RuleVerdict]:
+    """
+    Returns the highest score the rubric allows for the conversation's final calculator call, if it breaks a rule.
+
+    Only the final calling turn is checked, so a broken call the assistant corrected in a later
+    turn is left to the LLM judge. If the turn breaks several rules the lowest cap is returned.
+    """
+    calling_turns = _calling_turns(completion_msgs)
+    if not calling_turns:
+        return None
+
+    turn = calling_turns[-1]
+    if turn.tag_count > 1:
+        rule = MULTIPLE_TAGS
+    elif turn.parse_error is not None:
+        rule = UNPARSEABLE_EXPRESSION
+    elif turn.extra_text:
+        rule = EXTRA_TEXT
+    else:
+        return None
+    return RuleVerdict(rule=rule, score=round(RULE_CAPS[rule], 1))
+
+def _calling_turns(completion_msgs: List[Dict[str, str]]) -> List[ParsedTurn]:
+    turns = (parse_turn(msg.get("content", "")) for msg in completion_msgs if msg.get("role") == "assistant")
+    return [turn for turn in turns if turn.calls_calculator]
@@ -0,0 +1,45 @@
+import json
+import os
+import threading
+from typing import Dict, List, Tuple
+
+
+
+class VerdictLog:
+    """
+    Appends judge verdicts to a JSON lines file, one `{conversation, score, model}` object per line.
+
+    Training runs judge tens of thousands of conversations, and these pairs are what the
+    distilled scorer (`rewards.distilled_judge`) is trained on. Each line is written with a
+    single append, so several processes can share one file.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+
+    def record(self, conversation_as_str: str, score: float, model_name: str) -> None:
+        line = json.dumps({"conversation": conversation_as_str, "score": score, "model": model_name}) + "\n"
+        with self._lock, open(self.path, "a", encoding="utf-8") as f:
+            f.write(line)
+
+
+def load_verdicts(*paths: str) -> List[Tuple[str, float]]:
+    """
+    Reads (conversation, score) pairs from verdict logs.
+
+    A conversation judged more than once keeps its latest score. Lines that are not complete
+    verdicts, such as one cut short by a crash, are skipped.
+    """
+    scores: Dict[str, float] = {}
+    for path in paths:
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    verdict = json.loads(line)
+                    scores[verdict["conversation"]] = float(verdict["score"])
+                except (ValueError, KeyError, TypeError):
+                    continue
+    return list(scores.items())
@@ -1,7 +1,18 @@
 import re
 import math
+from typing import Any, Dict, Iterable, List, Optional, Sequence
 
-def is_correct_answer(agent_answer: str, correct_answer: str, tolerance: float = 0.1) -> bool:
+import numpy as np
+
+# Matches a number, including its exponent, thousand separators and an optional trailing percentage sign
+_NUMBER_PATTERN = re.compile(r"(-?[\d,]*\.?\d+(?:[eE][-+]?\d+)?%?|-?\.\d+(?:[eE][-+]?\d+)?%?)")
+# Searched in the reversed answer, finds the run of number characters around the last digit
+_REVERSED_LAST_RUN_PATTERN = re.compile(r"%?\d[\d,.eE+\-]*")
+
+# Absolute difference allowed between the agent's answer and the correct answer
+ANSWER_TOLERANCE = 0.1
+
+def is_correct_answer(agent_answer: str, correct_answer: str, tolerance: float = ANSWER_TOLERANCE) -> bool:
     """
     Check if the agent's answer is correct by extracting the last numerical value
     and comparing it to the correct answer within a given tolerance using math.isclose
@@ -17,22 +28,40 @@ def is_correct_answer(agent_answer: str, correct_answer: str, tolerance: float =
         True if the last numerical value in the agent's answer is close enough
         to the correct answer based on the absolute tolerance, False otherwise.
     """
-    # Revised Pattern: Captures the entire number string including potential exponent
-    # and optional trailing percentage sign. Handles commas.
-    pattern = r"(-?[\d,]*\.?\d+(?:[eE][-+]?\d+)?%?|-?\.\d+(?:[eE][-+]?\d+)?%?)"
-    matches = re.findall(pattern, agent_answer)
+    agent_numerical = extract_final_number(agent_answer)
+    if agent_numerical is None:
+        return False
+
+    return is_close_to_answer(agent_numerical, correct_answer, tolerance)
+
+def extract_final_number(agent_answer: str) -> Optional[float]:
+    """
+    Returns the last numerical value in the agent's answer, or None if it has none.
 
-    valid_numbers = []
-    for match_str in matches:
+    Only the end of the answer is scanned: every digit belongs to some match, so the last match
+    contains the last digit and lies within the run of number characters around it. No match
+    crosses the start of that run, so scanning the run gives the same matches as scanning the
+    whole answer.
+    """
+    last_run = _REVERSED_LAST_RUN_PATTERN.search(agent_answer[::-1])
+    if last_run is None:
+        return None
+    start, end = len(agent_answer) - last_run.end(), len(agent_answer) - last_run.start()
+    number = _last_valid_number(_NUMBER_PATTERN.findall(agent_answer, start, end))
+    if number is not None:
+        return number
+    return _last_valid_number(_NUMBER_PATTERN.findall(agent_answer, 0, start))
+
+def _last_valid_number(matches: List[str]) -> Optional[float]:
+    for match_str in reversed(matches):
         num = _clean_number_string(match_str)
         if not math.isnan(num):
-             valid_numbers.append(num)
-
-    if not valid_numbers:
-        return False
+            return num
+    return None
 
+def is_close_to_answer(agent_numerical: float, correct_answer: str, tolerance: float = ANSWER_TOLERANCE) -> bool:
+    """Compares a number extracted with `extract_final_number` to the correct answer, as `is_correct_answer` does."""
     try:
-        agent_numerical = valid_numbers[-1]
         correct_numerical = _clean_number_string(correct_answer)
 
         if math.isnan(agent_numerical) or math.isnan(correct_numerical):
@@ -43,8 +72,69 @@ def is_correct_answer(agent_answer: str, correct_answer: str, tolerance: float =
     except (ValueError, TypeError) as e:
         print(f"Error processing answers: {e}")
         return False
-    except IndexError:
-        return False
+
+class AnswerIndex:
+    """
+    Correct answers parsed to floats once, looked up by their value in the dataset.
+
+    Every generation of a prompt, in every GRPO iteration, is checked against the same answer,
+    so `CalculatorEnv` adds the dataset's answers when it is created and the verifier only
+    looks up their positions. Answers with the same value, such as "1,000" and 1000, share one
+    entry in `values`. Answers that cannot be parsed, or parse to NaN or infinity, are not
+    stored: they look up as NaN and never match.
+
+    Answers looked up from outside the dataset are added too, so the index is cleared once it
+    holds more than `max_answers` answers. Answers are parsed again as they are looked up after.
+    """
+
+    def __init__(self, answers: Iterable[Any] = (), max_answers: int = 100_000):
+        self.max_answers = max_answers
+        self.clear()
+        self.add(answers)
+
+    def __len__(self) -> int:
+        return len(self._positions)
+
+    def clear(self) -> None:
+        # Position 0 holds the NaN every unstored answer looks up as
+        self._positions: Dict[Any, int] = {}
+        self._value_positions: Dict[float, int] = {}
+        self.values = np.full(1, np.nan, dtype=np.float64)
+
+    def add(self, answers: Iterable[Any]) -> None:
+        """Parses and stores the answers not already in the index, clearing it first if they would not fit."""
+        answers = list(dict.fromkeys(answers))
+        missing = [answer for answer in answers if answer not in self._positions]
+        if len(self._positions) + len(missing) > self.max_answers:
+            self.clear()
+            missing = answers
+        new_values = []
+        for answer in missing:
+            value = _clean_number_string(answer)
+            if not math.isfinite(value):
+                continue
+            if value not in self._value_positions:
+                self._value_positions[value] = len(self.values) + len(new_values)
+                new_values.append(value)
+            self._positions[answer] = self._value_positions[value]
+        if new_values:
+            self.values = np.concatenate([self.values, np.array(new_values, dtype=np.float64)])
+
+    def lookup(self, answers: Sequence[Any]) -> np.ndarray:
+        """Returns the parsed answers as an array, adding any not in the dataset, e.g. from an eval set."""
+        if any(answer not in self._positions for answer in answers):
+            self.add(answers)
+        positions = self._positions
+        return self.values[[positions.get(answer, 0) for answer in answers]]
+
+    def matches(self, agent_numbers: np.ndarray, answers: Sequence[Any], tolerance: float = ANSWER_TOLERANCE) -> np.ndarray:
+        """
+        Whether each agent number is within `tolerance` of its correct answer, as `is_close_to_answer` decides.
+
+        Agent numbers are NaN where no number was found, which never matches.
+        """
+        return np.isclose(agent_numbers, self.lookup(answers), rtol=0.0, atol=tolerance)
+
 
 def _clean_number_string(number_str: str) -> float:
     """Removes thousand separators, handles percentages, and converts to float."""
@@ -0,0 +1,126 @@
+import math
+import re
+from collections import Counter
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Any, Dict, List, Optional
+
+from environment.parsed_turn import parse_turn
+from environment.tools.calculator import calculate
+from environment.tools.infix import parse_infix
+from rewards.verifiers.answer_verifier import ANSWER_TOLERANCE
+
+REFERENCE_CACHE_SIZE = 16384
+# Results of the same expression written differently can differ in their last bits
+EXPRESSION_REL_TOLERANCE = 1e-9
+
+_OUTPUT_PATTERN = re.compile(r"<output>(.*?)</output>", re.DOTALL)
+
+
+@dataclass
+class GroundedCheck:
+    """
+    The deterministic checks behind the grounded correctness reward for one completion.
+
+    `transcribed`: the final answer is the last calculator output, within the answer tolerance.
+    `expression_correct`: the model's last calculator expression evaluates to the reference
+    expression's result, or None if the prompt has no usable reference expression.
+    """
+
+    transcribed: bool
+    expression_correct: Optional[bool]
+
+    @property
+    def score(self) -> float:
+        """The share of checks passed. Without a reference, only the transcription counts."""
+        if self.expression_correct is None:
+            return float(self.transcribed)
+        return (self.transcribed + self.expression_correct) / 2
+
+
+@lru_cache(maxsize=REFERENCE_CACHE_SIZE)
+def reference_result(expression_source: str) -> Optional[float]:
+    """
+    The result of a dataset `expression`, compiled and evaluated once per distinct expression.
+
+    Returns None if the expression cannot be parsed or evaluated.
+    """
+    try:
+        return calculate(parse_infix(expression_source))
+    except (ValueError, ArithmeticError, TypeError):
+        return None
+
+def tool_outputs(completion_msgs: List[Dict[str, str]]) -> List[float]:
+    """The numeric `<output>` values the environment returned during the completion, in order."""
+    outputs = []
+    for msg in completion_msgs:
+        if msg.get("role") != "user":
+            continue
+        for value in _OUTPUT_PATTERN.findall(msg.get("content", "")):
+            try:
+                outputs.append(float(value))
+            except ValueError:
+                continue
+    return outputs
+
+def tool_call_hashes(completion_msgs: List[Dict[str, str]]) -> List[str]:
+    """Canonical hashes of the completion's calculator calls, in order, skipping calls that did not parse."""
+    hashes = []
+    for msg in completion_msgs:
+        if msg.get("role") != "assistant":
+            continue
+        canonical_hash = parse_turn(msg.get("content", "")).canonical_hash
+        if canonical_hash is not None:
+            hashes.append(canonical_hash)
+    return hashes
+
+def count_repeated_tool_calls(prompts: List[List[Dict[str, str]]], completions: List[List[Dict[str, str]]]) -> int:
+    """
+    Counts the calculator calls that another generation of the same prompt also made.
+
+    Calls are compared in canonical form, so `3*2` repeats `2*3`. Each distinct call counts
+    once per completion.
+    """
+    groups: Dict[str, List[set]] = {}
+    for prompt, completion_msgs in zip(prompts, completions):
+        prompt_key = prompt[-1].get("content", "") if prompt else ""
+        groups.setdefault(prompt_key, []).append(set(tool_call_hashes(completion_msgs)))
+
+    repeated = 0
+    for calls in groups.values():
+        counts = Counter(call for completion_calls in calls for call in completion_calls)
+        repeated += sum(counts[call] for call in counts if counts[call] > 1)
+    return repeated
+
+def check_grounded_answer(completion_msgs: List[Dict[str, str]], expression_source: Any) -> GroundedCheck:
+    """Runs the grounded correctness checks for one completion against its prompt's reference expression."""
+    model_result = None
+    for msg in completion_msgs:
+        if msg.get("role") != "assistant":
+            continue
+        # The calculation is cached on the turn, so this re-evaluation is shared with the env
+        result, _ = parse_turn(msg.get("content", "")).calculation
+        if result is not None:
+            model_result = result
+
+    # Only a closing message that makes no further calculator call holds a final answer
+    final_number = None
+    if completion_msgs and completion_msgs[-1].get("role") == "assistant":
+        final_turn = parse_turn(completion_msgs[-1].get("content", ""))
+        if not final_turn.calls_calculator:
+            final_number = final_turn.final_number
+
+    outputs = tool_outputs(completion_msgs)
+    transcribed = (
+        final_number is not None
+        and bool(outputs)
+        and math.isclose(final_number, outputs[-1], rel_tol=0.0, abs_tol=ANSWER_TOLERANCE)
+    )
+
+    reference = reference_result(str(expression_source)) if expression_source is not None else None
+    if reference is None:
+        return GroundedCheck(transcribed=transcribed, expression_correct=None)
+    expression_correct = model_result is not None and math.isclose(
+        model_result, reference, rel_tol=EXPRESSION_REL_TOLERANCE, abs_tol=EXPRESSION_REL_TOLERANCE
+    )
+    return GroundedCheck(transcribed=transcribed, expression_correct=expression_correct)
@@ -0,0 +1,60 @@
+"""
+Trains the distilled judge on logged judge verdicts and reports its agreement with the judge.
+
+Verdicts are logged during training when JUDGE_VERDICT_LOG is set. A held-out share of them is
+used to report, for each confidence threshold, how many judge calls the scorer would answer
+itself and how closely those answers agree with the LLM judge.
+
+    python src/train_distilled_judge.py --verdicts verdicts.jsonl --out distilled_judge.npz
+"""
+import argparse
+import zlib
+
+from rewards.distilled_judge import (
+    DEFAULT_HASH_BITS,
+    DEFAULT_MIN_CONFIDENCE,
+    evaluate_distilled_scorer,
+    train_distilled_scorer,
+)
+from rewards.verdict_log import load_verdicts
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--verdicts", nargs="+", required=True, help="Verdict logs written by JUDGE_VERDICT_LOG")
+    parser.add_argument("--out", required=True, help="Where to save the scorer (.npz)")
+    parser.add_argument("--holdout", type=float, default=0.1, help="Share of verdicts held out for evaluation")
+    parser.add_argument("--hash-bits", type=int, default=DEFAULT_HASH_BITS)
+    parser.add_argument("--epochs", type=int, default=10)
+    parser.add_argument("--learning-rate", type=float, default=0.5)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    verdicts = load_verdicts(*args.verdicts)
+    # Split by conversation so the holdout is the same on every run
+    is_holdout = [zlib.crc32(conversation.encode("utf-8")) % 1000 < args.holdout * 1000 for conversation, _ in verdicts]
+    train = [verdict for verdict, holdout in zip(verdicts, is_holdout) if not holdout]
+    holdout = [verdict for verdict, holdout in zip(verdicts, is_holdout) if holdout]
+    print(f"Verdicts: {len(verdicts)} ({len(train)} train, {len(holdout)} held out)")
+
+    scorer = train_distilled_scorer(
+        train,
+        hash_bits=args.hash_bits,
+        epochs=args.epochs,
+        learning_rate=args.learning_rate,
+        seed=args.seed,
+    )
+    scorer.save(args.out)
+    print(f"Saved scorer to {args.out}")
+
+    print("Min confidence   answered   judge calls   exact   MAE answered   MAE overall")
+    for min_confidence in (0.5, 0.6, 0.7, DEFAULT_MIN_CONFIDENCE, 0.9, 0.95):
+        results = evaluate_distilled_scorer(scorer, holdout, min_confidence)
+        remaining_calls = 1.0 - results["coverage"]
+        reduction = f"{1 / remaining_calls:.1f}x fewer" if remaining_calls > 0 else "none"
+        print(f"{min_confidence:14.2f}   {results['coverage']:8.0%}   {reduction:>11}   {results['exact_answered']:5.0%}   "
+              f"{results['mae_answered']:12.3f}   {results['mae_overall']:11.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+import re
+import unittest
+
+import yaml
+
+from environment.action_parser import (
+    extract_agent_actions,
+    extract_yaml_from_markdown,
+    parse_calculator_expression,
+    text_outside_actions,
+)
+from environment.tools.calculator import Expression
+
+ACTION_PATTERN = re.compile(r'<([^>]+)>(.*?)</\1>', re.DOTALL)
+
+
+def _parse_with_pyyaml(action_content: str) -> Expression:
+    return Expression.from_dict(yaml.safe_load(extract_yaml_from_markdown(action_content)))
+
+
+class TestActionParser(unittest.TestCase):
+
+    def test_extract_agent_actions_matches_regex(self):
+        messages = [
+            "Let me check.\n<calculator>\noperation: add\noperands: [1, 2]\n</calculator>",
+            "<a><b>x</b></a> then <b>y</b>",
+            "<calculator>unclosed <calculator>inner</calculator>",
+            "<<a>>x</<a>> and <>empty</> and <a b>spaced</a b>",
+            "no tags at all, just a < and a >",
+            "<a>first</a><a>second</a> <c>3 < 4</c>",
+        ]
+        for message in messages:
+            with self.subTest(message=message):
+                self.assertEqual(list(extract_agent_actions(message)), ACTION_PATTERN.findall(message))
+                self.assertEqual(text_outside_actions(message), ACTION_PATTERN.sub("", message).strip())
+
+    def test_extract_yaml_from_markdown(self):
+        self.assertEqual(extract_yaml_from_markdown("```yaml\noperation: add\n```"), "operation: add")
+        self.assertEqual(extract_yaml_from_markdown("text ```\n a: 1 \n``` more ```b```"), "a: 1")
+        self.assertEqual(extract_yaml_from_markdown("```yaml```"), "")
+        self.assertEqual(extract_yaml_from_markdown("only one ``` fence"), "only one ``` fence")
+
+    def test_subset_matches_pyyaml(self):
+        bodies = [
+            "operation: add\noperands: [1, 2.5, -0.0, +3]",
+            "\n```yaml\noperation: \"multiply\"\noperands:\n  - 5\n  - operation: 'divide'\n    operands:\n    - 10\n    - 4.\n```\n",
+            "operands:\n- 1.0e+3\n- -12\noperation: subtract",
+            "  operation: add\n  operands: []",
+        ]
+        for body in bodies:
+            with self.subTest(body=body):
+                self.assertEqual(repr(parse_calculator_expression(body)), repr(_parse_with_pyyaml(body)))
+
+    def test_falls_back_to_pyyaml_outside_subset(self):
+        # Comments, non-decimal numbers and flow mappings are all left to PyYAML
+        bodies = [
+            "operation: add  # sum\noperands: [1, 2]",
+            "operation: add\noperands: [0x10, 07, 1_000, 0.5e-1]",
+            "{operation: multiply, operands: [2, 3]}",
+        ]
+        for body in bodies:
+            with self.subTest(body=body):
+                self.assertEqual(repr(parse_calculator_expression(body)), repr(_parse_with_pyyaml(body)))
+
+    def test_errors_match_pyyaml(self):
+        bodies = [
+            "operation: power\noperands: [2, 3]",
+            "operation: add\noperands: [1, two]",
+            "operation: add\noperands: [1, 2",
+            "just some text",
+        ]
+        for body in bodies:
+            with self.subTest(body=body):
+                with self.assertRaises(Exception) as expected:
+                    _parse_with_pyyaml(body)
+                for _ in range(2):  # the second call is served from the cache
+                    with self.assertRaises(type(expected.exception)) as actual:
+                        parse_calculator_expression(body)
+                    self.assertEqual(str(actual.exception), str(expected.exception))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,87 @@
+import math
+import random
+import re
+import unittest
+
+import numpy as np
+
+from rewards.calculator_reward_func import _verify_batch
+from rewards.verifiers.answer_verifier import AnswerIndex, _clean_number_string, extract_final_number
+
+
+def extract_final_number_full_scan(agent_answer: str):
+    """The original extraction, which parses every number in the answer."""
+    pattern = r"(-?[\d,]*\.?\d+(?:[eE][-+]?\d+)?%?|-?\.\d+(?:[eE][-+]?\d+)?%?)"
+    numbers = [_clean_number_string(match) for match in re.findall(pattern, agent_answer)]
+    numbers = [number for number in numbers if not math.isnan(number)]
+    return numbers[-1] if numbers else None
+
+
+class TestExtractFinalNumber(unittest.TestCase):
+
+    def test_matches_full_scan(self):
+        rng = random.Random(0)
+        alphabet = "0123456789,.eE+-% xa١٢"
+        for _ in range(20000):
+            text = "".join(rng.choice(alphabet) for _ in range(rng.randint(0, 20)))
+            self.assertEqual(extract_final_number(text), extract_final_number_full_scan(text), repr(text))
+
+    def test_only_the_last_number_counts(self):
+        self.assertEqual(extract_final_number("Steps: 1, 2, 3. " * 100 + "So it is 1,234.5%"), 12.345)
+        self.assertEqual(extract_final_number("It is 5%3"), 3.0)
+        self.assertIsNone(extract_final_number("No numbers here."))
+
+
+class TestAnswerIndex(unittest.TestCase):
+
+    def test_answers_are_parsed_once(self):
+        index = AnswerIndex(["42", "1,000", "50%", "n/a", "42"])
+        self.assertEqual(len(index), 3)
+        np.testing.assert_array_equal(index.lookup(["1,000", "42", "50%"]), [1000.0, 42.0, 0.5])
+        self.assertTrue(np.isnan(index.lookup(["n/a"])[0]))
+
+        # Answers outside the dataset are added on lookup
+        np.testing.assert_array_equal(index.lookup([7, "42"]), [7.0, 42.0])
+        self.assertEqual(len(index), 4)
+
+    def test_equal_values_share_an_entry_and_non_finite_answers_are_not_stored(self):
+        index = AnswerIndex(["1,000", 1000, "1000.0", "nan", "NaN", "inf", "-inf"])
+        self.assertEqual(len(index), 3)
+        self.assertEqual(len(index.values), 2)  # The shared NaN and 1000.0
+
+        for _ in range(3):
+            looked_up = index.lookup(["nan", "inf", "1000.0"])
+        self.assertTrue(np.isnan(looked_up[:2]).all())
+        self.assertEqual(looked_up[2], 1000.0)
+        self.assertEqual((len(index), len(index.values)), (3, 2))
+        np.testing.assert_array_equal(index.matches(np.array([np.nan, np.inf]), ["nan", "inf"]), [False, False])
+
+    def test_index_is_cleared_when_full(self):
+        index = AnswerIndex(["1", "2", "3"], max_answers=4)
+        np.testing.assert_array_equal(index.lookup(["4"]), [4.0])
+        np.testing.assert_array_equal(index.lookup(["5", "1"]), [5.0, 1.0])
+        self.assertEqual(len(index), 2)
+        self.assertEqual(len(index.values), 3)
+
+    def test_matches_uses_absolute_tolerance(self):
+        index = AnswerIndex()
+        agent_numbers = np.array([100.09, 99.8, np.nan, 3.0])
+        np.testing.assert_array_equal(index.matches(agent_numbers, ["100", "100", "100", "n/a"]), [True, False, False, False])
+
+
+class TestVerifyBatch(unittest.TestCase):
+
+    def test_batch_results(self):
+        completions = [
+            [{"role": "assistant", "content": "The answer is 1,234.5"}],
+            [{"role": "assistant", "content": "I got 10 then 12"}],
+            [{"role": "assistant", "content": "I don't know"}],
+            [{"role": "user", "content": "42"}],
+            [],
+        ]
+        answers = ["1234.5", "10", "42", "42", "42"]
+        self.assertEqual(_verify_batch(completions, answers), [1.0, 0.0, 0.0, 0.0, 0.0])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,128 @@
+import asyncio
+import concurrent.futures
+import os
+import unittest
+
+from model_exec.fake import (
+    FENCED,
+    INVALID_YAML,
+    MULTILINE_THOUGHTS,
+    NO_SCORE,
+    SCORE_ONLY,
+    TIMEOUT,
+    UNESCAPED_QUOTES,
+    VALID,
+    FakeModelExecutor,
+)
+from rewards.background_loop import BackgroundEventLoop
+from rewards.exec_judge import JudgeExecutor
+from rewards.judge_cache import JudgeCache
+
+TOOL_JUDGE_PATH = os.path.join(os.path.dirname(__file__), "..", "src", "rewards", "tool_judge.md")
+ALL_PARSEABLE_KINDS = {kind: 1 for kind in (VALID, FENCED, UNESCAPED_QUOTES, MULTILINE_THOUGHTS, INVALID_YAML, SCORE_ONLY, NO_SCORE)}
+
+
+class TestBackgroundEventLoop(unittest.TestCase):
+
+    def setUp(self):
+        self.loop = BackgroundEventLoop(name="test-judge-loop")
+
+    def tearDown(self):
+        self.loop.close(timeout=5)
+
+    def test_exceptions_propagate_to_the_caller(self):
+        async def fail():
+            await asyncio.sleep(0)
+            raise KeyError("from the loop thread")
+
+        with self.assertRaises(KeyError):
+            self.loop.run(fail(), timeout=5)
+        # The loop keeps serving after a failed coroutine
+        self.assertEqual(self.loop.run(asyncio.sleep(0, result=3), timeout=5), 3)
+
+    def test_close_cancels_pending_work_and_joins_the_thread(self):
+        pending = self.loop.submit(asyncio.sleep(60))
+        thread, loop = self.loop._thread, self.loop._loop
+        self.loop.close(timeout=5)
+
+        with self.assertRaises(concurrent.futures.CancelledError):
+            pending.result(timeout=5)
+        self.assertFalse(thread.is_alive())
+        self.assertTrue(loop.is_closed())
+        self.loop.close()
+
+        # A closed loop starts again on the next submit
+        self.assertEqual(self.loop.run(asyncio.sleep(0, result="again"), timeout=5), "again")
+
+
+class TestAsyncJudge(unittest.TestCase):
+
+    def setUp(self):
+        self.loop = BackgroundEventLoop(name="test-judge-loop")
+
+    def tearDown(self):
+        self.loop.close(timeout=5)
+
+    def test_concurrent_identical_conversations_share_one_call(self):
+        fake = FakeModelExecutor(response_weights={VALID: 1}, latency_p50=0.05, latency_sigma=0.0)
+        judge = JudgeExecutor(model_exec=fake, sys_msg_path=TOOL_JUDGE_PATH, cache=JudgeCache())
+
+        async def judge_all():
+            return await asyncio.gather(*[judge.run_judge_async("By: user\nWhat is 2 + 2?") for _ in range(8)])
+
+        # A sync caller arriving while the async calls are in flight waits for them too
+        pending = self.loop.submit(judge_all())
+        sync_response = judge.run_judge("By: user\nWhat is 2 + 2?")
+        responses = pending.result(timeout=10)
+
+        self.assertEqual(fake.stats()["calls"], 1)
+        self.assertEqual(responses, [sync_response] * 8)
+        self.assertEqual(judge.cache.stats()["misses"], 1)
+
+    def test_judge_errors_propagate_and_are_not_cached(self):
+        fake = FakeModelExecutor(response_weights={TIMEOUT: 1}, timeout=0.0)
+        judge = JudgeExecutor(model_exec=fake, sys_msg_path=TOOL_JUDGE_PATH, cache=JudgeCache())
+
+        for _ in range(2):
+            with self.assertRaises(TimeoutError):
+                self.loop.run(judge.run_judge_async("By: user\nHi"), timeout=5)
+        self.assertEqual(fake.stats()["timeouts"], 2)
+        self.assertEqual(judge.cache.stats()["size"], 0)
+
+    def test_judge_survives_a_restarted_loop(self):
+        async def judge_concurrently(judge, *questions):
+            return await asyncio.gather(*[judge.run_judge_async(f"By: user\nWhat is {question}?") for question in questions])
+
+        # Two concurrent calls contend for the semaphore; a lone call can only be sent by the pack timer
+        for pack_size, questions in ((1, ("6 + 6", "7 + 7")), (3, ("6 + 6",))):
+            fake = FakeModelExecutor(response_weights={VALID: 1}, latency_p50=0.01, latency_sigma=0.0)
+            judge = JudgeExecutor(model_exec=fake, sys_msg_path=TOOL_JUDGE_PATH, max_concurrency=1, pack_size=pack_size, pack_linger=0.01)
+            # Waiting on the semaphore binds it to this loop
+            self.assertEqual(len(self.loop.run(judge_concurrently(judge, "1 + 1", "2 + 2", "3 + 3", "4 + 4"), timeout=5)), 4)
+            # A request still waiting for its pack when the loop closes is cancelled with it
+            self.loop.submit(judge.run_judge_async("By: user\nWhat is 5 + 5?"))
+            self.loop.close(timeout=5)
+
+            # Semaphores and pack timers of the closed loop must not be reused
+            self.assertEqual(len(self.loop.run(judge_concurrently(judge, *questions), timeout=5)), len(questions))
+
+    def test_async_verdicts_match_sync(self):
+        conversations = [f"By: user\nWhat is {i} * {i + 1}?\nBy: assistant\n{i * (i + 1)}" for i in range(40)]
+
+        def make_judge():
+            fake = FakeModelExecutor(response_weights=ALL_PARSEABLE_KINDS, latency_p50=0.0, seed=7)
+            return JudgeExecutor(model_exec=fake, sys_msg_path=TOOL_JUDGE_PATH, max_retries=1)
+
+        sync_judge, async_judge = make_judge(), make_judge()
+        expected = [sync_judge.run_judge(conversation) for conversation in conversations]
+
+        async def judge_all():
+            return await asyncio.gather(*[async_judge.run_judge_async(conversation) for conversation in conversations])
+
+        actual = self.loop.run(judge_all(), timeout=10)
+        self.assertEqual(actual, expected)
+        self.assertEqual(async_judge.parse_stats(), sync_judge.parse_stats())
+
+
+if __name__ == "__main__":
+    unittest.main()
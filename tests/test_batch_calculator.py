@@ -0,0 +1,79 @@
+import math
+import unittest
+
+from environment.tools.batch_calculator import calculate_batch, calculate_infix_batch
+from environment.tools.calculator import Expression, calculate
+from environment.tools.infix import parse_infix
+
+
+class TestBatchCalculator(unittest.TestCase):
+
+    def test_matches_scalar_calculate(self):
+        expressions = [
+            Expression(operation="add", operands=[1, Expression(operation="divide", operands=[10, 4])]),
+            Expression(operation="add", operands=[-3.5, Expression(operation="divide", operands=[7, 3])]),
+            Expression(operation="subtract", operands=[0.1, 0.2, 0.3]),
+            Expression(operation="multiply", operands=[]),
+            Expression(operation="add", operands=[-0.0]),
+            4,
+        ]
+        batch = calculate_batch(expressions)
+        for index, expression in enumerate(expressions):
+            self.assertEqual(repr(batch.result(index)), repr(float(calculate(expression))))
+
+    def test_per_row_division_by_zero(self):
+        expressions = [
+            Expression(operation="divide", operands=[1, 2]),
+            Expression(operation="divide", operands=[1, 0]),
+            Expression(operation="divide", operands=[3, 4]),
+        ]
+        batch = calculate_batch(expressions)
+        self.assertEqual(batch.result(0), 0.5)
+        self.assertTrue(math.isnan(batch.values[1]))
+        with self.assertRaisesRegex(ZeroDivisionError, "Division by zero"):
+            batch.result(1)
+        self.assertEqual(batch.result(2), 0.75)
+
+    def test_errors_match_scalar_calculate(self):
+        expressions = [
+            Expression(operation="divide", operands=[]),
+            Expression(operation="modulo", operands=[1, 2]),
+            "not an expression",
+        ]
+        batch = calculate_batch(expressions)
+        for index, expression in enumerate(expressions):
+            with self.assertRaises(Exception) as scalar_error:
+                calculate(expression)
+            with self.assertRaises(type(scalar_error.exception)) as batch_error:
+                batch.result(index)
+            self.assertEqual(str(batch_error.exception), str(scalar_error.exception))
+
+    def test_parse_infix(self):
+        self.assertEqual(parse_infix(" 4829*736"), Expression(operation="multiply", operands=[4829, 736]))
+        self.assertEqual(
+            parse_infix('"(9999-8888*7777+6666)*802"'),
+            Expression(
+                operation="multiply",
+                operands=[
+                    Expression(operation="add", operands=[
+                        Expression(operation="subtract", operands=[9999, Expression(operation="multiply", operands=[8888, 7777])]),
+                        6666,
+                    ]),
+                    802,
+                ],
+            ),
+        )
+        with self.assertRaises(ValueError):
+            parse_infix("2**8")
+
+    def test_calculate_infix_batch_matches_python(self):
+        sources = ["4829*736", "67392/85", "(11111+22222+33333)*999", "100-1-2-3", "-(5+2)*3", "1/0", "import os"]
+        batch = calculate_infix_batch(sources)
+        for index, source in enumerate(sources[:5]):
+            self.assertEqual(batch.result(index), eval(source))
+        self.assertIsInstance(batch.errors[5], ZeroDivisionError)
+        self.assertIsInstance(batch.errors[6], ValueError)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,6 +1,6 @@
 import unittest
 
-from src.environment.tools.calculator import Expression, calculate
+from src.environment.tools.calculator import Expression, calculate, compile_expression
 
 class TestCalculator(unittest.TestCase):
 
@@ -101,5 +101,39 @@ class TestCalculator(unittest.TestCase):
         with self.assertRaisesRegex(TypeError, "Unsupported expression type: <class 'list'>"):
             calculate([1, 2, 3])
 
+    def test_compiled_expression_is_reusable(self):
+        compiled = compile_expression(Expression(operation="multiply", operands=[Expression(operation="add", operands=[1, 2]), 4]))
+        self.assertEqual(calculate(compiled), 12.0)
+        self.assertEqual(compiled.evaluate(), 12.0)
+
+    def test_deep_nesting_does_not_recurse(self):
+        expr = 1
+        for _ in range(5000):
+            expr = Expression(operation="add", operands=[expr, 1])
+        self.assertEqual(calculate(expr, max_depth=None, max_nodes=None), 5001.0)
+
+    def test_error_depth_limit(self):
+        expr = 1
+        for _ in range(10):
+            expr = Expression(operation="add", operands=[expr])
+        self.assertEqual(calculate(expr, max_depth=10), 1.0)
+        with self.assertRaisesRegex(ValueError, "maximum depth of 9"):
+            calculate(expr, max_depth=9)
+
+    def test_error_node_limit(self):
+        expr = Expression(operation="add", operands=[1] * 100)
+        self.assertEqual(calculate(expr, max_nodes=101), 100.0)
+        with self.assertRaisesRegex(ValueError, "maximum of 100 nodes"):
+            calculate(expr, max_nodes=100)
+
+    def test_errors_raised_in_evaluation_order(self):
+        # The unsupported operation is reached before the later division by zero
+        expr = Expression(
+            operation="add",
+            operands=[Expression(operation="modulo", operands=[1]), Expression(operation="divide", operands=[1, 0])]
+        )
+        with self.assertRaisesRegex(ValueError, "Unsupported operation: modulo"):
+            calculate(expr)
+
 if __name__ == "__main__":
     unittest.main()
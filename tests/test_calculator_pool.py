@@ -0,0 +1,132 @@
+import os
+import subprocess
+import sys
+import tempfile
+import textwrap
+import time
+import unittest
+from concurrent.futures import Future
+
+from environment.tools.calculator import Expression, calculate
+from environment.tools.calculator_pool import CalculatorPool, CalculatorTimeout
+from environment.tools.numeric import FractionNumbers
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src")
+# Shaped like train.py before it had a main guard: everything runs at the top level
+UNGUARDED_SCRIPT = textwrap.dedent("""
+    import sys
+
+    with open(sys.argv[1], "a") as f:
+        f.write("top level ran\\n")
+
+    from environment.tools.calculator import Expression
+    from environment.tools.calculator_pool import CalculatorPool
+
+    pool = CalculatorPool(num_workers=2)
+    print(pool.calculate_many([Expression(operation="add", operands=[2, 3])] * 4))
+    print(pool.stats()["workers_replaced"])
+    pool.close()
+""")
+
+
+class SpinningProgram:
+    """Stands in for a compiled expression that never finishes."""
+
+    def evaluate(self, numbers=None) -> float:
+        while True:
+            pass
+
+
+class CrashingProgram:
+    """Stands in for a compiled expression that takes its worker down."""
+
+    def evaluate(self, numbers=None) -> float:
+        os._exit(1)
+
+
+class TestCalculatorPool(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.pool = CalculatorPool(num_workers=2, cpu_time_limit=0.2)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.pool.close()
+
+    def setUp(self):
+        self.pool.reset_stats()
+
+    def test_matches_inline_calculation(self):
+        expressions = [
+            Expression(operation="add", operands=[1, 2, 3]),
+            Expression(operation="divide", operands=[67392, 85]),
+            Expression(operation="subtract", operands=[2, Expression(operation="multiply", operands=[3, 4.5])]),
+            7,
+        ]
+        results = self.pool.calculate_many(expressions)
+        self.assertEqual(results, [(calculate(expression), None) for expression in expressions])
+
+        exact = self.pool.calculate_many(expressions, numbers=FractionNumbers())
+        self.assertEqual(exact, [(calculate(expression, numbers=FractionNumbers()), None) for expression in expressions])
+
+    def test_errors_keep_their_type(self):
+        (result, error), = self.pool.calculate_many([Expression(operation="divide", operands=[1, 0])])
+        self.assertIsNone(result)
+        with self.assertRaises(ZeroDivisionError) as inline:
+            calculate(Expression(operation="divide", operands=[1, 0]))
+        self.assertIsInstance(error, ZeroDivisionError)
+        self.assertEqual(str(error), str(inline.exception))
+
+        # Size limits are checked before anything is sent to a worker
+        with self.assertRaises(ValueError):
+            self.pool.calculate(Expression(operation="add", operands=list(range(20000))))
+
+    def test_a_spinning_calculation_does_not_stall_the_batch(self):
+        good = Expression(operation="add", operands=[1, 2])
+        start = time.perf_counter()
+        futures = [self.pool.submit(good) for _ in range(32)]
+        spinning = Future()
+        self.pool._queue.put((SpinningProgram(), None, spinning))
+        futures += [self.pool.submit(good) for _ in range(32)]
+
+        self.assertEqual([future.result(timeout=10) for future in futures], [3.0] * 64)
+        self.assertIsInstance(spinning.exception(timeout=10), CalculatorTimeout)
+        self.assertLess(time.perf_counter() - start, 5.0)
+        self.assertEqual(self.pool.stats()["cpu_time_exceeded"], 1)
+        self.assertEqual(self.pool.stats()["workers_replaced"], 0)
+
+    def test_a_crashed_worker_is_replaced(self):
+        good = Expression(operation="multiply", operands=[6, 7])
+        crashing = Future()
+        self.pool._queue.put((CrashingProgram(), None, crashing))
+        futures = [self.pool.submit(good) for _ in range(8)]
+
+        self.assertIsInstance(crashing.exception(timeout=10), CalculatorTimeout)
+        self.assertEqual([future.result(timeout=10) for future in futures], [42.0] * 8)
+        self.assertEqual(self.pool.stats()["workers_replaced"], 1)
+        self.assertEqual(self.pool.calculate(good), 42.0)
+
+
+class TestCalculatorPoolFromAScript(unittest.TestCase):
+
+    def test_workers_do_not_rerun_an_unguarded_main_script(self):
+        with tempfile.TemporaryDirectory() as directory:
+            script_path = os.path.join(directory, "train_like.py")
+            marker_path = os.path.join(directory, "marker.txt")
+            with open(script_path, "w") as f:
+                f.write(UNGUARDED_SCRIPT)
+            environment = dict(os.environ, PYTHONPATH=os.pathsep.join([SRC_DIR, os.environ.get("PYTHONPATH", "")]))
+            completed = subprocess.run(
+                [sys.executable, script_path, marker_path], env=environment, capture_output=True, text=True, timeout=60,
+            )
+            with open(marker_path) as f:
+                marker = f.read()
+
+        self.assertEqual(completed.returncode, 0, completed.stderr)
+        self.assertEqual(completed.stdout.splitlines(), [str([(5.0, None)] * 4), "0"])
+        self.assertEqual(marker, "top level ran\n")
+
+
+if __name__ == "__main__":
+    unittest.main()
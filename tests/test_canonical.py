@@ -0,0 +1,152 @@
+import math
+import random
+import unittest
+
+from environment.parsed_turn import parse_turn
+from environment.tools.calculator import Expression, calculate
+from environment.tools.canonical import CalculationCache, canonicalize
+from environment.tools.infix import parse_infix
+from environment.tools.numeric import FractionNumbers
+
+OPERATIONS = ["add", "subtract", "multiply", "divide"]
+
+
+def random_expression(rng: random.Random, depth: int = 0):
+    if depth > 3 or rng.random() < 0.3:
+        return rng.choice([0, 1, 1.0, -0.0, rng.randint(-50, 50), round(rng.uniform(-10, 10), 2)])
+    return Expression(
+        operation=rng.choice(OPERATIONS),
+        operands=[random_expression(rng, depth + 1) for _ in range(rng.randint(0, 4))],
+    )
+
+def calculate_or_error(expression, calculate_fn=calculate, **kwargs):
+    try:
+        return calculate_fn(expression, **kwargs)
+    except (ValueError, ArithmeticError) as e:
+        return type(e)
+
+
+class TestCanonicalize(unittest.TestCase):
+
+    def test_equivalent_forms_share_a_digest(self):
+        equivalent = ["1+(2+3)", "3+2+1", "(1+2)+3*1", "1.0+2+3+0", "(3+(2+1))/1"]
+        digests = {canonicalize(parse_infix(source)).digest for source in equivalent}
+        self.assertEqual(len(digests), 1)
+        # Digests are stable across processes and runs
+        self.assertEqual(digests.pop(), "62479be201d56a3b9fae33711a6aff5b")
+
+        self.assertEqual(canonicalize(parse_infix("4829*736")).digest, canonicalize(parse_infix("736*4829")).digest)
+        self.assertNotEqual(canonicalize(parse_infix("2*3-4")).digest, canonicalize(parse_infix("4-2*3")).digest)
+        self.assertNotEqual(canonicalize(parse_infix("8/(4/2)")).digest, canonicalize(parse_infix("8/4/2")).digest)
+
+    def test_canonical_form_calculates_the_same(self):
+        rng = random.Random(0)
+        for _ in range(3000):
+            expression = random_expression(rng)
+            canonical = canonicalize(expression).expression
+            expected, actual = calculate_or_error(expression), calculate_or_error(canonical)
+            if isinstance(expected, type):
+                # With several errors, reordered operands may surface a different one first
+                self.assertIsInstance(actual, type, expression)
+                continue
+            # Exact arithmetic is associative and commutative, so results must match exactly
+            self.assertEqual(
+                calculate(canonical, numbers=FractionNumbers()), calculate(expression, numbers=FractionNumbers()), expression
+            )
+            if math.isfinite(expected):
+                self.assertTrue(math.isclose(actual, expected, rel_tol=1e-9, abs_tol=1e-9), expression)
+                if expected == 0:
+                    self.assertEqual(math.copysign(1.0, actual), math.copysign(1.0, expected), expression)
+
+    def test_the_sign_of_zero_is_kept(self):
+        negative_zero_product = Expression(operation="multiply", operands=[0, -3])
+        for expression, lone_operand in (
+            (Expression(operation="add", operands=[-0.0, 0]), -0.0),
+            (Expression(operation="add", operands=[-0.0]), -0.0),
+            (Expression(operation="add", operands=[negative_zero_product, 0]), negative_zero_product),
+        ):
+            canonical = canonicalize(expression)
+            self.assertEqual(repr(calculate(canonical.expression)), repr(calculate(expression)), expression)
+            self.assertNotEqual(canonical.digest, canonicalize(lone_operand).digest, expression)
+        self.assertEqual(canonicalize(Expression(operation="add", operands=[-0.0, 0])).digest, canonicalize(Expression(operation="add", operands=[-0.0])).digest)
+
+        # Identities that keep the sign of zero are still dropped
+        for expression in (
+            Expression(operation="add", operands=[3, 0]),
+            Expression(operation="multiply", operands=[-0.0, 1]),
+            Expression(operation="subtract", operands=[-0.0, 0]),
+        ):
+            canonical = canonicalize(expression).expression
+            self.assertNotIsInstance(canonical, Expression, expression)
+            self.assertEqual(repr(calculate(canonical)), repr(calculate(expression)), expression)
+
+    def test_limits_and_invalid_expressions(self):
+        with self.assertRaises(ValueError):
+            canonicalize(Expression(operation="add", operands=list(range(20000))))
+        with self.assertRaises(ValueError):
+            canonicalize(Expression(operation="power", operands=[2, 3]))
+        with self.assertRaises(TypeError):
+            canonicalize(Expression(operation="add", operands=["2"]))
+
+
+class TestCalculationCache(unittest.TestCase):
+
+    def test_identical_programs_hit(self):
+        cache = CalculationCache(maxsize=2)
+        self.assertEqual(cache.calculate(parse_infix("2*3+4")), 10.0)
+        self.assertEqual(cache.calculate(parse_infix("2.0*3+4")), 10.0)
+        self.assertEqual(cache.stats(), {"hits": 1, "misses": 1, "entries": 1})
+        # Reordered operands are a different program
+        cache.calculate(parse_infix("4+3*2"))
+        self.assertEqual(cache.stats()["misses"], 2)
+
+        # Backends are cached separately, and the least recently used entry is evicted
+        self.assertEqual(cache.calculate(parse_infix("4+3*2"), numbers=FractionNumbers()), 10)
+        self.assertEqual(cache.stats()["entries"], 2)
+        cache.calculate(parse_infix("2*3+4"))
+        self.assertEqual(cache.stats()["misses"], 4)
+
+    def test_results_match_calculate(self):
+        # Sorting the operands would multiply 1e308 by 0.1 first and not overflow
+        overflowing = Expression(operation="multiply", operands=[1e308, 10, 0.1])
+        self.assertEqual(CalculationCache().calculate(overflowing), math.inf)
+
+        cache = CalculationCache()
+        rng = random.Random(1)
+        for _ in range(3000):
+            expression = random_expression(rng)
+            for numbers in (None, FractionNumbers()):
+                expected = calculate_or_error(expression, numbers=numbers)
+                actual = calculate_or_error(expression, numbers=numbers, calculate_fn=cache.calculate)
+                self.assertEqual(repr(actual), repr(expected), expression)
+        self.assertGreater(cache.stats()["hits"], 0)
+
+    def test_errors(self):
+        cache = CalculationCache()
+        for _ in range(2):
+            with self.assertRaises(ZeroDivisionError):
+                cache.calculate(parse_infix("1/(2-2)"))
+        self.assertEqual(cache.stats()["hits"], 1)
+
+        # Expressions that cannot be canonicalized raise what calculate raises
+        with self.assertRaises(ValueError) as raised:
+            cache.calculate(Expression(operation="power", operands=[2, 3]))
+        self.assertEqual(str(raised.exception), "Unsupported operation: power")
+
+        def timing_out(expression, numbers=None):
+            raise TimeoutError("worker did not respond")
+
+        with self.assertRaises(TimeoutError):
+            cache.calculate(parse_infix("5*5"), calculate_fn=timing_out)
+        self.assertEqual(cache.calculate(parse_infix("5*5")), 25.0)
+
+    def test_parsed_turn_hash(self):
+        turn = parse_turn("<calculator>\noperation: multiply\noperands: [4829, 736]\n</calculator>")
+        swapped = parse_turn("<calculator>\noperation: multiply\noperands: [736, 4829]\n</calculator>")
+        self.assertIsNotNone(turn.canonical_hash)
+        self.assertEqual(turn.canonical_hash, swapped.canonical_hash)
+        self.assertIsNone(parse_turn("No calculator call.").canonical_hash)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,172 @@
+import asyncio
+import json
+import threading
+import time
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional
+
+from anthropic import Anthropic, AsyncAnthropic, BadRequestError
+
+from model_exec.claude import ClaudeModelExecutor
+from model_exec.model_executor import Message, OutputSchema, TokenUsage
+from model_exec.rate_limit import AdaptiveRateLimiter, RetryPolicy
+
+
+class RateLimitingServer(ThreadingHTTPServer):
+    """A local stand-in for the Messages API that rate limits the first `num_429s` requests."""
+
+    def __init__(self, num_429s: int = 0, status_after: int = 200, usage: Optional[Dict[str, int]] = None):
+        super().__init__(("127.0.0.1", 0), RateLimitingHandler)
+        self.num_429s = num_429s
+        self.status_after = status_after
+        self.usage = usage or {"input_tokens": 3, "output_tokens": 2}
+        self.request_count = 0
+        self.request_bodies: List[Dict[str, Any]] = []
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+
+class RateLimitingHandler(BaseHTTPRequestHandler):
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_POST(self):
+        self.server.request_bodies.append(json.loads(self.rfile.read(int(self.headers["Content-Length"]))))
+        self.server.request_count += 1
+        if self.server.request_count <= self.server.num_429s:
+            status = 429
+            body = {"type": "error", "error": {"type": "rate_limit_error", "message": "Too many requests"}}
+        elif self.server.status_after != 200:
+            status = self.server.status_after
+            body = {"type": "error", "error": {"type": "invalid_request_error", "message": "Bad request"}}
+        else:
+            status = 200
+            body = {
+                "id": "msg_1", "type": "message", "role": "assistant", "model": "claude-3-5-haiku-20241022",
+                "content": [{"type": "text", "text": "score: 0.9"}],
+                "stop_reason": "end_turn", "stop_sequence": None,
+                "usage": self.server.usage,
+            }
+
+        payload = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.send_header("anthropic-ratelimit-requests-limit", "6000")
+        self.send_header("anthropic-ratelimit-requests-remaining", "5999")
+        if status == 429:
+            self.send_header("retry-after-ms", "20")
+        self.end_headers()
+        self.wfile.write(payload)
+
+
+class FakeHaikuExec(ClaudeModelExecutor):
+    ai_model_name = "claude-3-5-haiku-20241022"
+
+
+class FakeServerTestCase(unittest.TestCase):
+
+    def _start(self, cache_system_prompt: bool = False, **server_kwargs) -> FakeHaikuExec:
+        self.server = RateLimitingServer(**server_kwargs)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+        return FakeHaikuExec(
+            client=Anthropic(api_key="test", base_url=self.server.base_url, max_retries=0),
+            async_client=AsyncAnthropic(api_key="test", base_url=self.server.base_url, max_retries=0),
+            cache_system_prompt=cache_system_prompt,
+            retry_policy=RetryPolicy(max_retries=3, base_delay=0.001),
+            rate_limiter=AdaptiveRateLimiter(),
+        )
+
+
+class TestClaudeRetries(FakeServerTestCase):
+
+    def test_rate_limited_requests_are_retried(self):
+        model_exec = self._start(num_429s=2)
+        start = time.monotonic()
+        self.assertEqual(model_exec.execute("sys", [Message(role="user", content="hi")]), "score: 0.9")
+        self.assertEqual(self.server.request_count, 3)
+        # Each retry waited at least the server's retry-after-ms
+        self.assertGreaterEqual(time.monotonic() - start, 0.04)
+        self.assertEqual(model_exec.usage.snapshot().input_tokens, 3)
+
+    def test_async_requests_are_retried(self):
+        model_exec = self._start(num_429s=1)
+        response = asyncio.run(model_exec.execute_async("sys", [Message(role="user", content="hi")]))
+        self.assertEqual(response, "score: 0.9")
+        self.assertEqual(self.server.request_count, 2)
+
+    def test_gives_up_after_max_retries(self):
+        model_exec = self._start(num_429s=10)
+        with self.assertRaises(Exception):
+            model_exec.execute("sys", [Message(role="user", content="hi")])
+        self.assertEqual(self.server.request_count, 4)
+
+    def test_client_errors_are_not_retried(self):
+        model_exec = self._start(num_429s=0, status_after=400)
+        with self.assertRaises(BadRequestError):
+            model_exec.execute("sys", [Message(role="user", content="hi")])
+        self.assertEqual(self.server.request_count, 1)
+
+
+class TestPromptCaching(FakeServerTestCase):
+
+    def test_cache_control_payload(self):
+        model_exec = self._start(cache_system_prompt=True)
+        messages = [Message(role="user", content="rubric examples", cacheable=True), Message(role="user", content="hi")]
+        model_exec.execute("sys", messages)
+        body = self.server.request_bodies[-1]
+        self.assertEqual(body["system"], [{"type": "text", "text": "sys", "cache_control": {"type": "ephemeral"}}])
+        self.assertEqual(body["messages"][0]["content"][0]["cache_control"], {"type": "ephemeral"})
+        self.assertNotIn("cache_control", body["messages"][1]["content"][0])
+
+        # Turned off per call, the system message is sent as plain text
+        model_exec.execute("sys", [Message(role="user", content="hi")], cache_system=False)
+        self.assertEqual(self.server.request_bodies[-1]["system"], "sys")
+
+    def test_forced_tool_shares_the_system_breakpoint(self):
+        model_exec = self._start(cache_system_prompt=True)
+        schema = OutputSchema(name="submit_verdict", description="Submit.", json_schema={"type": "object", "properties": {}})
+        model_exec.execute_structured("sys", [Message(role="user", content="hi")], schema)
+        body = self.server.request_bodies[-1]
+        # Tools precede the system message, so the system breakpoint caches them too without a marker of their own
+        self.assertNotIn("cache_control", body["tools"][0])
+        self.assertEqual(body["system"][0]["cache_control"], {"type": "ephemeral"})
+        self.assertEqual(body["tool_choice"], {"type": "tool", "name": "submit_verdict"})
+
+    def test_cache_token_usage_is_accumulated(self):
+        usage = {"input_tokens": 40, "output_tokens": 12, "cache_creation_input_tokens": 0, "cache_read_input_tokens": 2100}
+        model_exec = self._start(cache_system_prompt=True, usage=usage)
+        model_exec.execute("sys", [Message(role="user", content="hi")])
+        asyncio.run(model_exec.execute_async("sys", [Message(role="user", content="hi")]))
+
+        expected = TokenUsage(input_tokens=80, output_tokens=24, cache_creation_input_tokens=0, cache_read_input_tokens=4200)
+        self.assertEqual(model_exec.usage.snapshot(reset=True), expected)
+        self.assertEqual(model_exec.usage.snapshot(), TokenUsage())
+
+
+class TestAdaptiveRateLimiter(unittest.TestCase):
+
+    def test_adapts_to_reported_limit(self):
+        limiter = AdaptiveRateLimiter()
+        self.assertEqual(limiter._reserve(), 0.0)
+
+        # 60 requests per minute with none left: the next slot refills in about a second
+        limiter.update({"anthropic-ratelimit-requests-limit": "60", "anthropic-ratelimit-requests-remaining": "0"})
+        self.assertAlmostEqual(limiter._reserve(), 1.0, places=1)
+        self.assertAlmostEqual(limiter._reserve(), 2.0, places=1)
+
+    def test_retry_after_pauses_all_callers(self):
+        limiter = AdaptiveRateLimiter()
+        limiter.update({"retry-after": "2"})
+        self.assertAlmostEqual(limiter._reserve(), 2.0, places=1)
+        self.assertAlmostEqual(limiter._reserve(), 2.0, places=1)
+
+
+if __name__ == "__main__":
+    unittest.main()
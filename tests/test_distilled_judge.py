@@ -0,0 +1,69 @@
+import asyncio
+import os
+import tempfile
+import unittest
+
+from model_exec.fake import VALID, FakeModelExecutor
+from model_exec.model_executor import Message
+from rewards.distilled_judge import DistilledScorer, EscalatingJudgeModel, train_distilled_scorer
+from rewards.exec_judge import JUDGE_PROMPT_PREFIX, JUDGE_PROMPT_SUFFIX
+from rewards.verdict_log import VerdictLog, load_verdicts
+
+GOOD = "By: user\nWhat is {a} + {b}?\n-\nBy: assistant\n<calculator>\noperation: add\noperands: [{a}, {b}]\n</calculator>\n-\nBy: user\n<output>{c}</output>\n-\nBy: assistant\nThe answer is {c}."
+SLOPPY = "By: user\nWhat is {a} + {b}?\n-\nBy: assistant\n<calculator>\noperation: add\noperands: [{a}, {b}]\n</calculator>\n-\nBy: user\n<output>{c}</output>\n-\nBy: assistant\nI think it is about {d}."
+
+
+def _verdicts(count):
+    verdicts = []
+    for i in range(count):
+        a, b = i, 2 * i + 1
+        verdicts.append((GOOD.format(a=a, b=b, c=a + b), 1.0))
+        verdicts.append((SLOPPY.format(a=a, b=b, c=a + b, d=a + b + 7), 0.6))
+    return verdicts
+
+
+class TestDistilledJudge(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.scorer = train_distilled_scorer(_verdicts(100), hash_bits=12, epochs=5)
+
+    def test_scorer_learns_judge_scores(self):
+        scores, confidences = self.scorer.predict([GOOD.format(a=500, b=3, c=503), SLOPPY.format(a=500, b=3, c=503, d=9)])
+        self.assertEqual(list(scores), [1.0, 0.6])
+        self.assertTrue((confidences > 0.8).all())
+
+    def test_scorer_round_trips_through_a_file(self):
+        conversation = GOOD.format(a=1, b=2, c=3)
+        for name in ("scorer.npz", "scorer"):
+            with tempfile.TemporaryDirectory() as directory:
+                path = os.path.join(directory, name)
+                self.scorer.save(path)
+                self.assertEqual(os.listdir(directory), [name])
+                loaded = DistilledScorer.load(path)
+            self.assertEqual(loaded.predict([conversation])[0][0], self.scorer.predict([conversation])[0][0])
+
+    def test_unsure_and_unrecognised_prompts_are_escalated_and_logged(self):
+        fallback = FakeModelExecutor(response_weights={VALID: 1.0}, latency_p50=0.0)
+        with tempfile.TemporaryDirectory() as directory:
+            log_path = os.path.join(directory, "verdicts.jsonl")
+            model = EscalatingJudgeModel(self.scorer, fallback, min_confidence=0.8, verdict_log=VerdictLog(log_path))
+
+            def judge(user_msg):
+                return asyncio.run(model.execute_async("sys", [Message(role="user", content=user_msg)]))
+
+            self.assertIn("distilled judge", judge(f"{JUDGE_PROMPT_PREFIX}{GOOD.format(a=4, b=5, c=9)}{JUDGE_PROMPT_SUFFIX}"))
+            unseen = "By: user\nWhat is 2 * 3?\n-\nBy: assistant\nSix, obviously."
+            judge(f"{JUDGE_PROMPT_PREFIX}{unseen}{JUDGE_PROMPT_SUFFIX}")
+            model.min_confidence = 1.01
+            judge(f"{JUDGE_PROMPT_PREFIX}{GOOD.format(a=4, b=5, c=9)}{JUDGE_PROMPT_SUFFIX}")
+            judge("# Previous Failed Response\n...")
+
+            self.assertEqual(model.escalation_stats(), {"distilled": 1, "escalated": 3})
+            self.assertEqual(fallback.stats()["calls"], 3)
+            # Only escalated first prompts carry a conversation to learn from
+            self.assertEqual(len(load_verdicts(log_path)), 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
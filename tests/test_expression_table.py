@@ -0,0 +1,104 @@
+import random
+import unittest
+
+from environment.action_parser import parse_calculator_expression, parse_calculator_program
+from environment.tools.batch_calculator import calculate_batch
+from environment.tools.calculator import Expression, calculate, compile_expression
+from environment.tools.expression_table import ExpressionTable
+from environment.tools.numeric import FractionNumbers
+
+OPERATIONS = ["add", "subtract", "multiply", "divide"]
+
+
+def random_body(rng: random.Random, indent: int = 0, depth: int = 0) -> str:
+    pad = " " * indent
+    lines = [f"{pad}operation: {rng.choice(OPERATIONS)}"]
+    operands = [rng.choice([rng.randint(-50, 50), round(rng.uniform(-10, 10), 2), 0]) for _ in range(rng.randint(0, 3))]
+    if depth < 3 and rng.random() < 0.6:
+        lines.append(f"{pad}operands:")
+        for operand in operands:
+            lines.append(f"{pad}  - {operand}")
+        nested = random_body(rng, indent + 4, depth + 1).split("\n")
+        lines.append(f"{pad}  - {nested[0].lstrip(' ')}")
+        lines.extend(nested[1:])
+    else:
+        lines.append(f"{pad}operands: [{', '.join(str(operand) for operand in operands)}]")
+    return "\n".join(lines)
+
+def outcome(function, *args):
+    try:
+        return function(*args)
+    except Exception as e:
+        return (type(e), str(e))
+
+
+class TestCompactExpressions(unittest.TestCase):
+
+    def test_nodes_are_slotted(self):
+        expression = Expression(operation="add", operands=[1, 2])
+        self.assertFalse(hasattr(expression, "__dict__"))
+        self.assertFalse(hasattr(compile_expression(expression), "__dict__"))
+
+    def test_program_parser_matches_compiling_the_tree(self):
+        rng = random.Random(0)
+        bodies = [random_body(rng) for _ in range(500)]
+        bodies += [
+            "operation: add\noperands: [1, 2]  # comment",
+            f"operation: add\noperands: [{2 ** 70}, 1]",
+            "operation: add\noperands: [" + ", ".join(["1"] * 10_001) + "]",
+        ]
+        for body in bodies:
+            program = outcome(parse_calculator_program, body)
+            expected = outcome(lambda body: compile_expression(parse_calculator_expression(body)), body)
+            self.assertEqual(program, expected, body)
+            if not isinstance(program, tuple):
+                self.assertEqual(outcome(calculate, program), outcome(calculate, expected), body)
+
+        with self.assertRaises(ValueError):
+            parse_calculator_program("operation: power\noperands: [2, 3]")
+
+    def test_to_expression_is_a_view(self):
+        expression = Expression(operation="add", operands=[1.5, Expression(operation="multiply", operands=[2, 2 ** 70])])
+        rebuilt = compile_expression(expression).to_expression()
+        self.assertEqual(rebuilt, Expression(operation="add", operands=[1.5, Expression(operation="multiply", operands=[2.0, 2 ** 70])]))
+        self.assertEqual(calculate(rebuilt, numbers=FractionNumbers()), calculate(expression, numbers=FractionNumbers()))
+        self.assertEqual(compile_expression(7).to_expression(), 7.0)
+
+        with self.assertRaises(ValueError):
+            compile_expression(Expression(operation="power", operands=[2, 3])).to_expression()
+
+
+class TestExpressionTable(unittest.TestCase):
+
+    def test_rows_round_trip(self):
+        expressions = [
+            Expression(operation="add", operands=[1, Expression(operation="multiply", operands=[2, 3])]),
+            4.5,
+            Expression(operation="add", operands=[2 ** 70, 1]),
+            Expression(operation="power", operands=[2, 3]),
+            Expression(operation="divide", operands=[1, 0]),
+        ]
+        table = ExpressionTable(expressions)
+        self.assertEqual(len(table), 5)
+        self.assertEqual(table.append(parse_calculator_program("operation: subtract\noperands: [9, 4]")), 5)
+
+        for row, expression in zip(table, expressions):
+            self.assertEqual(row, compile_expression(expression))
+        self.assertEqual(table[-1], table[5])
+        self.assertEqual(table.expression(0), Expression(operation="add", operands=[1.0, Expression(operation="multiply", operands=[2.0, 3.0])]))
+        self.assertEqual(calculate(table[2], numbers=FractionNumbers()), 2 ** 70 + 1)
+        with self.assertRaises(IndexError):
+            table[6]
+        with self.assertRaises(TypeError):
+            table.append("1+1")
+
+        batch = calculate_batch(table)
+        self.assertEqual([batch.values[i] for i in (0, 1, 5)], [7.0, 4.5, 5.0])
+        self.assertIsInstance(batch.errors[3], ValueError)
+        self.assertIsInstance(batch.errors[4], ZeroDivisionError)
+        # One byte per opcode, eight per arg and constant, and two offsets per row plus the leading zeros
+        self.assertEqual(table.nbytes, len(table.opcodes) * 9 + len(table.constants) * 8 + (len(table) + 1) * 16)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,36 @@
+import asyncio
+import os
+import unittest
+
+from model_exec.fake import FENCED, NO_SCORE, TIMEOUT, VALID, FakeModelExecutor
+from model_exec.model_executor import Message
+from rewards.exec_judge import JudgeExecutor
+
+TOOL_JUDGE_PATH = os.path.join(os.path.dirname(__file__), "..", "src", "rewards", "tool_judge.md")
+
+
+class TestFakeModelExecutor(unittest.TestCase):
+
+    def test_responses_are_deterministic_per_request(self):
+        messages = [Message(role="user", content="By: user\nWhat is 2 + 2?")]
+        first = FakeModelExecutor(response_weights={VALID: 1, FENCED: 1}, latency_p50=0.0, seed=3)
+        second = FakeModelExecutor(response_weights={VALID: 1, FENCED: 1}, latency_p50=0.0, seed=3)
+        self.assertEqual(first.execute("sys", messages), second.execute("sys", messages))
+        self.assertEqual(first.execute("sys", messages), asyncio.run(first.execute_async("sys", messages)))
+
+    def test_unrecoverable_responses_are_retried(self):
+        fake = FakeModelExecutor(response_weights={NO_SCORE: 1}, latency_p50=0.0)
+        judge = JudgeExecutor(model_exec=fake, sys_msg_path=TOOL_JUDGE_PATH, max_retries=2)
+        self.assertIsNone(judge.run_judge("By: user\nWhat is 2 + 2?"))
+        self.assertEqual(fake.stats()["calls"], 3)
+        self.assertEqual(fake.stats()["retries"], 2)
+
+    def test_timeouts_raise(self):
+        fake = FakeModelExecutor(response_weights={TIMEOUT: 1}, timeout=0.0)
+        with self.assertRaises(TimeoutError):
+            fake.execute("sys", [Message(role="user", content="hi")])
+        self.assertEqual(fake.stats()["timeouts"], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
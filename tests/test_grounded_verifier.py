@@ -0,0 +1,68 @@
+import unittest
+
+from rewards.calculator_reward_func import verify_grounded_answer
+from rewards.verifiers.grounded_verifier import check_grounded_answer, count_repeated_tool_calls, reference_result, tool_outputs
+
+CALL = "<calculator>\noperation: divide\noperands: [67392, 85]\n</calculator>"
+WRONG_CALL = "<calculator>\noperation: divide\noperands: [67392, 58]\n</calculator>"
+OUTPUT = "<output>792.8470588235294</output>"
+
+
+def completion(*messages):
+    roles = ["assistant", "user"]
+    return [{"role": roles[i % 2], "content": content} for i, content in enumerate(messages)]
+
+
+class TestGroundedVerifier(unittest.TestCase):
+
+    def test_reference_results_are_cached(self):
+        reference_result.cache_clear()
+        self.assertAlmostEqual(reference_result(" 67392/85"), 792.8470588235294)
+        reference_result(" 67392/85")
+        self.assertEqual(reference_result.cache_info().hits, 1)
+        self.assertIsNone(reference_result("1/0"))
+        self.assertIsNone(reference_result("2**8"))
+
+    def test_tool_outputs_skip_errors(self):
+        messages = completion(CALL, "Error: Unable to calculate the expression.", CALL, OUTPUT, "It is 792.85")
+        self.assertEqual(tool_outputs(messages), [792.8470588235294])
+
+    def test_rounded_transcription_of_a_correct_call_scores_fully(self):
+        # The dataset answer has more digits, but the answer is a faithful transcription of the tool output
+        check = check_grounded_answer(completion(CALL, OUTPUT, "The answer is 792.85."), "67392/85")
+        self.assertTrue(check.transcribed)
+        self.assertTrue(check.expression_correct)
+        self.assertEqual(check.score, 1.0)
+
+    def test_partial_credit(self):
+        wrong_expression = completion(WRONG_CALL, "<output>1161.9310344827586</output>", "The answer is 1161.93.")
+        self.assertEqual(check_grounded_answer(wrong_expression, "67392/85").score, 0.5)
+
+        mistranscribed = completion(CALL, OUTPUT, "The answer is 800.")
+        self.assertEqual(check_grounded_answer(mistranscribed, "67392/85").score, 0.5)
+
+        # A conversation that ends on a calculator call has no final answer
+        unfinished = completion(CALL, OUTPUT, CALL)
+        self.assertEqual(check_grounded_answer(unfinished, "67392/85").score, 0.5)
+
+        no_reference = completion(CALL, OUTPUT, "The answer is 792.85.")
+        self.assertIsNone(check_grounded_answer(no_reference, None).expression_correct)
+        self.assertEqual(check_grounded_answer(no_reference, None).score, 1.0)
+
+    def test_repeated_tool_calls_within_a_group(self):
+        swapped_call = "<calculator>\noperation: divide\noperands: [67392, 85.0]\n</calculator>"
+        prompts = [[{"role": "user", "content": "Calculate 67392 divided by 85"}]] * 3 + [[{"role": "user", "content": "Other"}]]
+        completions = [completion(CALL, OUTPUT, CALL), completion(swapped_call), completion(WRONG_CALL), completion(CALL)]
+        # The first two generations make the same call; the same call for another prompt does not count
+        self.assertEqual(count_repeated_tool_calls(prompts, completions), 2)
+
+    def test_reward_function(self):
+        prompts = [[{"role": "user", "content": "Calculate 67392 divided by 85"}]] * 2
+        completions = [completion(CALL, OUTPUT, "792.85"), completion("It is about 800.")]
+        self.assertEqual(verify_grounded_answer(prompts, completions, expression=["67392/85"] * 2), [1.0, 0.0])
+        with self.assertRaises(ValueError):
+            verify_grounded_answer(prompts, completions)
+
+
+if __name__ == "__main__":
+    unittest.main()
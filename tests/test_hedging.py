@@ -0,0 +1,80 @@
+import asyncio
+import unittest
+
+from rewards.hedging import HedgedRequests, HedgingPolicy
+
+
+def _request_with_latencies(latencies):
+    """Returns a request factory whose n-th request takes latencies[n] seconds and returns n."""
+    calls = []
+
+    def request():
+        index = len(calls)
+        calls.append(index)
+
+        async def respond():
+            await asyncio.sleep(latencies[index])
+            return index
+        return respond()
+    return request, calls
+
+
+class TestHedgedRequests(unittest.TestCase):
+
+    def _warm_up(self, hedger: HedgedRequests, latency: float, count: int) -> None:
+        async def warm_up():
+            for _ in range(count):
+                request, _ = _request_with_latencies([latency])
+                await hedger.call(request)
+        asyncio.run(warm_up())
+
+    def test_slow_request_is_hedged(self):
+        hedger = HedgedRequests(HedgingPolicy(percentile=90, min_delay=0.0, budget=1.0, min_samples=5))
+        self._warm_up(hedger, latency=0.01, count=5)
+
+        request, calls = _request_with_latencies([1.0, 0.01])
+        self.assertEqual(asyncio.run(hedger.call(request)), 1)
+        self.assertEqual(len(calls), 2)
+        self.assertEqual(hedger.stats()["hedge_wins"], 1)
+
+    def test_cancelled_primaries_keep_the_hedge_delay_up(self):
+        hedger = HedgedRequests(HedgingPolicy(percentile=50, min_delay=0.0, budget=1.0, min_samples=5))
+        self._warm_up(hedger, latency=0.05, count=5)
+
+        async def hedged_calls():
+            for _ in range(10):
+                request, _ = _request_with_latencies([1.0, 0.001])
+                await hedger.call(request)
+        asyncio.run(hedged_calls())
+        self.assertEqual(hedger.stats()["hedge_wins"], 10)
+        # Only the fast hedges finished; the slow primaries count at the time they were cancelled
+        self.assertGreaterEqual(hedger._hedge_delay(), 0.05)
+
+    def test_no_hedging_before_enough_samples(self):
+        hedger = HedgedRequests(HedgingPolicy(min_delay=0.0, budget=1.0, min_samples=5))
+        request, calls = _request_with_latencies([0.05, 0.0])
+        self.assertEqual(asyncio.run(hedger.call(request)), 0)
+        self.assertEqual(len(calls), 1)
+
+    def test_budget_caps_extra_requests(self):
+        hedger = HedgedRequests(HedgingPolicy(percentile=50, min_delay=0.0, budget=0.1, min_samples=5))
+        self._warm_up(hedger, latency=0.001, count=5)
+
+        async def slow_calls():
+            for _ in range(10):
+                request, _ = _request_with_latencies([0.02, 0.0])
+                await hedger.call(request)
+        asyncio.run(slow_calls())
+        # 15 calls with a 10% budget allow one hedge
+        self.assertEqual(hedger.stats()["hedges"], 1)
+
+    def test_deadline_raises(self):
+        hedger = HedgedRequests(HedgingPolicy(deadline=0.01))
+        request, _ = _request_with_latencies([1.0])
+        with self.assertRaises(TimeoutError):
+            asyncio.run(hedger.call(request))
+        self.assertEqual(hedger.stats()["deadline_exceeded"], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,134 @@
+import json
+import os
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from anthropic import Anthropic
+
+from model_exec.claude import ClaudeModelExecutor
+from model_exec.model_executor import BatchRequest, Message
+from rewards.exec_judge import JudgeExecutor
+
+TOOL_JUDGE_PATH = os.path.join(os.path.dirname(__file__), "..", "src", "rewards", "tool_judge.md")
+
+
+def _fake_judge_reply(user_msg: str) -> str:
+    if "Previous Failed Response" in user_msg:
+        return 'thoughts: "Fixed on retry"\nscore: 0.6'
+    if "malformed" in user_msg:
+        return "I refuse to follow the output format."
+    return 'thoughts: "Good calculator use"\nscore: 0.9'
+
+
+class FakeBatchServer(ThreadingHTTPServer):
+    """A local stand-in for the Message Batches API that answers as a judge would."""
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), FakeBatchHandler)
+        self.batches = {}
+        self.polls = {}
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+
+class FakeBatchHandler(BaseHTTPRequestHandler):
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, body, content_type="application/json"):
+        payload = body if isinstance(body, bytes) else json.dumps(body).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def _batch(self, batch_id: str, ended: bool):
+        return {
+            "id": batch_id,
+            "type": "message_batch",
+            "processing_status": "ended" if ended else "in_progress",
+            "request_counts": {"processing": 0, "succeeded": 0, "errored": 0, "canceled": 0, "expired": 0},
+            "created_at": "2025-01-01T00:00:00Z",
+            "expires_at": "2025-01-02T00:00:00Z",
+            "results_url": f"{self.server.base_url}/v1/messages/batches/{batch_id}/results" if ended else None,
+        }
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        batch_id = f"msgbatch_{len(self.server.batches)}"
+        self.server.batches[batch_id] = body["requests"]
+        self.server.polls[batch_id] = 0
+        self._send_json(self._batch(batch_id, ended=False))
+
+    def do_GET(self):
+        parts = self.path.strip("/").split("/")
+        batch_id = parts[3]
+        if parts[-1] == "results":
+            lines = []
+            for request in self.server.batches[batch_id]:
+                user_msg = request["params"]["messages"][0]["content"][0]["text"]
+                message = {
+                    "id": "msg_1", "type": "message", "role": "assistant", "model": request["params"]["model"],
+                    "content": [{"type": "text", "text": _fake_judge_reply(user_msg)}],
+                    "stop_reason": "end_turn", "stop_sequence": None,
+                    "usage": {"input_tokens": 1, "output_tokens": 1},
+                }
+                lines.append(json.dumps({"custom_id": request["custom_id"], "result": {"type": "succeeded", "message": message}}))
+            self._send_json("\n".join(lines).encode(), content_type="application/binary")
+            return
+
+        # Report the batch as still processing on the first poll
+        self.server.polls[batch_id] += 1
+        self._send_json(self._batch(batch_id, ended=self.server.polls[batch_id] > 1))
+
+
+class FakeHaikuExec(ClaudeModelExecutor):
+    ai_model_name = "claude-3-5-haiku-20241022"
+
+
+class TestJudgeBatch(unittest.TestCase):
+
+    def setUp(self):
+        self.server = FakeBatchServer()
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        client = Anthropic(api_key="test", base_url=self.server.base_url, max_retries=0)
+        self.model_exec = FakeHaikuExec(client=client)
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_execute_batch_maps_results_by_custom_id(self):
+        results = self.model_exec.execute_batch(
+            [
+                BatchRequest(custom_id="a", sys_msg="sys", messages=[Message(role="user", content="fine")]),
+                BatchRequest(custom_id="b", sys_msg="sys", messages=[Message(role="user", content="malformed")]),
+            ],
+            poll_interval=0.0,
+        )
+        self.assertEqual(results["a"], 'thoughts: "Good calculator use"\nscore: 0.9')
+        self.assertEqual(results["b"], "I refuse to follow the output format.")
+
+    def test_run_judge_bulk_applies_retry_fallback(self):
+        judge = JudgeExecutor(model_exec=self.model_exec, sys_msg_path=TOOL_JUDGE_PATH)
+        self.model_exec.execute_batch = _with_poll_interval(self.model_exec.execute_batch, 0.0)
+
+        conversations = ["By: user\nfine", "By: user\nmalformed", "By: user\nfine"]
+        results = judge.run_judge_bulk(conversations)
+
+        self.assertEqual([r.score for r in results], [0.9, 0.6, 0.9])
+        # One batch for first attempts (duplicates sent once) and one for the retry
+        self.assertEqual([len(requests) for requests in self.server.batches.values()], [2, 1])
+
+
+def _with_poll_interval(execute_batch, poll_interval):
+    return lambda requests: execute_batch(requests, poll_interval=poll_interval)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,83 @@
+import os
+import tempfile
+import threading
+import time
+import unittest
+
+from rewards.judge_cache import JudgeCache, make_judge_cache_key
+from rewards.judge_resp import JudgeResponse
+
+
+class TestJudgeCache(unittest.TestCase):
+
+    def test_key_depends_on_every_input(self):
+        key = make_judge_cache_key("conversation", "sys", "model")
+        self.assertEqual(key, make_judge_cache_key("conversation", "sys", "model"))
+        self.assertNotEqual(key, make_judge_cache_key("conversation!", "sys", "model"))
+        self.assertNotEqual(key, make_judge_cache_key("conversation", "sys!", "model"))
+        self.assertNotEqual(key, make_judge_cache_key("conversation", "sys", "model!"))
+
+    def test_compute_called_once_per_key(self):
+        cache = JudgeCache()
+        calls = []
+
+        def compute():
+            calls.append(1)
+            return JudgeResponse(thoughts="ok", score=0.8)
+
+        first = cache.get_or_compute("k", compute)
+        second = cache.get_or_compute("k", compute)
+        self.assertEqual(first, second)
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(cache.stats()["hits"], 1)
+        self.assertEqual(cache.stats()["misses"], 1)
+
+    def test_none_results_are_not_cached(self):
+        cache = JudgeCache()
+        self.assertIsNone(cache.get_or_compute("k", lambda: None))
+        self.assertIsNone(cache.get("k"))
+        self.assertEqual(cache.stats()["misses"], 1)
+
+    def test_lru_eviction(self):
+        cache = JudgeCache(max_entries=2)
+        cache.put("a", JudgeResponse(thoughts="", score=0.1))
+        cache.put("b", JudgeResponse(thoughts="", score=0.2))
+        cache.get("a")
+        cache.put("c", JudgeResponse(thoughts="", score=0.3))
+        self.assertIsNotNone(cache.get("a"))
+        self.assertIsNone(cache.get("b"))
+        self.assertIsNotNone(cache.get("c"))
+
+    def test_concurrent_duplicates_share_one_call(self):
+        cache = JudgeCache()
+        calls = []
+
+        def compute():
+            calls.append(1)
+            time.sleep(0.05)
+            return JudgeResponse(thoughts="", score=0.5)
+
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(cache.get_or_compute("k", compute))) for _ in range(5)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len(calls), 1)
+        self.assertEqual([r.score for r in results], [0.5] * 5)
+
+    def test_disk_layer_shared_between_instances(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            db_path = os.path.join(tmp_dir, "verdicts.sqlite")
+            JudgeCache(db_path=db_path).put("k", JudgeResponse(thoughts="shared", score=0.9))
+
+            other = JudgeCache(db_path=db_path)
+            response = other.get_or_compute("k", lambda: self.fail("Should be served from disk"))
+            self.assertEqual(response, JudgeResponse(thoughts="shared", score=0.9))
+            self.assertEqual(other.stats()["disk_hits"], 1)
+            self.assertEqual(other.stats()["misses"], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,48 @@
+import os
+import subprocess
+import sys
+import unittest
+
+SRC_DIR = os.path.join(os.path.dirname(__file__), "..", "src")
+
+
+def _run_in_fresh_process(code: str, **env: str) -> subprocess.CompletedProcess:
+    process_env = dict(os.environ, PYTHONPATH=SRC_DIR, **env)
+    process_env.pop("ANTHROPIC_API_KEY", None)
+    return subprocess.run([sys.executable, "-c", code], env=process_env, capture_output=True, text=True)
+
+
+class TestJudgeFactory(unittest.TestCase):
+
+    def test_importing_reward_module_creates_no_judge(self):
+        result = _run_in_fresh_process(
+            "import sys\n"
+            "from rewards import calculator_reward_func, judge_factory\n"
+            "calculator_reward_func.verify_correctness([[]], [[{'role': 'assistant', 'content': '4'}]], answer=['4'])\n"
+            "assert 'anthropic' not in sys.modules\n"
+            "assert judge_factory.peek_judge_model() is None\n"
+        )
+        self.assertEqual(result.returncode, 0, result.stderr)
+
+    def test_judge_model_is_chosen_by_env_and_shared(self):
+        result = _run_in_fresh_process(
+            "from rewards.judge_factory import get_judge_model, get_tool_judge\n"
+            "assert get_judge_model().ai_model_name == 'fake-judge'\n"
+            "assert get_tool_judge() is get_tool_judge()\n"
+            "assert get_tool_judge().model_exec is get_judge_model()\n",
+            JUDGE_MODEL="fake",
+        )
+        self.assertEqual(result.returncode, 0, result.stderr)
+
+    def test_unknown_judge_model_raises(self):
+        result = _run_in_fresh_process(
+            "from rewards.judge_factory import get_judge_model\n"
+            "get_judge_model()\n",
+            JUDGE_MODEL="not-a-model",
+        )
+        self.assertNotEqual(result.returncode, 0)
+        self.assertIn("Unknown judge model: not-a-model", result.stderr)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,78 @@
+import unittest
+
+from model_exec.local import (
+    SCORE_CANDIDATES,
+    allowed_score_tokens,
+    build_score_token_table,
+    incremental_prefix_fn,
+    parse_score,
+    render_judge_response,
+)
+from rewards.judge_yaml_response_parser import YAMLResponseParser
+
+# A toy vocabulary that splits digits like most tokenizers, plus tokens that can never appear in a score
+VOCAB = [(0, " "), (1, "0"), (2, "1"), (3, "."), (4, "5"), (5, " 0"), (6, "0."), (7, "score"), (8, "2"), (9, "11")]
+
+
+class CountingTexts(list):
+    lookups = 0
+
+    def __getitem__(self, index):
+        self.lookups += 1
+        return super().__getitem__(index)
+
+
+class TestLocalJudgeGrammar(unittest.TestCase):
+
+    def test_score_tokens_only_lead_to_candidates(self):
+        table = build_score_token_table(VOCAB)
+        self.assertNotIn("score", table)
+        self.assertNotIn("11", table)
+
+        self.assertEqual(sorted(allowed_score_tokens("", table)), [0, 5])
+        self.assertEqual(sorted(allowed_score_tokens(" 1", table)), [3])
+        self.assertEqual(allowed_score_tokens(" 1.", table), [1])
+        self.assertEqual(allowed_score_tokens(" 0.5", table), [])
+
+    def test_every_constrained_generation_reaches_a_candidate(self):
+        table = build_score_token_table(VOCAB)
+        texts = {""}
+        for _ in range(max(len(c) for c in SCORE_CANDIDATES)):
+            texts = {
+                text + token for text in texts
+                for token, ids in table.items() if set(ids) & set(allowed_score_tokens(text, table))
+            } | {text for text in texts if text in SCORE_CANDIDATES}
+        self.assertTrue(texts <= set(SCORE_CANDIDATES))
+
+    def test_rendered_responses_always_parse(self):
+        for thoughts in ['Fine', 'Said "hi"\nthen \\ left', '', 'score: 0.9']:
+            response = render_judge_response(thoughts, parse_score(" 0.7"))
+            self.assertEqual(YAMLResponseParser.parse_judge_response(response).score, 0.7)
+
+    def test_cut_off_scores_are_not_verdicts(self):
+        self.assertEqual(parse_score(" 1.0"), 1.0)
+        for text in ["", " 0", " 0.", "0.5"]:
+            with self.assertRaises(ValueError):
+                parse_score(text)
+
+    def test_prefix_fn_decodes_only_new_tokens(self):
+        texts = [text for _, text in VOCAB]
+        seen = []
+        prefix_fn = incremental_prefix_fn(texts, prompt_length=2, allowed_tokens=lambda text: seen.append(text) or [])
+        prompts = {0: [7, 7], 1: [8, 8]}
+        for token_ids in ([], [5], [5, 3], [5, 3, 4]):
+            for row, prompt in prompts.items():
+                prefix_fn(row, prompt + token_ids)
+        self.assertEqual(seen, ["", "", " 0", " 0", " 0.", " 0.", " 0.5", " 0.5"])
+
+        # Token texts are looked up once per generated token, not once per step
+        counting_texts = CountingTexts(texts)
+        prefix_fn = incremental_prefix_fn(counting_texts, prompt_length=0, allowed_tokens=lambda text: [])
+        generated = [1] * 50
+        for length in range(len(generated) + 1):
+            prefix_fn(0, generated[:length])
+        self.assertEqual(counting_texts.lookups, 50)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,73 @@
+import unittest
+from decimal import Decimal
+from fractions import Fraction
+
+from environment.tools.calculator import Expression, calculate, compile_expression
+from environment.tools.infix import parse_infix
+from environment.tools.numeric import FLOAT, DecimalNumbers, FractionNumbers, format_result, numeric_backend
+
+# Float arithmetic cancels the large products exactly and loses the quotient's low bits: it gives 16.0
+CANCELLATION = "987654321/123456789+987654321*123456789-123456789*987654321"
+
+
+class TestNumericBackends(unittest.TestCase):
+
+    def test_integer_chains_are_exact(self):
+        expression = parse_infix("4829*736*9127*8831*7723*6619")
+        exact = 4829 * 736 * 9127 * 8831 * 7723 * 6619
+        self.assertNotEqual(calculate(expression), exact)
+        self.assertEqual(calculate(expression, numbers=FractionNumbers()), exact)
+        self.assertEqual(calculate(expression, numbers=DecimalNumbers(40)), exact)
+        # Rounded once to the precision
+        self.assertEqual(calculate(expression, numbers=DecimalNumbers(5)), Decimal("1.4644E+22"))
+
+    def test_division_and_decimal_literals(self):
+        self.assertEqual(calculate(parse_infix(CANCELLATION)), 16.0)
+        self.assertEqual(calculate(parse_infix(CANCELLATION), numbers=FractionNumbers()), Fraction(987654321, 123456789))
+
+        self.assertEqual(calculate(parse_infix("0.1+0.2"), numbers=FractionNumbers()), Fraction(3, 10))
+        self.assertEqual(calculate(parse_infix("0.1+0.2"), numbers=DecimalNumbers()), Decimal("0.3"))
+        self.assertEqual(calculate(parse_infix("67392/85"), numbers=DecimalNumbers(10)), Decimal("792.8470588"))
+        self.assertEqual(calculate(parse_infix("10/4*2"), numbers=FractionNumbers()), 5)
+
+    def test_results_have_the_backend_type(self):
+        for expression in (7, 2.5, Expression(operation="add", operands=[1, 2])):
+            self.assertIsInstance(calculate(expression, numbers=FractionNumbers()), Fraction)
+            self.assertIsInstance(calculate(expression, numbers=DecimalNumbers()), Decimal)
+            self.assertIsInstance(calculate(expression, numbers=FLOAT), float)
+
+    def test_large_integer_literals_stay_exact(self):
+        big = 2 ** 70 + 1
+        program = compile_expression(Expression(operation="add", operands=[big, 1]))
+        self.assertEqual(program.big_integers, ((0, big),))
+        self.assertEqual(calculate(program, numbers=FractionNumbers()), big + 1)
+        self.assertEqual(calculate(program), float(big))
+
+    def test_errors_match_float(self):
+        cases = [
+            Expression(operation="divide", operands=[1, Expression(operation="subtract", operands=[2, 2])]),
+            Expression(operation="divide", operands=[]),
+            Expression(operation="power", operands=[2, 3]),
+        ]
+        for expression in cases:
+            with self.assertRaises(Exception) as expected:
+                calculate(expression)
+            for numbers in (DecimalNumbers(), FractionNumbers()):
+                with self.assertRaises(type(expected.exception)) as raised:
+                    calculate(expression, numbers=numbers)
+                self.assertEqual(str(raised.exception), str(expected.exception))
+
+    def test_backend_names_and_output_format(self):
+        self.assertIs(numeric_backend("float"), FLOAT)
+        self.assertEqual(numeric_backend("decimal", precision=50), DecimalNumbers(50))
+        self.assertEqual(numeric_backend("fraction"), FractionNumbers())
+        with self.assertRaises(ValueError):
+            numeric_backend("double")
+
+        self.assertEqual(format_result(792.8470588235294), "792.8470588235294")
+        self.assertEqual(format_result(Fraction(10, 2)), "5")
+        self.assertEqual(format_result(Fraction(67392, 85)), "792.8470588235294117647058824")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,91 @@
+import asyncio
+import os
+import unittest
+from typing import List
+
+from model_exec.fake import NO_SCORE, VALID, FakeModelExecutor
+from model_exec.model_executor import Message, ModelExecutor
+from rewards.exec_judge import JudgeExecutor
+from rewards.judge_yaml_response_parser import YAMLResponseParser
+
+TOOL_JUDGE_PATH = os.path.join(os.path.dirname(__file__), "..", "src", "rewards", "tool_judge.md")
+
+
+class PackedReplyModelExec(ModelExecutor):
+    """Answers packed prompts with a fixed reply and single prompts with a fixed score."""
+
+    ai_model_name = "packed-reply"
+
+    def __init__(self, packed_reply: str):
+        self.packed_reply = packed_reply
+        self.user_msgs: List[str] = []
+
+    def execute(self, sys_msg: str, messages: List[Message], temperature: float = 0.2, stop_sequences: List[str] = None) -> str:
+        self.user_msgs.append(messages[-1].content)
+        if messages[-1].content.startswith("# Conversations"):
+            return self.packed_reply
+        return 'thoughts: "Judged alone"\nscore: 0.5'
+
+
+class TestPackedJudgeParsing(unittest.TestCase):
+
+    def test_list_entries_are_parsed_by_id(self):
+        response = (
+            '```yaml\n'
+            '- id: 1\n  thoughts: "Good call."\n  score: 0.9\n'
+            '- id: 2\n  thoughts: The model said "hi" first\n  score: 0.3\n'
+            '- id: 3\n  thoughts: "No score"\n'
+            '- id: 7\n  thoughts: "Out of range"\n  score: 1.0\n'
+            '```'
+        )
+        entries = YAMLResponseParser.parse_judge_list_response(response, num_entries=3)
+        self.assertEqual(sorted(entries), [1, 2])
+        self.assertEqual(entries[1].score, 0.9)
+        self.assertEqual(entries[2].thoughts, 'The model said "hi" first')
+
+    def test_response_without_entries_raises(self):
+        with self.assertRaises(ValueError):
+            YAMLResponseParser.parse_judge_list_response('thoughts: "single"\nscore: 0.4', num_entries=2)
+
+
+class TestPackedJudge(unittest.TestCase):
+
+    def _judge_all(self, judge: JudgeExecutor, conversations: List[str]):
+        async def run():
+            return await asyncio.gather(*(judge.run_judge_async(c) for c in conversations))
+        return asyncio.run(run())
+
+    def test_conversations_share_one_request(self):
+        model_exec = PackedReplyModelExec('- id: 1\n  thoughts: "a"\n  score: 0.1\n- id: 2\n  thoughts: "b"\n  score: 0.2')
+        judge = JudgeExecutor(model_exec=model_exec, sys_msg_path=TOOL_JUDGE_PATH, pack_size=2)
+
+        verdicts = self._judge_all(judge, ["By: user\nfirst", "By: user\nsecond"])
+
+        self.assertEqual([v.score for v in verdicts], [0.1, 0.2])
+        self.assertEqual(len(model_exec.user_msgs), 1)
+        self.assertEqual(judge.pack_stats(), {"packed_requests": 1, "packed_conversations": 2, "fallbacks": 0})
+
+    def test_missing_entries_fall_back_to_single_requests(self):
+        model_exec = PackedReplyModelExec('- id: 2\n  thoughts: "b"\n  score: 0.2')
+        judge = JudgeExecutor(model_exec=model_exec, sys_msg_path=TOOL_JUDGE_PATH, pack_size=3, pack_linger=0.0)
+
+        verdicts = self._judge_all(judge, ["By: user\nfirst", "By: user\nsecond", "By: user\nthird"])
+
+        self.assertEqual([v.score for v in verdicts], [0.5, 0.2, 0.5])
+        self.assertEqual(len(model_exec.user_msgs), 3)
+        self.assertEqual(judge.pack_stats()["fallbacks"], 2)
+
+    def test_partial_pack_is_sent_after_linger(self):
+        fake = FakeModelExecutor(response_weights={VALID: 1.0, NO_SCORE: 1.0}, latency_p50=0.0)
+        judge = JudgeExecutor(model_exec=fake, sys_msg_path=TOOL_JUDGE_PATH, pack_size=8, pack_linger=0.01, max_retries=0)
+
+        verdicts = self._judge_all(judge, [f"By: user\nconversation {i}" for i in range(5)])
+
+        self.assertEqual(len(verdicts), 5)
+        stats = judge.pack_stats()
+        self.assertEqual(stats["packed_requests"], 1)
+        self.assertEqual(fake.stats()["calls"], 1 + stats["fallbacks"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,48 @@
+import unittest
+
+from environment.parsed_turn import parse_turn
+from rewards.rule_judge import MULTIPLE_TAGS, UNPARSEABLE_EXPRESSION, prejudge_conversation, rule_score_cap
+
+CALL = "<calculator>\noperation: divide\noperands: [10, 4]\n</calculator>"
+
+
+class TestParsedTurn(unittest.TestCase):
+
+    def test_calculator_call(self):
+        turn = parse_turn(CALL)
+        self.assertEqual(turn.action_id, "calculator")
+        self.assertEqual(turn.tag_count, 1)
+        self.assertEqual(turn.extra_text, "")
+        self.assertIsNone(turn.parse_error)
+        self.assertEqual(turn.calculation, (2.5, None))
+
+    def test_is_cached_per_content(self):
+        self.assertIs(parse_turn(CALL), parse_turn(CALL))
+
+    def test_errors_are_recorded(self):
+        unparseable = parse_turn("<calculator>operation: power</calculator>")
+        self.assertIsNone(unparseable.expression)
+        self.assertIsInstance(unparseable.parse_error, ValueError)
+        self.assertEqual(unparseable.calculation, (None, None))
+
+        result, error = parse_turn("<calculator>\noperation: divide\noperands: [1, 0]\n</calculator>").calculation
+        self.assertIsNone(result)
+        self.assertIsInstance(error, ZeroDivisionError)
+
+    def test_other_tags_are_not_parsed(self):
+        turn = parse_turn("The answer is <b>42</b>, or 4.2e1.")
+        self.assertEqual(turn.action_id, "b")
+        self.assertFalse(turn.calls_calculator)
+        self.assertIsNone(turn.parse_error)
+        self.assertEqual(turn.final_number, 42.0)
+
+    def test_rule_judge_reads_parsed_turns(self):
+        assistant = lambda content: {"role": "assistant", "content": content}
+        self.assertEqual(rule_score_cap([assistant(CALL + CALL)]).rule, MULTIPLE_TAGS)
+        self.assertEqual(rule_score_cap([assistant("<calculator>add</calculator>")]).rule, UNPARSEABLE_EXPRESSION)
+        self.assertIsNone(rule_score_cap([assistant(CALL), {"role": "user", "content": "<output>2.5</output>"}]))
+        self.assertIsNone(prejudge_conversation([assistant(CALL), {"role": "user", "content": "<output>2.5</output>"}]))
+
+
+if __name__ == "__main__":
+    unittest.main()
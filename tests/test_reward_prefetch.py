@@ -0,0 +1,81 @@
+import unittest
+
+from model_exec.fake import VALID, FakeModelExecutor
+from rewards import calculator_reward_func
+from rewards.background_loop import BackgroundEventLoop
+from rewards.judge_factory import set_judge_model
+from rewards.prefetch import PrefetchRegistry
+
+PROMPT = [
+    {"role": "system", "content": "You are a calculator agent."},
+    {"role": "user", "content": "What is 2 + 3?"},
+]
+COMPLETION = [
+    {"role": "assistant", "content": "<calculator>\noperation: add\noperands: [2, 3]\n</calculator>"},
+    {"role": "user", "content": "<output>5</output>"},
+    {"role": "assistant", "content": "2 + 3 is 5."},
+]
+
+
+class TestPrefetchRegistry(unittest.TestCase):
+
+    def setUp(self):
+        self.registry = PrefetchRegistry(BackgroundEventLoop(name="test-prefetch-loop"))
+        self.runs = []
+
+    def _work(self, value):
+        async def work():
+            self.runs.append(value)
+            return value
+        return work()
+
+    def test_work_is_submitted_once_per_key(self):
+        self.registry.submit("a", lambda: self._work(1))
+        self.registry.submit("a", lambda: self._work(2))
+
+        self.assertEqual(self.registry.pop("a").result(timeout=5), 1)
+        self.assertIsNone(self.registry.pop("a"))
+        self.assertEqual(self.runs, [1])
+
+    def test_end_step_discards_uncollected_work(self):
+        self.registry.submit("a", lambda: self._work(1))
+        self.registry.end_step()
+
+        self.assertIsNone(self.registry.pop("a"))
+        self.assertEqual(self.registry.stats()["discarded"], 1)
+
+    def test_oldest_entries_are_dropped_past_max_entries(self):
+        registry = PrefetchRegistry(self.registry.loop, max_entries=2)
+        for key in "abc":
+            registry.submit(key, lambda: self._work(key))
+
+        self.assertIsNone(registry.pop("a"))
+        self.assertIsNotNone(registry.pop("c"))
+
+
+class TestRolloutPrefetch(unittest.TestCase):
+
+    def setUp(self):
+        self.fake = FakeModelExecutor(response_weights={VALID: 1.0}, latency_p50=0.01, latency_sigma=0.0)
+        set_judge_model(self.fake)
+
+    def test_judge_tool_use_collects_prefetched_score(self):
+        calculator_reward_func.prefetch_rollout_rewards(PROMPT + COMPLETION)
+        self.assertEqual(calculator_reward_func.reward_prefetch.stats()["submitted"], 1)
+
+        with self.assertLogs(calculator_reward_func.logger, level="INFO") as logs:
+            rewards = calculator_reward_func.judge_tool_use([PROMPT], [COMPLETION])
+
+        self.assertEqual(len(rewards), 1)
+        self.assertTrue(0.0 <= rewards[0] <= 1.0)
+        self.assertEqual(self.fake.stats()["calls"], 1)
+        self.assertTrue(any("Reward prefetch: 1/1 judge scores prefetched" in line for line in logs.output))
+
+    def test_rule_judged_rollouts_are_not_prefetched(self):
+        calculator_reward_func.reward_prefetch.reset_stats()
+        calculator_reward_func.prefetch_rollout_rewards(PROMPT + [{"role": "assistant", "content": "It is 5."}])
+        self.assertEqual(calculator_reward_func.reward_prefetch.stats()["submitted"], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,75 @@
+import unittest
+
+from model_exec.model_executor import ModelExecutor
+from rewards import calculator_reward_func
+from rewards.judge_factory import set_judge_model
+from rewards.rule_judge import (
+    EXTRA_TEXT,
+    MULTIPLE_TAGS,
+    NO_CALCULATOR_CALL,
+    UNPARSEABLE_EXPRESSION,
+    prejudge_conversation,
+    rule_score_cap,
+)
+
+PROMPT = [{"role": "user", "content": "What is 2 + 3?"}]
+CALL = "<calculator>\noperation: add\noperands: [2, 3]\n</calculator>"
+BROKEN_CALL = "<calculator>\noperation: add\noperands: [2, 3\n</calculator>"
+
+
+def conversation(*assistant_turns):
+    messages = []
+    for turn in assistant_turns:
+        messages.append({"role": "assistant", "content": turn})
+        messages.append({"role": "user", "content": "<output>5</output>"})
+    messages.append({"role": "assistant", "content": "2 + 3 is 5."})
+    return messages
+
+
+class PerfectScoreJudge(ModelExecutor):
+    ai_model_name = "perfect-score-judge"
+
+    def execute(self, sys_msg, messages, **kwargs):
+        return 'thoughts: "Perfect."\nscore: 1.0'
+
+
+class TestRuleJudge(unittest.TestCase):
+
+    def test_no_calculator_call_is_scored_without_the_judge(self):
+        verdict = prejudge_conversation([{"role": "assistant", "content": "It is 5."}])
+        self.assertEqual((verdict.rule, verdict.score), (NO_CALCULATOR_CALL, 0.0))
+        self.assertIsNone(rule_score_cap([{"role": "assistant", "content": "It is 5."}]))
+
+    def test_multiple_tags_cap(self):
+        completion = conversation(CALL + "\n" + CALL)
+        self.assertIsNone(prejudge_conversation(completion))
+        cap = rule_score_cap(completion)
+        self.assertEqual((cap.rule, cap.score), (MULTIPLE_TAGS, 0.4))
+
+    def test_unparseable_expression_cap(self):
+        cap = rule_score_cap(conversation(BROKEN_CALL))
+        self.assertEqual((cap.rule, cap.score), (UNPARSEABLE_EXPRESSION, 0.7))
+
+    def test_extra_text_cap(self):
+        cap = rule_score_cap(conversation("Let me calculate that.\n" + CALL))
+        self.assertEqual((cap.rule, cap.score), (EXTRA_TEXT, 0.8))
+
+    def test_clean_call_is_left_to_the_judge(self):
+        self.assertIsNone(prejudge_conversation(conversation(CALL)))
+        self.assertIsNone(rule_score_cap(conversation(CALL)))
+
+    def test_corrected_retry_is_not_capped(self):
+        # Only the final call counts: an earlier broken call the assistant fixed is for the judge to weigh
+        self.assertIsNone(rule_score_cap(conversation(BROKEN_CALL, CALL)))
+        self.assertIsNone(prejudge_conversation(conversation(BROKEN_CALL, CALL)))
+        self.assertEqual(rule_score_cap(conversation(CALL, BROKEN_CALL)).rule, UNPARSEABLE_EXPRESSION)
+
+    def test_caps_apply_to_judge_scores(self):
+        set_judge_model(PerfectScoreJudge())
+        completions = [conversation(CALL), conversation("Let me calculate that.\n" + CALL), [{"role": "assistant", "content": "5"}]]
+        rewards = calculator_reward_func.judge_tool_use([PROMPT] * 3, completions)
+        self.assertEqual(rewards, [1.0, 0.8, 0.0])
+
+
+if __name__ == "__main__":
+    unittest.main()
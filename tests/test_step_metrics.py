@@ -0,0 +1,87 @@
+import os
+import sys
+import tempfile
+import types
+import unittest
+
+from metrics.exporters import JSONLExporter, PrometheusTextExporter, WandbExporter
+from metrics.step_metrics import StepMetrics, step_metrics
+from model_exec.fake import NO_SCORE, SCORE_ONLY, VALID, FakeModelExecutor
+from rewards.exec_judge import JudgeExecutor
+
+TOOL_JUDGE_PATH = os.path.join(os.path.dirname(__file__), "..", "src", "rewards", "tool_judge.md")
+
+
+class TestStepMetrics(unittest.TestCase):
+
+    def test_snapshot_aggregates_and_resets(self):
+        metrics = StepMetrics()
+        for seconds in (0.1, 0.2, 0.3):
+            metrics.record_time("judge/model_call", seconds)
+        metrics.increment("judge/parse/direct")
+        metrics.add_counts("judge/cache", {"hits": 2, "misses": 1})
+
+        snapshot = metrics.snapshot()
+        self.assertEqual(snapshot["timers/judge/model_call/count"], 3)
+        self.assertAlmostEqual(snapshot["timers/judge/model_call/p50_ms"], 200.0)
+        self.assertAlmostEqual(snapshot["timers/judge/model_call/max_ms"], 300.0)
+        self.assertEqual(snapshot["counters/judge/cache/hits"], 2)
+        self.assertEqual(metrics.snapshot(), {})
+
+    def test_disabled_metrics_record_nothing(self):
+        metrics = StepMetrics(enabled=False)
+        with metrics.timer("env/env_response"):
+            metrics.increment("env/parse_errors")
+        self.assertEqual(metrics.snapshot(), {})
+
+    def test_judge_parse_fallbacks_are_counted(self):
+        step_metrics.snapshot()
+        for kind in (VALID, SCORE_ONLY, NO_SCORE):
+            fake = FakeModelExecutor(response_weights={kind: 1.0}, latency_p50=0.0)
+            JudgeExecutor(model_exec=fake, sys_msg_path=TOOL_JUDGE_PATH, max_retries=1).run_judge("By: user\nhi")
+
+        snapshot = step_metrics.snapshot()
+        self.assertEqual(snapshot["counters/judge/parse/direct"], 1)
+        self.assertEqual(snapshot["counters/judge/parse/score_fallback"], 1)
+        self.assertEqual(snapshot["counters/judge/parse/retries"], 1)
+        self.assertEqual(snapshot["counters/judge/parse/failed"], 1)
+        self.assertEqual(snapshot["timers/judge/model_call/count"], 4)
+
+    def test_exporters_write_files(self):
+        metrics = {"timers/env/env_response/mean_ms": 1.5, "counters/env/parse_errors": 2}
+        with tempfile.TemporaryDirectory() as directory:
+            jsonl_path = os.path.join(directory, "metrics.jsonl")
+            prometheus_path = os.path.join(directory, "metrics.prom")
+            JSONLExporter(jsonl_path).export(7, metrics)
+            PrometheusTextExporter(prometheus_path).export(7, metrics)
+
+            with open(jsonl_path) as f:
+                self.assertIn('"step": 7', f.read())
+            with open(prometheus_path) as f:
+                prometheus = f.read()
+        self.assertIn('calculator_agent_timer{name="env/env_response",stat="mean_ms"} 1.5', prometheus)
+        self.assertIn('calculator_agent_counter{name="env/parse_errors"} 2', prometheus)
+
+    def test_wandb_exporter_commits_every_step(self):
+        logged = []
+        fake_wandb = types.SimpleNamespace(run=object(), log=lambda row, **kwargs: logged.append((row, kwargs)))
+        previous = sys.modules.get("wandb")
+        sys.modules["wandb"] = fake_wandb
+        try:
+            for step in (1, 2):
+                WandbExporter().export(step, {"counters/env/parse_errors": step})
+        finally:
+            if previous is None:
+                del sys.modules["wandb"]
+            else:
+                sys.modules["wandb"] = previous
+
+        # Each step is its own row, so a step without a trainer log call is not overwritten by the next
+        self.assertEqual(logged, [
+            ({"step_metrics/counters/env/parse_errors": 1, "train/global_step": 1}, {}),
+            ({"step_metrics/counters/env/parse_errors": 2, "train/global_step": 2}, {}),
+        ])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,173 @@
+import asyncio
+import json
+import os
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from anthropic import Anthropic, AsyncAnthropic
+
+from model_exec.claude import ClaudeModelExecutor
+from model_exec.fake import NO_SCORE, TRUNCATED, VALID, FakeModelExecutor
+from model_exec.model_executor import Message, ModelExecutor
+from model_exec.rate_limit import AdaptiveRateLimiter, RetryPolicy
+from rewards.exec_judge import (
+    JUDGE_VERDICT_SCHEMA,
+    JudgeExecutor,
+    extract_judged_conversation,
+    judge_response_from_output,
+)
+from rewards.judge_resp import JudgeResponse
+
+TOOL_JUDGE_PATH = os.path.join(os.path.dirname(__file__), "..", "src", "rewards", "tool_judge.md")
+CONVERSATION = "By: user\nWhat is 2 + 2?"
+
+
+class ToolUseServer(ThreadingHTTPServer):
+    """A local stand-in for the Messages API that answers with a tool call and records request bodies."""
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), ToolUseHandler)
+        self.bodies = []
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+
+class ToolUseHandler(BaseHTTPRequestHandler):
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_POST(self):
+        request = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        self.server.bodies.append(request)
+        body = {
+            "id": "msg_1", "type": "message", "role": "assistant", "model": "claude-3-5-haiku-20241022",
+            "content": [{
+                "type": "tool_use", "id": "toolu_1", "name": request["tool_choice"]["name"],
+                "input": {"thoughts": "Correct use of the calculator.", "score": 0.8},
+            }],
+            "stop_reason": "tool_use", "stop_sequence": None,
+            "usage": {"input_tokens": 3, "output_tokens": 2},
+        }
+        payload = json.dumps(body).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+
+class FakeHaikuExec(ClaudeModelExecutor):
+    ai_model_name = "claude-3-5-haiku-20241022"
+
+
+class TestClaudeStructuredOutput(unittest.TestCase):
+
+    def test_tool_call_is_forced_and_returned_parsed(self):
+        server = ToolUseServer()
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        claude = FakeHaikuExec(
+            client=Anthropic(api_key="test", base_url=server.base_url, max_retries=0),
+            async_client=AsyncAnthropic(api_key="test", base_url=server.base_url, max_retries=0),
+            retry_policy=RetryPolicy(max_retries=0),
+            rate_limiter=AdaptiveRateLimiter(),
+        )
+        messages = [Message(role="user", content="Judge this")]
+
+        output = claude.execute_structured("sys", messages, JUDGE_VERDICT_SCHEMA)
+        async_output = asyncio.run(claude.execute_structured_async("sys", messages, JUDGE_VERDICT_SCHEMA))
+
+        self.assertEqual(output, {"thoughts": "Correct use of the calculator.", "score": 0.8})
+        self.assertEqual(async_output, output)
+        self.assertEqual(server.bodies[0]["tool_choice"], {"type": "tool", "name": "submit_verdict"})
+        self.assertEqual(server.bodies[0]["tools"][0]["input_schema"], JUDGE_VERDICT_SCHEMA.json_schema)
+
+
+class TestStructuredJudge(unittest.TestCase):
+
+    def test_output_validation(self):
+        self.assertEqual(judge_response_from_output({"thoughts": "ok", "score": 1}), JudgeResponse(thoughts="ok", score=1.0))
+        self.assertEqual(judge_response_from_output({"score": 0.4}), JudgeResponse(thoughts="", score=0.4))
+        for output in ({}, {"score": 1.5}, {"score": "0.4"}, {"score": True}, None):
+            self.assertIsNone(judge_response_from_output(output), output)
+
+    def test_malformed_yaml_kinds_need_no_retry(self):
+        # NO_SCORE makes the YAML judge retry, but a forced tool call always carries a score
+        fake = FakeModelExecutor(response_weights={NO_SCORE: 1}, latency_p50=0.0)
+        judge = JudgeExecutor(model_exec=fake, sys_msg_path=TOOL_JUDGE_PATH, structured_output=True)
+
+        self.assertIsNotNone(judge.run_judge(CONVERSATION))
+        self.assertIsNotNone(asyncio.run(judge.run_judge_async(CONVERSATION + "?")))
+        self.assertEqual(fake.stats()["calls"], 2)
+        self.assertEqual(judge.parse_stats(), {"direct": 2})
+
+    def test_truncated_responses_are_retried_then_fail(self):
+        fake = FakeModelExecutor(response_weights={TRUNCATED: 1}, latency_p50=0.0)
+        judge = JudgeExecutor(model_exec=fake, sys_msg_path=TOOL_JUDGE_PATH, max_retries=2, structured_output=True)
+
+        self.assertIsNone(judge.run_judge(CONVERSATION))
+        self.assertEqual(fake.stats()["calls"], 3)
+        self.assertEqual(fake.stats()["retries"], 2)
+        self.assertEqual(judge.parse_stats(), {"retries": 2, "failed": 1})
+
+    def test_bulk_and_packed_judging(self):
+        conversations = [f"By: user\nWhat is {i} + {i}?" for i in range(6)]
+        weights = {VALID: 1, NO_SCORE: 1, TRUNCATED: 1}
+        single_judge = JudgeExecutor(
+            model_exec=FakeModelExecutor(response_weights=weights, latency_p50=0.0),
+            sys_msg_path=TOOL_JUDGE_PATH,
+            structured_output=True,
+        )
+        bulk_judge = JudgeExecutor(
+            model_exec=FakeModelExecutor(response_weights=weights, latency_p50=0.0),
+            sys_msg_path=TOOL_JUDGE_PATH,
+            structured_output=True,
+        )
+        packed_fake = FakeModelExecutor(response_weights={VALID: 1}, latency_p50=0.0)
+        packed_judge = JudgeExecutor(model_exec=packed_fake, sys_msg_path=TOOL_JUDGE_PATH, pack_size=3, structured_output=True)
+
+        async def judge_packed():
+            return await asyncio.gather(*(packed_judge.run_judge_async(conversation) for conversation in conversations))
+
+        single = [single_judge.run_judge(conversation) for conversation in conversations]
+        self.assertEqual(bulk_judge.run_judge_bulk(conversations), single)
+        packed = asyncio.run(judge_packed())
+        self.assertEqual(packed_judge.pack_stats()["packed_requests"], 2)
+        self.assertTrue(all(verdict is not None for verdict in packed))
+
+    def test_prompts_identify_the_judged_conversation(self):
+        prompts = []
+
+        class RecordingFake(FakeModelExecutor):
+            def execute_structured(self, sys_msg, messages, output_schema, temperature=0.2):
+                prompts.append(messages[-1].content)
+                return super().execute_structured(sys_msg, messages, output_schema, temperature)
+
+        judge = JudgeExecutor(
+            model_exec=RecordingFake(response_weights={VALID: 1}, latency_p50=0.0),
+            sys_msg_path=TOOL_JUDGE_PATH,
+            structured_output=True,
+        )
+        judge.run_judge(CONVERSATION)
+        self.assertEqual(extract_judged_conversation(prompts[0]), CONVERSATION)
+
+    def test_models_without_structured_output_are_rejected(self):
+        class TextOnlyModelExec(ModelExecutor):
+            ai_model_name = "text-only"
+
+            def execute(self, sys_msg, messages, temperature=0.2, stop_sequences=None):
+                return 'thoughts: "ok"\nscore: 1.0'
+
+        self.assertFalse(TextOnlyModelExec().supports_structured_output)
+        self.assertTrue(FakeModelExecutor().supports_structured_output)
+        with self.assertRaises(ValueError):
+            JudgeExecutor(model_exec=TextOnlyModelExec(), sys_msg_path=TOOL_JUDGE_PATH, structured_output=True)
+
+
+if __name__ == "__main__":
+    unittest.main()